@@ -4,11 +4,20 @@
 """
 Aplicación web Flask para el Sistema de Gestión de Equipajes
 Proporciona una interfaz gráfica para monitorear los eventos de equipaje
+
+La aplicación se construye con crear_app(), que no abre conexiones ni arranca
+hilos: la base de datos se crea o migra con la primera conexión, el productor
+Kafka se conecta con la primera publicación, y los servicios en segundo plano
+(simulador y relay del outbox) se inician con iniciar_servicios(), ya sea
+explícitamente o con la primera petición.
 """
 
 import os
 import sys
+import atexit
+import signal
 import logging
+import threading
 from flask import Flask, render_template, redirect, url_for
 
 # Ajustar el path para las importaciones
@@ -17,11 +26,15 @@ sys.path.append(basedir)
 
 # Importar componentes del sistema reorganizado
 from src.core.config import Config, get_datetime_argentina
-from src.core.db_service import inicializar_db
-from src.simulador.simulador_auto import iniciar_simulador
+from src.core.db_service import registrar_teardown
+from src.core.repositorio import obtener_repositorio
+from src.core.outbox import outbox_activo
+from src.simulador.simulador_auto import iniciar_simulador, detener_simulador
 from src.api.routes import api_bp
+from src.api.respuestas import configurar_json
 # Agregar import para el productor Kafka
-from src.eda.productor_kafka import publicar_evento_equipaje
+from src.eda.productor_kafka import productor, reenviar_pendientes
+from src.eda.relay_outbox import relay, iniciar_relay
 
 # Configuración de logging
 logging.basicConfig(
@@ -30,13 +43,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger('app')
 
-# Crear la aplicación Flask
-app = Flask(__name__)
-
-# Registrar el blueprint de las rutas API con prefijo /api
-app.register_blueprint(api_bp, url_prefix='/api')
-
-@app.context_processor
 def utility_processor():
     """
     Funciones y variables disponibles en todos los templates.
@@ -45,28 +51,24 @@ def utility_processor():
         'fecha_actual': get_datetime_argentina().strftime("%d de %B de %Y")
     }
 
-@app.route('/')
 def index():
     """
     Ruta principal que muestra el dashboard.
     """
     return render_template('index.html')
 
-@app.route('/valijas')
 def valijas():
     """
     Ruta que muestra la página de seguimiento de valijas.
     """
     return render_template('valijas.html')
 
-@app.route('/agregar')
 def agregar():
     """
     Ruta que muestra la página para agregar equipajes manualmente.
     """
     return render_template('agregar.html')
 
-@app.route('/mapa')
 def mapa():
     """
     Ruta que muestra la página con el mapa de equipajes.
@@ -74,23 +76,85 @@ def mapa():
     return render_template('mapa.html')
 
 # Manejador de errores para rutas no encontradas
-@app.errorhandler(404)
 def not_found_error(error):
     return render_template('404.html'), 404
 
 # Manejador de errores para errores internos
-@app.errorhandler(500)
 def internal_error(error):
     return render_template('500.html'), 500
 
-def inicializar_aplicacion():
-    """Inicializa la aplicación y sus componentes"""
-    # Verificar si la base de datos existe, si no, crearla
-    if not os.path.exists(Config.DB_PATH):
+def crear_app(iniciar_en_primera_peticion=True):
+    """
+    Crea y configura la aplicación Flask sin efectos secundarios.
+
+    Args:
+        iniciar_en_primera_peticion (bool): Si es True, los servicios en segundo plano
+            se inician con la primera petición (útil bajo WSGI, donde no se ejecuta
+            el bloque __main__).
+
+    Returns:
+        Flask: Aplicación lista para servir.
+    """
+    app = Flask(__name__)
+
+    # Serializar JSON con orjson si está disponible
+    configurar_json(app)
+
+    # Registrar el blueprint de las rutas API con prefijo /api
+    app.register_blueprint(api_bp, url_prefix='/api')
+
+    # Devolver las conexiones SQLite al pool al terminar cada contexto de aplicación
+    registrar_teardown(app)
+
+    app.context_processor(utility_processor)
+    app.add_url_rule('/', view_func=index)
+    app.add_url_rule('/valijas', view_func=valijas)
+    app.add_url_rule('/agregar', view_func=agregar)
+    app.add_url_rule('/mapa', view_func=mapa)
+    app.register_error_handler(404, not_found_error)
+    app.register_error_handler(500, internal_error)
+
+    if iniciar_en_primera_peticion:
+        app.before_request(iniciar_servicios)
+    return app
+
+_servicios_iniciados = False
+_lock_servicios = threading.Lock()
+
+def iniciar_servicios():
+    """
+    Inicializa el almacenamiento y arranca los servicios en segundo plano.
+    Solo tiene efecto la primera vez que se llama en el proceso; las llamadas
+    concurrentes (primeras peticiones simultáneas) esperan a que termine el arranque.
+    """
+    global _servicios_iniciados
+    if _servicios_iniciados:
+        return
+    with _lock_servicios:
+        if _servicios_iniciados:
+            return
+        _arrancar_servicios()
+        # Marcar recién ahora: antes, otra petición seguiría sin esperar al arranque
+        _servicios_iniciados = True
+
+def _arrancar_servicios():
+    """Arranque de iniciar_servicios(); se ejecuta con _lock_servicios tomado."""
+    # Crear la base de datos si no existe o completar el esquema de una existente
+    try:
+        obtener_repositorio().inicializar()
+    except Exception as e:
+        logger.error(f"Error al crear la base de datos: {e}")
+
+    # Reenviar los eventos de Kafka derramados en ejecuciones anteriores, en segundo plano
+    # para no demorar el arranque si el broker no está disponible
+    threading.Thread(target=reenviar_pendientes, name='reenvio-kafka', daemon=True).start()
+
+    # Publicar en Kafka los eventos registrados en el outbox (incluidos los del simulador)
+    if outbox_activo():
         try:
-            inicializar_db()
+            iniciar_relay()
         except Exception as e:
-            logger.error(f"Error al crear la base de datos: {e}")
+            logger.error(f"Error al iniciar el relay del outbox: {e}")
 
     # En desarrollo local, siempre activar el simulador automáticamente a menos que se desactive explícitamente
     if os.environ.get('DISABLE_SIMULATOR', 'False') != 'True':
@@ -106,13 +170,31 @@ def inicializar_aplicacion():
         except Exception as e:
             logger.error(f"Error al iniciar el simulador: {e}")
 
-# Solo iniciar el simulador si se ejecuta directamente o si se solicita explícitamente
+    atexit.register(detener_servicios)
+
+def detener_servicios():
+    """
+    Detiene los servicios en segundo plano y envía los eventos de Kafka pendientes.
+    Se ejecuta al salir (atexit) y puede llamarse más de una vez.
+    """
+    detener_simulador()
+    relay.detener()
+    productor.cerrar()
+
+# Instancia para WSGI (PythonAnywhere, etc.): importar el módulo no inicia servicios
+app = crear_app()
+
+def _terminar(numero, frame):
+    # SIGTERM (p. ej. al detener el servicio) termina como Ctrl+C, pasando por el finally
+    sys.exit(0)
+
 if __name__ == '__main__':
     # Inicializar la aplicación
-    inicializar_aplicacion()
-    
-    # Ejecutar la aplicación en modo debug solo en desarrollo local
-    app.run(debug=Config.DEBUG, host=Config.HOST, port=Config.PORT)
-else:
-    # Para WSGI (PythonAnywhere, etc.)
-    inicializar_aplicacion()
\ No newline at end of file
+    iniciar_servicios()
+    signal.signal(signal.SIGTERM, _terminar)
+
+    try:
+        # Ejecutar la aplicación en modo debug solo en desarrollo local
+        app.run(debug=Config.DEBUG, host=Config.HOST, port=Config.PORT)
+    finally:
+        detener_servicios()
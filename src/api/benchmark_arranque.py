@@ -0,0 +1,86 @@
+"""
+Script de benchmark del arranque en frío de la aplicación.
+Lanza N procesos nuevos y en cada uno mide, sobre una base temporal:
+    - importación de app.py (incluye crear_app());
+    - primera petición a /api/estadisticas (crea la base y aplica las migraciones);
+    - segunda petición (ya con la base lista).
+Con --detalle muestra además los módulos que más tardan en importarse (python -X importtime).
+Uso: python src/api/benchmark_arranque.py [repeticiones] [--detalle]
+"""
+import os
+import sys
+import json
+import shutil
+import tempfile
+import statistics
+import subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+argumentos = [a for a in sys.argv[1:] if not a.startswith('--')]
+repeticiones = int(argumentos[0]) if argumentos else 5
+detalle = '--detalle' in sys.argv
+
+# Código que ejecuta cada proceso hijo; imprime los tiempos en JSON
+PROCESO_HIJO = '''
+import sys, time, json
+inicio = time.perf_counter()
+from src.core import db_service
+db_service.DB_PATH = sys.argv[1]
+db_service._pool = db_service.PoolConexiones(sys.argv[1])
+import app
+importacion = time.perf_counter()
+cliente = app.app.test_client()
+cliente.get('/api/estadisticas')
+primera = time.perf_counter()
+cliente.get('/api/estadisticas')
+segunda = time.perf_counter()
+print(json.dumps({
+    'importacion': (importacion - inicio) * 1000,
+    'primera_peticion': (primera - importacion) * 1000,
+    'segunda_peticion': (segunda - primera) * 1000,
+}))
+'''
+
+# Sin simulador ni relay: se mide el arranque de la aplicación, no el de los servicios
+entorno = dict(os.environ, DISABLE_SIMULATOR='True', OUTBOX_KAFKA='False')
+
+def ejecutar(directorio):
+    """Ejecuta un arranque en frío en un proceso nuevo y devuelve sus tiempos."""
+    db_path = os.path.join(directorio, 'equipajes.db')
+    salida = subprocess.run(
+        [sys.executable, '-c', PROCESO_HIJO, db_path],
+        cwd=RAIZ, env=entorno, capture_output=True, text=True, check=True
+    ).stdout
+    os.remove(db_path)
+    return json.loads(salida.strip().splitlines()[-1])
+
+directorio = tempfile.mkdtemp(prefix='benchmark_arranque_')
+try:
+    print(f"Midiendo {repeticiones} arranques en frío...\n")
+    resultados = [ejecutar(directorio) for _ in range(repeticiones)]
+
+    print(f"{'Etapa':<28}{'Mediana (ms)':>14}{'Máximo (ms)':>14}")
+    for etapa, nombre in [('importacion', 'importar app.py'),
+                          ('primera_peticion', 'primera petición (crea DB)'),
+                          ('segunda_peticion', 'segunda petición')]:
+        tiempos = [r[etapa] for r in resultados]
+        print(f"{nombre:<28}{statistics.median(tiempos):>14.1f}{max(tiempos):>14.1f}")
+
+    if detalle:
+        # Cada línea de -X importtime: "import time: propio | acumulado | módulo"
+        stderr = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import app'],
+            cwd=RAIZ, env=entorno, capture_output=True, text=True
+        ).stderr
+        modulos = []
+        for linea in stderr.splitlines():
+            if not linea.startswith('import time:') or 'cumulative' in linea:
+                continue
+            _, acumulado, modulo = linea[len('import time:'):].split('|')
+            modulos.append((int(acumulado) / 1000, modulo.strip()))
+        print(f"\n{'Módulo':<40}{'Acumulado (ms)':>16}")
+        for acumulado, modulo in sorted(modulos, reverse=True)[:15]:
+            print(f"{modulo[:40]:<40}{acumulado:>16.1f}")
+finally:
+    shutil.rmtree(directorio, ignore_errors=True)
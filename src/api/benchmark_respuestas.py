@@ -0,0 +1,92 @@
+"""
+Script de benchmark de la serialización y compresión de /api/valijas.
+Crea una base temporal con N valijas, obtiene el listado con obtener_todas_valijas()
+y mide tamaño y latencia de la respuesta con el serializador JSON estándar de Flask
+y con orjson, con y sin gzip.
+Uso: python src/api/benchmark_respuestas.py [valijas] [repeticiones]
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+import statistics
+
+from flask import Flask, jsonify, request
+
+# Ajustar el path para las importaciones
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.core.config import Config
+from src.core import db_service
+from src.api import respuestas
+
+cantidad_valijas = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+# Usar una base temporal para no modificar data/equipajes.db
+directorio = tempfile.mkdtemp(prefix='benchmark_respuestas_')
+db_service.DB_PATH = os.path.join(directorio, 'equipajes.db')
+db_service._pool = db_service.PoolConexiones(db_service.DB_PATH)
+
+def crear_app(proveedor_rapido, comprimir):
+    """App mínima que devuelve el listado precalculado como lo hace /api/valijas."""
+    app = Flask(__name__)
+    if proveedor_rapido:
+        app.json = respuestas.ProveedorJSONRapido(app)
+
+    @app.route('/valijas')
+    def valijas():
+        return jsonify(datos)
+
+    if comprimir:
+        app.after_request(lambda respuesta: respuestas.comprimir_respuesta(respuesta, request))
+    return app
+
+def medir(app):
+    """Devuelve (bytes enviados, mediana en ms) de GET /valijas."""
+    cliente = app.test_client()
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        respuesta = cliente.get('/valijas', headers={'Accept-Encoding': 'gzip'})
+        cuerpo = respuesta.get_data()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return len(cuerpo), statistics.median(tiempos)
+
+try:
+    db_service.inicializar_db()
+    print(f"Generando {cantidad_valijas} valijas...")
+    eventos = []
+    for i in range(cantidad_valijas):
+        origen, destino = random.sample(Config.AEROPUERTOS, 2)
+        eventos.append({
+            'id_valija': f'{i:08d}-bench',
+            'evento': random.choice(['equipaje_escaneado', 'equipaje_cargado', 'equipaje_entregado']),
+            'origen': origen,
+            'destino': destino,
+            'peso': round(random.uniform(5, 30), 1)
+        })
+    for inicio in range(0, len(eventos), Config.MAX_EVENTOS_LOTE):
+        db_service.insertar_eventos_lote(eventos[inicio:inicio + Config.MAX_EVENTOS_LOTE])
+
+    inicio = time.perf_counter()
+    datos = db_service.obtener_todas_valijas()
+    print(f"Consulta obtener_todas_valijas(): {len(datos)} valijas en "
+          f"{(time.perf_counter() - inicio) * 1000:.1f} ms\n")
+
+    variantes = [('json estándar', False, False), ('json estándar + gzip', False, True)]
+    if respuestas.orjson is not None:
+        variantes += [('orjson', True, False), ('orjson + gzip', True, True)]
+    else:
+        print("orjson no está instalado: solo se mide el serializador estándar\n")
+
+    print(f"{'Variante':<24}{'Bytes':>12}{'Mediana (ms)':>16}")
+    for nombre, proveedor_rapido, comprimir in variantes:
+        tamano, mediana = medir(crear_app(proveedor_rapido, comprimir))
+        print(f"{nombre:<24}{tamano:>12}{mediana:>16.1f}")
+finally:
+    db_service._pool.cerrar_todas()
+    db_service.cerrar_db_connection_hilo()
+    shutil.rmtree(directorio, ignore_errors=True)
@@ -0,0 +1,91 @@
+"""
+Serialización JSON y compresión de las respuestas de la API.
+Si orjson está instalado se usa para serializar (varias veces más rápido que el
+módulo json estándar en listas grandes); si no, se mantiene el proveedor de Flask.
+Las respuestas de texto que superan Config.GZIP_MIN_BYTES se comprimen con gzip
+cuando el cliente lo acepta en Accept-Encoding.
+"""
+
+import gzip
+import logging
+
+from flask.json.provider import DefaultJSONProvider
+
+from src.core.config import Config
+
+try:
+    import orjson
+except ImportError:  # Dependencia opcional: se usa el módulo json estándar
+    orjson = None
+
+logger = logging.getLogger('api-respuestas')
+
+# Tipos de contenido que vale la pena comprimir
+TIPOS_COMPRIMIBLES = ('application/json', 'text/csv', 'text/plain', 'application/x-ndjson')
+
+class ProveedorJSONRapido(DefaultJSONProvider):
+    """Proveedor JSON de Flask que serializa con orjson, sin ordenar claves ni indentar."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        datos = self._prepare_response_obj(args, kwargs)
+        # Entregar los bytes de orjson directamente, sin pasar por str
+        return self._app.response_class(
+            orjson.dumps(datos, default=self.default, option=orjson.OPT_NON_STR_KEYS),
+            mimetype=self.mimetype
+        )
+
+def configurar_json(app):
+    """
+    Instala el proveedor JSON rápido en la app si está habilitado y orjson está disponible.
+
+    Args:
+        app (Flask): Aplicación Flask.
+
+    Returns:
+        bool: True si se instaló el proveedor orjson.
+    """
+    if not Config.JSON_RAPIDO:
+        return False
+    if orjson is None:
+        logger.info("orjson no está instalado: se usa el serializador JSON estándar")
+        return False
+    app.json = ProveedorJSONRapido(app)
+    return True
+
+def acepta_gzip(request):
+    """Indica si el cliente acepta respuestas comprimidas con gzip."""
+    return request.accept_encodings['gzip'] > 0
+
+def comprimir_respuesta(respuesta, request):
+    """
+    Comprime con gzip el cuerpo de una respuesta si el cliente lo acepta y supera el umbral.
+    No modifica respuestas de streaming, ya codificadas, con error o de tipos binarios.
+
+    Args:
+        respuesta (Response): Respuesta generada por la vista.
+        request (Request): Petición actual.
+
+    Returns:
+        Response: La misma respuesta, comprimida si correspondía.
+    """
+    if Config.GZIP_MIN_BYTES <= 0 or respuesta.status_code != 200:
+        return respuesta
+    if respuesta.is_streamed or respuesta.direct_passthrough:
+        return respuesta
+    if 'Content-Encoding' in respuesta.headers or respuesta.mimetype not in TIPOS_COMPRIMIBLES:
+        return respuesta
+    
+    respuesta.vary.add('Accept-Encoding')
+    if not acepta_gzip(request):
+        return respuesta
+    
+    cuerpo = respuesta.get_data()
+    if len(cuerpo) < Config.GZIP_MIN_BYTES:
+        return respuesta
+    
+    respuesta.set_data(gzip.compress(cuerpo, compresslevel=Config.GZIP_NIVEL))
+    respuesta.headers['Content-Encoding'] = 'gzip'
+    return respuesta
@@ -5,20 +5,32 @@ Separa la lógica de las rutas de la aplicación principal siguiendo el patrón
 
 import os
 import sys
-from flask import Blueprint, jsonify, request
+import json
+import time
+import base64
+import tempfile
+import functools
+import threading
+from datetime import datetime, timedelta, timezone
+from flask import Blueprint, Response, jsonify, make_response, request
 import logging
 
 # Ajustar el path para las importaciones
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 # Importar componentes necesarios
-from src.core.config import Config, get_datetime_argentina
-from src.core.db_service import (
-    obtener_eventos, obtener_valija, obtener_todas_valijas, 
-    insertar_evento, obtener_estadisticas
-)
+from src.core.config import Config, get_datetime_argentina, timestamp_a_epoch_ms
+from src.core import exportacion
+from src.core.repositorio import obtener_repositorio
+from src.core.notificaciones import centro as centro_notificaciones
+from src.core.outbox import outbox_activo, mensaje_kafka
+from src.api.respuestas import comprimir_respuesta
+from src.simulador import simulador_auto
 from src.simulador.simulador_auto import valijas_activas, iniciar_simulador
-from src.eda.productor_kafka import publicar_evento_equipaje
+from src.eda.productor_kafka import publicar_evento_equipaje, publicar_eventos_equipaje, metricas_productor
+from src.eda.relay_outbox import estado_relay
+from src.eda import analitica
+from src.eda.estado_consumidor import ESTADO_DB_PATH
 
 # Configuración de logging
 logger = logging.getLogger('api-routes')
@@ -26,42 +38,209 @@ logger = logging.getLogger('api-routes')
 # Crear Blueprint para las rutas API
 api_bp = Blueprint('api', __name__)
 
+@api_bp.after_request
+def comprimir(respuesta):
+    """Comprime con gzip las respuestas grandes si el cliente lo acepta."""
+    return comprimir_respuesta(respuesta, request)
+
 def agregar_valija_a_simulador(id_valija, origen, destino, peso, estado_actual):
     try:
-        from src.simulador.simulador_auto import valijas_activas
-        from datetime import timedelta
-        from src.core.config import get_datetime_argentina
-        import random
-        if id_valija not in valijas_activas and estado_actual in ['equipaje_escaneado', 'equipaje_cargado']:
-            tiempo_proxima_accion = get_datetime_argentina() + timedelta(seconds=random.randint(30, 120))
-            valijas_activas[id_valija] = {
-                'id': id_valija,
-                'origen': origen,
-                'destino': destino,
-                'peso': peso,
-                'estado_actual': estado_actual,
-                'tiempo_proxima_accion': tiempo_proxima_accion
-            }
-            logger.info(f"Valija {id_valija} añadida manualmente al simulador para cambio de estado automático")
+        simulador_auto.agregar_valija_a_simulador(id_valija, origen, destino, peso, estado_actual)
     except Exception as e:
         logger.error(f"No se pudo agregar la valija manual al simulador: {e}")
 
+# Última modificación observada por ruta: {endpoint: (etag, datetime UTC)}
+_ultima_modificacion = {}
+_ultima_modificacion_lock = threading.Lock()
+
+def _fecha_modificacion(endpoint, etag):
+    """
+    Devuelve la fecha (con resolución de segundos, como la cabecera Last-Modified) en que
+    esta instancia vio por primera vez la versión `etag` de una ruta. Cada versión nueva
+    recibe una fecha estrictamente posterior a la anterior, para que If-Modified-Since
+    no confunda dos versiones generadas en el mismo segundo.
+    """
+    with _ultima_modificacion_lock:
+        anterior = _ultima_modificacion.get(endpoint)
+        if anterior is not None and anterior[0] == etag:
+            return anterior[1]
+        fecha = datetime.now(timezone.utc).replace(microsecond=0)
+        if anterior is not None and fecha <= anterior[1]:
+            fecha = anterior[1] + timedelta(seconds=1)
+        _ultima_modificacion[endpoint] = (etag, fecha)
+        return fecha
+
+def respuesta_condicional(obtener_version):
+    """
+    Decorador para las rutas GET que el frontend consulta periódicamente.
+    Calcula una versión barata de los datos y, si coincide con la que el cliente
+    envía en If-None-Match (o no cambió desde If-Modified-Since), responde 304
+    sin ejecutar la consulta. Las respuestas 200 llevan ETag y Last-Modified.
+    
+    Args:
+        obtener_version (callable): Función sin argumentos que devuelve el token de
+            versión, o None si no se puede calcular (en ese caso se responde siempre).
+    """
+    def decorador(vista):
+        @functools.wraps(vista)
+        def envoltura(*args, **kwargs):
+            try:
+                version = obtener_version()
+            except Exception as e:
+                logger.error(f"Error al calcular la versión de {request.endpoint}: {e}")
+                version = None
+            if version is None:
+                return vista(*args, **kwargs)
+            
+            etag = str(version)
+            modificado = _fecha_modificacion(request.endpoint, etag)
+            if request.if_none_match:
+                sin_cambios = request.if_none_match.contains_weak(etag)
+            else:
+                sin_cambios = (request.if_modified_since is not None
+                               and modificado <= request.if_modified_since)
+            
+            if sin_cambios:
+                respuesta = Response(status=304)
+            else:
+                respuesta = make_response(vista(*args, **kwargs))
+                if respuesta.status_code != 200:
+                    return respuesta
+            # Débil: la misma versión puede enviarse comprimida o no
+            respuesta.set_etag(etag, weak=True)
+            respuesta.last_modified = modificado
+            # El navegador puede guardar la respuesta pero debe revalidarla en cada consulta
+            respuesta.headers['Cache-Control'] = 'no-cache'
+            return respuesta
+        return envoltura
+    return decorador
+
+def version_datos():
+    """Versión de los datos de eventos y valijas según el motor de almacenamiento."""
+    return obtener_repositorio().obtener_version_datos()
+
+def version_estadisticas():
+    """
+    Versión de las estadísticas: además de los datos, cambia cada minuto porque
+    la ventana de las últimas 24 horas avanza aunque no lleguen eventos.
+    """
+    version = version_datos()
+    if version is None:
+        return None
+    return f"{version}.{int(time.time() // 60)}"
+
+def version_simulador():
+    """Versión del estado del simulador (cambia con cada alta, avance o baja de valijas)."""
+    return f"{simulador_auto.generacion}.{len(valijas_activas)}"
+
+def codificar_cursor(valores):
+    """Codifica la clave de ordenamiento del último elemento de una página como cursor opaco."""
+    return base64.urlsafe_b64encode(json.dumps(valores).encode('utf-8')).decode('ascii')
+
+def decodificar_cursor(cursor, tipos):
+    """
+    Decodifica un cursor generado por codificar_cursor.
+    
+    Args:
+        cursor (str): Cursor recibido en la consulta.
+        tipos (tuple): Tipo esperado de cada valor de la clave de ordenamiento.
+    
+    Raises:
+        ValueError: Si el cursor no es válido.
+    """
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError(f"Cursor inválido: {cursor}")
+    if (not isinstance(valores, list) or len(valores) != len(tipos) or
+            not all(isinstance(v, t) and not isinstance(v, bool) for v, t in zip(valores, tipos))):
+        raise ValueError(f"Cursor inválido: {cursor}")
+    return tuple(valores)
+
+def leer_limite(por_defecto):
+    """
+    Lee el parámetro 'limit' de la consulta, acotado a Config.MAX_LIMITE_PAGINA.
+    
+    Raises:
+        ValueError: Si el límite no es un entero positivo.
+    """
+    valor = request.args.get('limit')
+    if valor is None:
+        return por_defecto
+    try:
+        limite = int(valor)
+    except ValueError:
+        raise ValueError(f"Límite inválido: {valor}")
+    if limite <= 0:
+        raise ValueError(f"Límite inválido: {valor}")
+    return min(limite, Config.MAX_LIMITE_PAGINA)
+
+def leer_filtros():
+    """
+    Lee los filtros de la consulta: 'estado' (uno o varios separados por coma), 'aeropuerto'
+    (origen o destino), 'desde'/'hasta' (ISO o epoch) y 'prefijo' (inicio del id de valija).
+    
+    Raises:
+        ValueError: Si alguna fecha no es válida.
+    """
+    filtros = {}
+    estados = request.args.get('estado')
+    if estados:
+        filtros['estados'] = [e.strip() for e in estados.split(',') if e.strip()]
+    if request.args.get('aeropuerto'):
+        filtros['aeropuerto'] = request.args.get('aeropuerto')
+    if request.args.get('prefijo'):
+        filtros['prefijo'] = request.args.get('prefijo')
+    for parametro, clave in (('desde', 'desde_ms'), ('hasta', 'hasta_ms')):
+        valor = request.args.get(parametro)
+        if valor:
+            try:
+                filtros[clave] = timestamp_a_epoch_ms(valor)
+            except ValueError:
+                raise ValueError(f"Fecha inválida en '{parametro}': {valor}")
+    return filtros
+
 @api_bp.route('/eventos')
+@respuesta_condicional(version_datos)
 def get_eventos():
     """
-    API para obtener los eventos de equipaje.
+    API para obtener los eventos de equipaje, del más reciente al más antiguo.
+    
+    Parámetros de consulta opcionales:
+        limit: tamaño de página (100 por defecto).
+        cursor: valor de la cabecera X-Cursor-Siguiente de la página anterior.
+        since_id: solo eventos con id mayor al indicado (insertados después).
+        estado, aeropuerto, desde, hasta, prefijo: filtros (ver leer_filtros).
     
     Returns:
-        json: Lista de eventos en formato JSON.
+        json: Lista de eventos en formato JSON. Si la página está completa, la cabecera
+        X-Cursor-Siguiente contiene el cursor de la página siguiente.
     """
     try:
-        resultado = obtener_eventos(limit=100)
-        return jsonify(resultado)
+        try:
+            limite = leer_limite(100)
+            filtros = leer_filtros()
+            cursor = request.args.get('cursor')
+            antes = decodificar_cursor(cursor, (int, int)) if cursor else None
+            since_id = request.args.get('since_id', type=int)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        resultado = obtener_repositorio().obtener_eventos(
+            limit=limite, antes=antes, since_id=since_id, filtros=filtros)
+        respuesta = jsonify(resultado)
+        # Sin marca de tiempo (datos históricos ilegibles) no hay página siguiente
+        if len(resultado) == limite and resultado[-1]['timestamp_ms'] is not None:
+            ultimo = resultado[-1]
+            respuesta.headers['X-Cursor-Siguiente'] = codificar_cursor(
+                [ultimo['timestamp_ms'], ultimo['id']])
+        return respuesta
     except Exception as e:
         logger.error(f"Error al obtener eventos: {e}")
         return jsonify({'error': str(e)}), 500
 
 @api_bp.route('/estadisticas')
+@respuesta_condicional(version_estadisticas)
 def get_estadisticas():
     """
     API para obtener estadísticas de eventos.
@@ -70,7 +249,7 @@ def get_estadisticas():
         json: Estadísticas en formato JSON.
     """
     try:
-        resultado = obtener_estadisticas()
+        resultado = obtener_repositorio().obtener_estadisticas()
         return jsonify(resultado)
     except Exception as e:
         logger.error(f"Error al obtener estadísticas: {e}")
@@ -88,23 +267,71 @@ def get_valija(id_valija):
         json: Historial de eventos de la valija en formato JSON.
     """
     try:
-        resultado = obtener_valija(id_valija)
+        resultado = obtener_repositorio().obtener_valija(id_valija)
         return jsonify(resultado)
     except Exception as e:
         logger.error(f"Error al obtener información de valija {id_valija}: {e}")
         return jsonify({'error': str(e)}), 500
 
+@api_bp.route('/valijas/historial', methods=['POST'])
+def get_historial_valijas():
+    """
+    API para obtener el historial de varias valijas en una sola petición.
+    Recibe un JSON {"ids": [...], "latest_only": true|false}.
+    
+    Returns:
+        json: {id_valija: lista de eventos} o, con latest_only, {id_valija: último evento}.
+    """
+    try:
+        datos = request.get_json(silent=True) or {}
+        ids = datos.get('ids')
+        if not isinstance(ids, list) or not all(isinstance(i, str) for i in ids):
+            return jsonify({'error': "Se esperaba una lista de IDs en 'ids'"}), 400
+        if len(ids) > Config.MAX_VALIJAS_HISTORIAL:
+            return jsonify({
+                'error': f"Se admiten como máximo {Config.MAX_VALIJAS_HISTORIAL} valijas por consulta"
+            }), 413
+        
+        resultado = obtener_repositorio().obtener_historial_valijas(
+            ids, solo_ultimo=bool(datos.get('latest_only')))
+        return jsonify(resultado)
+    except Exception as e:
+        logger.error(f"Error al obtener historial de valijas: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @api_bp.route('/valijas')
+@respuesta_condicional(version_datos)
 def get_valijas():
     """
-    API para obtener la lista de todas las valijas.
+    API para obtener la lista de valijas con su estado actual, de la más reciente a la más antigua.
+    
+    Parámetros de consulta opcionales:
+        limit: tamaño de página (sin límite por defecto).
+        cursor: valor de la cabecera X-Cursor-Siguiente de la página anterior.
+        estado, aeropuerto, desde, hasta, prefijo: filtros (ver leer_filtros).
     
     Returns:
-        json: Lista de valijas en formato JSON.
+        json: Lista de valijas en formato JSON. Si la página está completa, la cabecera
+        X-Cursor-Siguiente contiene el cursor de la página siguiente.
     """
     try:
-        resultado = obtener_todas_valijas()
-        return jsonify(resultado)
+        try:
+            limite = leer_limite(None)
+            filtros = leer_filtros()
+            cursor = request.args.get('cursor')
+            antes = decodificar_cursor(cursor, (int, str)) if cursor else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        resultado = obtener_repositorio().obtener_todas_valijas(
+            limit=limite, antes=antes, filtros=filtros)
+        respuesta = jsonify(resultado)
+        if (limite is not None and len(resultado) == limite and
+                resultado[-1]['ultimo_evento_ms'] is not None):
+            ultimo = resultado[-1]
+            respuesta.headers['X-Cursor-Siguiente'] = codificar_cursor(
+                [ultimo['ultimo_evento_ms'], ultimo['id_valija']])
+        return respuesta
     except Exception as e:
         logger.error(f"Error al obtener lista de valijas: {e}")
         return jsonify({'error': str(e)}), 500
@@ -136,18 +363,16 @@ def agregar_equipaje():
         # Usar timestamp proporcionado o generar uno nuevo
         if not timestamp:
             timestamp = get_datetime_argentina().isoformat()
+        try:
+            timestamp_ms = timestamp_a_epoch_ms(timestamp)
+        except ValueError:
+            return jsonify({'error': f"Timestamp inválido: {timestamp}"}), 400
         
         # Insertar en la base de datos
-        insertar_evento(id_valija, evento, origen, destino, float(peso), timestamp)
-        # Publicar evento en Kafka
-        publicar_evento_equipaje({
-            'equipaje_id': id_valija,
-            'estado': evento,
-            'timestamp': int(get_datetime_argentina().timestamp()),
-            'origen': origen,
-            'destino': destino,
-            'peso': float(peso)
-        })
+        obtener_repositorio().insertar_evento(id_valija, evento, origen, destino, float(peso), timestamp)
+        # Publicar evento en Kafka (con el outbox activo lo publica el relay)
+        if not outbox_activo():
+            publicar_evento_equipaje(mensaje_kafka(id_valija, evento, timestamp_ms, origen, destino, peso))
         # Agregar a simulador para cambio de estado automático
         agregar_valija_a_simulador(id_valija, origen, destino, float(peso), evento)
         
@@ -184,7 +409,7 @@ def agregar_evento():
             return jsonify({'error': 'Faltan datos obligatorios'}), 400
         
         # Verificar que la valija existe
-        valija_eventos = obtener_valija(id_valija)
+        valija_eventos = obtener_repositorio().obtener_valija(id_valija)
         
         if not valija_eventos:
             return jsonify({'error': 'No se encontró la valija especificada'}), 404
@@ -198,18 +423,16 @@ def agregar_evento():
         # Usar timestamp proporcionado o generar uno nuevo
         if not timestamp:
             timestamp = get_datetime_argentina().isoformat()
+        try:
+            timestamp_ms = timestamp_a_epoch_ms(timestamp)
+        except ValueError:
+            return jsonify({'error': f"Timestamp inválido: {timestamp}"}), 400
         
         # Insertar nuevo evento
-        insertar_evento(id_valija, evento, origen, destino, peso, timestamp)
-        # Publicar evento en Kafka
-        publicar_evento_equipaje({
-            'equipaje_id': id_valija,
-            'estado': evento,
-            'timestamp': int(get_datetime_argentina().timestamp()),
-            'origen': origen,
-            'destino': destino,
-            'peso': float(peso)
-        })
+        obtener_repositorio().insertar_evento(id_valija, evento, origen, destino, peso, timestamp)
+        # Publicar evento en Kafka (con el outbox activo lo publica el relay)
+        if not outbox_activo():
+            publicar_evento_equipaje(mensaje_kafka(id_valija, evento, timestamp_ms, origen, destino, peso))
         # Agregar a simulador para cambio de estado automático si corresponde
         agregar_valija_a_simulador(id_valija, origen, destino, float(peso), evento)
         
@@ -227,7 +450,248 @@ def agregar_evento():
         logger.error(f"Error al agregar evento: {e}")
         return jsonify({'error': str(e)}), 500
 
+def validar_evento_lote(item):
+    """
+    Valida y normaliza un evento recibido en un lote.
+    
+    Args:
+        item (dict): Evento tal como llegó en el JSON.
+        
+    Returns:
+        tuple: (evento normalizado, None) si es válido, o (None, mensaje de error).
+    """
+    if not isinstance(item, dict):
+        return None, 'El evento debe ser un objeto JSON'
+    
+    evento = item.get('evento')
+    origen = item.get('origen')
+    destino = item.get('destino')
+    peso = item.get('peso')
+    if not evento or not origen or not destino or peso in (None, ''):
+        return None, 'Faltan datos obligatorios (evento, origen, destino, peso)'
+    
+    try:
+        peso = float(peso)
+    except (TypeError, ValueError):
+        return None, f"Peso inválido: {peso}"
+    
+    timestamp = item.get('timestamp') or get_datetime_argentina().isoformat()
+    try:
+        timestamp_ms = timestamp_a_epoch_ms(timestamp)
+    except ValueError:
+        return None, f"Timestamp inválido: {timestamp}"
+    
+    # Generar ID de valija único si no se indica uno existente
+    import uuid
+    return {
+        'id_valija': str(item.get('id_valija') or uuid.uuid4()),
+        'evento': str(evento),
+        'origen': str(origen),
+        'destino': str(destino),
+        'peso': peso,
+        'timestamp': timestamp,
+        'timestamp_ms': timestamp_ms
+    }, None
+
+@api_bp.route('/eventos/lote', methods=['POST'])
+def agregar_eventos_lote():
+    """
+    API para agregar un lote de eventos en una única transacción.
+    Recibe un JSON con una lista de eventos (o un objeto con la clave 'eventos').
+    Los eventos inválidos se informan individualmente sin afectar al resto del lote.
+    
+    Returns:
+        json: Cantidad de eventos insertados, IDs asignados y errores por posición.
+    """
+    try:
+        datos = request.get_json(silent=True)
+        if isinstance(datos, dict):
+            datos = datos.get('eventos')
+        if not isinstance(datos, list) or not datos:
+            return jsonify({'error': 'Se esperaba una lista de eventos en formato JSON'}), 400
+        if len(datos) > Config.MAX_EVENTOS_LOTE:
+            return jsonify({
+                'error': f"El lote supera el máximo de {Config.MAX_EVENTOS_LOTE} eventos"
+            }), 413
+        
+        validos = []
+        indices = []
+        errores = []
+        for indice, item in enumerate(datos):
+            evento, error = validar_evento_lote(item)
+            if error:
+                errores.append({'indice': indice, 'error': error})
+            else:
+                validos.append(evento)
+                indices.append(indice)
+        
+        if not validos:
+            return jsonify({'success': False, 'insertados': 0, 'errores': errores}), 400
+        
+        # Insertar todo el lote en la base de datos
+        if obtener_repositorio().insertar_eventos_lote(validos) < 0:
+            return jsonify({'error': 'No se pudo insertar el lote en la base de datos'}), 500
+        
+        # Publicar el lote completo en Kafka (con el outbox activo queda registrado
+        # en la misma transacción y lo publica el relay)
+        publicado = True
+        if not outbox_activo():
+            try:
+                publicado = publicar_eventos_equipaje([
+                    mensaje_kafka(e['id_valija'], e['evento'], e['timestamp_ms'],
+                                  e['origen'], e['destino'], e['peso'])
+                    for e in validos
+                ])
+            except Exception as kafka_error:
+                logger.error(f"Error al publicar lote en Kafka: {kafka_error}")
+                publicado = False
+        
+        # Agregar a simulador para cambio de estado automático si corresponde
+        for e in validos:
+            agregar_valija_a_simulador(e['id_valija'], e['origen'], e['destino'], e['peso'], e['evento'])
+        
+        return jsonify({
+            'success': True,
+            'insertados': len(validos),
+            'ids': [{'indice': i, 'id_valija': e['id_valija']} for i, e in zip(indices, validos)],
+            'errores': errores,
+            'publicado_kafka': publicado
+        })
+    except Exception as e:
+        logger.error(f"Error al agregar lote de eventos: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def _leer_y_borrar(ruta, tamano=64 * 1024):
+    """Envía un archivo temporal por partes y lo elimina al terminar."""
+    try:
+        with open(ruta, 'rb') as archivo_temporal:
+            while True:
+                datos = archivo_temporal.read(tamano)
+                if not datos:
+                    break
+                yield datos
+    finally:
+        os.remove(ruta)
+
+@api_bp.route('/export')
+def exportar_eventos():
+    """
+    API para exportar el historial de eventos completo, en streaming y con memoria constante.
+    
+    Parámetros de consulta opcionales:
+        formato: 'csv' (por defecto), 'ndjson' o 'parquet' (requiere pandas y pyarrow).
+        estado, aeropuerto, desde, hasta, prefijo: filtros (ver leer_filtros).
+    
+    Returns:
+        Response: Archivo descargable con los eventos en orden de inserción.
+    """
+    try:
+        formato = request.args.get('formato', 'csv').lower()
+        if formato not in exportacion.FORMATOS:
+            return jsonify({
+                'error': f"Formato inválido: {formato}. Opciones: {', '.join(exportacion.FORMATOS)}"
+            }), 400
+        try:
+            filtros = leer_filtros()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        tipo, extension = exportacion.FORMATOS[formato]
+        nombre = f"eventos_{get_datetime_argentina().strftime('%Y%m%d_%H%M%S')}.{extension}"
+        bloques = obtener_repositorio().iterar_eventos(filtros)
+        
+        if formato == 'parquet':
+            if not exportacion.parquet_disponible():
+                return jsonify({'error': 'La exportación a Parquet requiere pandas y pyarrow'}), 501
+            # Parquet escribe sus metadatos al final: generar en un archivo temporal y enviarlo
+            descriptor, ruta = tempfile.mkstemp(suffix='.parquet')
+            os.close(descriptor)
+            try:
+                exportacion.escribir_parquet(bloques, ruta)
+            except Exception:
+                os.remove(ruta)
+                raise
+            contenido = _leer_y_borrar(ruta)
+        elif formato == 'ndjson':
+            contenido = exportacion.generar_ndjson(bloques)
+        else:
+            contenido = exportacion.generar_csv(bloques)
+        
+        respuesta = Response(contenido, mimetype=tipo)
+        respuesta.headers['Content-Disposition'] = f'attachment; filename="{nombre}"'
+        return respuesta
+    except Exception as e:
+        logger.error(f"Error al exportar eventos: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/cache')
+def get_cache():
+    """
+    API para consultar los contadores de la caché de lecturas (aciertos, fallos,
+    descartes e invalidaciones), útiles para ajustar su tamaño y TTL.
+    
+    Returns:
+        json: Habilitación y contadores de cada caché.
+    """
+    try:
+        return jsonify({
+            'habilitada': Config.CACHE_HABILITADA,
+            'caches': obtener_repositorio().estadisticas_cache()
+        })
+    except Exception as e:
+        logger.error(f"Error al obtener estadísticas de la caché: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/kafka')
+def get_kafka():
+    """
+    API para consultar las métricas del productor Kafka: eventos pendientes de
+    confirmación (profundidad de la cola), fallos, descartes, derrames y latencia.
+    Con el outbox activo incluye en 'outbox' el estado del relay y los mensajes
+    que todavía no llegaron a Kafka.
+    
+    Returns:
+        json: Métricas del productor.
+    """
+    try:
+        metricas = metricas_productor()
+        if outbox_activo():
+            metricas['outbox'] = estado_relay()
+        return jsonify(metricas)
+    except Exception as e:
+        logger.error(f"Error al obtener métricas del productor Kafka: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/analitica')
+def get_analitica():
+    """
+    API para consultar la analítica por ventanas de tiempo del consumidor Kafka: volumen,
+    tasa de pérdida y tiempos escaneado→cargado→entregado por aeropuerto o por ruta.
+    Se arma con las ventanas fijas que guarda el consumidor, sin recorrer los eventos.
+    
+    Parámetros de consulta opcionales:
+        dimension: 'ruta' (por defecto) o 'aeropuerto'.
+        minutos: duración de la ventana deslizante (15 por defecto, máximo Config.ANALITICA_MAX_MINUTOS).
+        clave: solo un aeropuerto o una ruta ('Origen → Destino').
+    
+    Returns:
+        json: Ventana deslizante por clave ('deslizante') y totales por ventana fija ('fijas').
+    """
+    try:
+        dimension = request.args.get('dimension', 'ruta')
+        if dimension not in analitica.DIMENSIONES:
+            return jsonify({'error': f"Dimensión inválida: {dimension}"}), 400
+        minutos = request.args.get('minutos', analitica.ANALITICA_VENTANA // 60, type=int)
+        if minutos <= 0:
+            return jsonify({'error': f"Minutos inválidos: {request.args.get('minutos')}"}), 400
+        minutos = min(minutos, Config.ANALITICA_MAX_MINUTOS)
+        return jsonify(analitica.ventanas(ESTADO_DB_PATH, dimension, minutos, request.args.get('clave')))
+    except Exception as e:
+        logger.error(f"Error al obtener la analítica: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @api_bp.route('/simulador/estado')
+@respuesta_condicional(version_simulador)
 def get_simulador_estado():
     """
     API para obtener el estado actual del simulador automático.
@@ -237,17 +701,84 @@ def get_simulador_estado():
     """
     try:
         # Obtener información del simulador
-        return jsonify({
-            'activo': True,
-            'valijas_activas': len(valijas_activas),
-            'max_valijas': Config.MAX_VALIJAS_ACTIVAS,
-            'intervalo_generacion': Config.INTERVALO_GENERACION,
-            'timestamp': get_datetime_argentina().isoformat()
-        })
+        return jsonify(simulador_auto.obtener_estado())
     except Exception as e:
         logger.error(f"Error al obtener estado del simulador: {e}")
         return jsonify({'error': str(e), 'activo': False}), 500
 
+def formatear_sse(tipo, datos, id_mensaje=None):
+    """Serializa un mensaje en el formato de Server-Sent Events."""
+    linea_id = f"id: {id_mensaje}\n" if id_mensaje is not None else ''
+    return f"{linea_id}event: {tipo}\ndata: {json.dumps(datos)}\n\n"
+
+@api_bp.route('/stream')
+def stream():
+    """
+    Stream de Server-Sent Events con las novedades para el dashboard:
+        evento: cada evento insertado.
+        estadisticas: estado completo de las estadísticas (al conectar o reiniciar).
+        estadisticas_delta: variación de las estadísticas por cada inserción.
+        simulador: estado del simulador cuando cambian sus valijas activas.
+        reinicio: el cliente debe recargar eventos recientes (no se pudo reanudar).
+    Al reconectarse, el navegador envía Last-Event-ID y se reenvían los mensajes perdidos.
+    
+    Returns:
+        Response: Stream text/event-stream, o 503 si se alcanzó el máximo de suscriptores.
+    """
+    suscripcion = None
+    try:
+        ultimo_id = request.headers.get('Last-Event-ID', type=int)
+        suscripcion = centro_notificaciones.suscribir(ultimo_id)
+        if suscripcion is None:
+            respuesta = jsonify({'error': 'Demasiadas conexiones al stream, usar polling'})
+            respuesta.status_code = 503
+            respuesta.headers['Retry-After'] = str(Config.SSE_HEARTBEAT)
+            return respuesta
+        
+        # Estado inicial: se calcula antes de empezar a transmitir para no retener
+        # una conexión del pool durante toda la vida del stream
+        iniciales = []
+        if ultimo_id is None or suscripcion.reiniciar:
+            if suscripcion.reiniciar:
+                iniciales.append(formatear_sse('reinicio', {}))
+                suscripcion.reiniciar = False
+            iniciales.append(formatear_sse('estadisticas', obtener_repositorio().obtener_estadisticas()))
+            iniciales.append(formatear_sse('simulador', simulador_auto.obtener_estado()))
+    except Exception as e:
+        logger.error(f"Error al abrir el stream: {e}")
+        if suscripcion is not None:
+            # Liberar el lugar: la respuesta de error no transmite el stream
+            centro_notificaciones.cancelar(suscripcion)
+        return jsonify({'error': str(e)}), 500
+    
+    def generar():
+        try:
+            # Indicar al navegador cuánto esperar antes de reconectarse
+            yield 'retry: 3000\n\n'
+            yield from iniciales
+            while True:
+                mensaje = suscripcion.siguiente(Config.SSE_HEARTBEAT)
+                if suscripcion.reiniciar:
+                    # La cola se desbordó: el cliente recarga el estado por la API
+                    suscripcion.reiniciar = False
+                    yield formatear_sse('reinicio', {})
+                if mensaje is None:
+                    yield ': heartbeat\n\n'
+                    continue
+                id_mensaje, tipo, datos = mensaje
+                yield formatear_sse(tipo, datos, id_mensaje)
+        finally:
+            centro_notificaciones.cancelar(suscripcion)
+    
+    respuesta = Response(generar(), mimetype='text/event-stream')
+    # Si el cliente se desconecta antes de la primera lectura, el finally de generar()
+    # nunca se ejecuta: liberar también el lugar al cerrar la respuesta
+    respuesta.call_on_close(lambda: centro_notificaciones.cancelar(suscripcion))
+    respuesta.headers['Cache-Control'] = 'no-cache'
+    # Evitar que proxies como nginx acumulen el stream
+    respuesta.headers['X-Accel-Buffering'] = 'no'
+    return respuesta
+
 @api_bp.route('/simulador/valijas_activas')
 def get_simulador_valijas():
     """
@@ -0,0 +1,32 @@
+"""
+Script para archivar las valijas completadas (entregadas o perdidas) hace más de N días
+en archivos SQLite mensuales, manteniendo chica la tabla que consulta el dashboard.
+Uso: python src/core/archivar.py [dias]
+"""
+import os
+import sys
+
+# Ajustar el path para las importaciones
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.core.config import Config
+from src.core.db_service import DB_PATH, inicializar_db, archivar_valijas_completadas
+
+if not os.path.exists(DB_PATH):
+    print(f"No se encontró la base de datos en {DB_PATH}")
+    exit(1)
+
+dias = int(sys.argv[1]) if len(sys.argv) > 1 else Config.ARCHIVO_DIAS
+
+# Asegurar que el esquema esté actualizado antes de archivar
+inicializar_db()
+
+resultado = archivar_valijas_completadas(dias)
+if resultado is None:
+    print("Error al archivar valijas completadas")
+    exit(1)
+
+if not resultado:
+    print(f"No hay valijas completadas hace más de {dias} días")
+for mes, cantidad in resultado.items():
+    print(f"{mes}: {cantidad} valijas archivadas")
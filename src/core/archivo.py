@@ -0,0 +1,253 @@
+"""
+Módulo de archivo histórico de equipajes.
+Mueve los eventos de valijas completadas (entregadas o perdidas) hace más de N días
+desde eventos_equipaje a un archivo SQLite por mes, que se adjunta (ATTACH) solo
+cuando se necesita. La tabla valija_archivada del archivo principal indica en qué
+meses quedó cada valija (una valija que recibe eventos después de archivada puede
+archivarse de nuevo en otro mes), para que las consultas históricas abran solo esos archivos.
+"""
+
+import os
+import logging
+from collections import Counter
+from datetime import datetime
+
+from src.core import estadisticas
+from src.core.config import Config
+
+logger = logging.getLogger('archivo')
+
+# Estados que cierran el ciclo de una valija
+ESTADOS_FINALES = ('equipaje_entregado', 'equipaje_perdido')
+
+COLUMNAS_EVENTO = 'id, id_valija, evento, timestamp, timestamp_ms, origen, destino, peso'
+
+# Máximo de IDs por consulta IN (...), por debajo del límite de parámetros de SQLite
+TAMANO_BLOQUE_IDS = 500
+
+def crear_tabla_catalogo(conn):
+    """
+    Crea la tabla que registra en qué archivo mensual quedó cada valija
+    (versión original, con un único mes por valija; ver catalogo_por_mes).
+
+    Args:
+        conn (sqlite3.Connection): Conexión a la base de datos principal.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS valija_archivada (
+            id_valija TEXT PRIMARY KEY,
+            mes TEXT NOT NULL
+        )
+    ''')
+
+def catalogo_por_mes(conn):
+    """
+    Cambia la clave del catálogo a (id_valija, mes), para registrar todos los meses
+    en los que se archivaron eventos de una misma valija. Debe ejecutarse dentro de
+    una transacción.
+
+    Args:
+        conn (sqlite3.Connection): Conexión a la base de datos principal.
+    """
+    conn.execute('''
+        CREATE TABLE valija_archivada_mes (
+            id_valija TEXT NOT NULL,
+            mes TEXT NOT NULL,
+            PRIMARY KEY (id_valija, mes)
+        )
+    ''')
+    conn.execute('INSERT INTO valija_archivada_mes (id_valija, mes) SELECT id_valija, mes FROM valija_archivada')
+    conn.execute('DROP TABLE valija_archivada')
+    conn.execute('ALTER TABLE valija_archivada_mes RENAME TO valija_archivada')
+
+def meses_archivados(conn, id_valija):
+    """Meses ('AAAA_MM') en los que se archivaron eventos de una valija."""
+    return [fila[0] for fila in conn.execute(
+        'SELECT mes FROM valija_archivada WHERE id_valija = ? ORDER BY mes', (id_valija,)
+    ).fetchall()]
+
+def ruta_archivo(mes):
+    """Ruta del archivo SQLite correspondiente a un mes ('AAAA_MM')."""
+    return os.path.join(Config.ARCHIVO_DIR, f'equipajes_{mes}.db')
+
+def _mes_de(timestamp_ms):
+    """Mes ('AAAA_MM', hora de Argentina) al que pertenece una marca de tiempo."""
+    return datetime.fromtimestamp(timestamp_ms / 1000, Config.ZONA_HORARIA).strftime('%Y_%m')
+
+def _adjuntar(conn, mes, alias):
+    """Adjunta el archivo de un mes a la conexión y crea su esquema si es nuevo."""
+    os.makedirs(Config.ARCHIVO_DIR, exist_ok=True)
+    conn.execute('ATTACH DATABASE ? AS ' + alias, (ruta_archivo(mes),))
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {alias}.eventos_equipaje (
+            id INTEGER PRIMARY KEY,
+            id_valija TEXT NOT NULL,
+            evento TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            timestamp_ms INTEGER,
+            origen TEXT,
+            destino TEXT,
+            peso REAL
+        )
+    ''')
+    conn.execute(
+        f'CREATE INDEX IF NOT EXISTS {alias}.idx_valija_timestamp_ms '
+        f'ON eventos_equipaje (id_valija, timestamp_ms)'
+    )
+
+def archivar_valijas_completadas(conn, dias, ahora_ms):
+    """
+    Mueve al archivo mensual los eventos de las valijas completadas hace más de `dias` días.
+    Cada mes se procesa en su propia transacción; la copia es idempotente (INSERT OR IGNORE),
+    por lo que una ejecución interrumpida puede repetirse sin duplicar eventos.
+    Los contadores de estadísticas se descuentan para reflejar solo la tabla en vivo.
+
+    Args:
+        conn (sqlite3.Connection): Conexión a la base de datos principal (fuera de transacción).
+        dias (int): Antigüedad mínima, en días, del último evento de la valija.
+        ahora_ms (int): Hora actual en epoch ms.
+
+    Returns:
+        dict: Cantidad de valijas archivadas por mes ('AAAA_MM').
+    """
+    limite_ms = ahora_ms - dias * 24 * 60 * 60 * 1000
+    finales = ', '.join('?' for _ in ESTADOS_FINALES)
+    candidatas = conn.execute(
+        f'''
+        SELECT id_valija, ultimo_evento_ms, id_ultimo_evento FROM valija_estado
+        WHERE estado IN ({finales}) AND ultimo_evento_ms < ?
+        ''',
+        (*ESTADOS_FINALES, limite_ms)
+    ).fetchall()
+
+    por_mes = {}
+    for id_valija, ultimo_evento_ms, id_ultimo_evento in candidatas:
+        por_mes.setdefault(_mes_de(ultimo_evento_ms), []).append((id_valija, id_ultimo_evento))
+
+    resultado = {}
+    for mes, ids in sorted(por_mes.items()):
+        _adjuntar(conn, mes, 'archivo')
+        try:
+            with conn:
+                conn.execute('BEGIN IMMEDIATE')
+                conn.execute(
+                    'CREATE TEMP TABLE IF NOT EXISTS valijas_a_archivar '
+                    '(id_valija TEXT PRIMARY KEY, id_ultimo_evento INTEGER)'
+                )
+                conn.execute('DELETE FROM temp.valijas_a_archivar')
+                conn.executemany(
+                    'INSERT INTO temp.valijas_a_archivar (id_valija, id_ultimo_evento) VALUES (?, ?)',
+                    ids
+                )
+                # Las candidatas se leyeron antes del lock: descartar las que recibieron
+                # un evento desde entonces (p. ej. un nuevo escaneo) y siguen en uso
+                conn.execute(
+                    f'''
+                    DELETE FROM temp.valijas_a_archivar WHERE NOT EXISTS (
+                        SELECT 1 FROM main.valija_estado v
+                        WHERE v.id_valija = valijas_a_archivar.id_valija
+                          AND v.id_ultimo_evento = valijas_a_archivar.id_ultimo_evento
+                          AND v.estado IN ({finales}) AND v.ultimo_evento_ms < ?
+                    )
+                    ''',
+                    (*ESTADOS_FINALES, limite_ms)
+                )
+                cantidad = conn.execute('SELECT COUNT(*) FROM temp.valijas_a_archivar').fetchone()[0]
+                seleccion = 'id_valija IN (SELECT id_valija FROM temp.valijas_a_archivar)'
+                conn.execute(
+                    f'''
+                    INSERT OR IGNORE INTO archivo.eventos_equipaje ({COLUMNAS_EVENTO})
+                    SELECT {COLUMNAS_EVENTO} FROM main.eventos_equipaje WHERE {seleccion}
+                    '''
+                )
+                por_tipo = Counter(dict(conn.execute(
+                    f'SELECT evento, COUNT(*) FROM main.eventos_equipaje WHERE {seleccion} GROUP BY evento'
+                ).fetchall()))
+                conn.execute(f'DELETE FROM main.eventos_equipaje WHERE {seleccion}')
+                conn.execute(f'DELETE FROM main.valija_estado WHERE {seleccion}')
+                conn.execute(
+                    '''
+                    INSERT OR IGNORE INTO main.valija_archivada (id_valija, mes)
+                    SELECT id_valija, ? FROM temp.valijas_a_archivar
+                    ''',
+                    (mes,)
+                )
+                estadisticas.descontar_eventos(conn, por_tipo, cantidad)
+        finally:
+            conn.execute('DETACH DATABASE archivo')
+        if cantidad:
+            resultado[mes] = cantidad
+            logger.info(f"Archivadas {cantidad} valijas en {ruta_archivo(mes)}")
+
+    return resultado
+
+def obtener_eventos_archivados(conn, id_valija):
+    """
+    Obtiene los eventos archivados de una valija, de todos los meses en que se archivó.
+
+    Args:
+        conn (sqlite3.Connection): Conexión a la base de datos principal (fuera de transacción).
+        id_valija (str): ID de la valija a consultar.
+
+    Returns:
+        list: Filas de eventos archivados ordenadas por timestamp_ms (vacía si no hay).
+    """
+    eventos = []
+    for mes in meses_archivados(conn, id_valija):
+        if not os.path.exists(ruta_archivo(mes)):
+            continue
+        conn.execute('ATTACH DATABASE ? AS archivo_consulta', (ruta_archivo(mes),))
+        try:
+            eventos.extend(conn.execute(
+                f'''
+                SELECT {COLUMNAS_EVENTO} FROM archivo_consulta.eventos_equipaje
+                WHERE id_valija = ?
+                ''',
+                (id_valija,)
+            ).fetchall())
+        finally:
+            conn.execute('DETACH DATABASE archivo_consulta')
+    eventos.sort(key=lambda e: (e['timestamp_ms'] or 0, e['id']))
+    return eventos
+
+def obtener_eventos_archivados_lote(conn, ids):
+    """
+    Obtiene los eventos archivados de varias valijas, adjuntando una sola vez cada mes
+    (una valija archivada en varios meses aparece en cada uno).
+
+    Args:
+        conn (sqlite3.Connection): Conexión a la base de datos principal (fuera de transacción).
+        ids (list): IDs de las valijas a consultar.
+
+    Returns:
+        list: Filas de eventos archivados (en cualquier orden).
+    """
+    por_mes = {}
+    for inicio in range(0, len(ids), TAMANO_BLOQUE_IDS):
+        bloque = ids[inicio:inicio + TAMANO_BLOQUE_IDS]
+        filas = conn.execute(
+            f"SELECT id_valija, mes FROM valija_archivada "
+            f"WHERE id_valija IN ({', '.join('?' for _ in bloque)})",
+            bloque
+        ).fetchall()
+        for id_valija, mes in filas:
+            por_mes.setdefault(mes, []).append(id_valija)
+
+    eventos = []
+    for mes, ids_mes in por_mes.items():
+        if not os.path.exists(ruta_archivo(mes)):
+            continue
+        conn.execute('ATTACH DATABASE ? AS archivo_consulta', (ruta_archivo(mes),))
+        try:
+            for inicio in range(0, len(ids_mes), TAMANO_BLOQUE_IDS):
+                bloque = ids_mes[inicio:inicio + TAMANO_BLOQUE_IDS]
+                eventos.extend(conn.execute(
+                    f"""
+                    SELECT {COLUMNAS_EVENTO} FROM archivo_consulta.eventos_equipaje
+                    WHERE id_valija IN ({', '.join('?' for _ in bloque)})
+                    """,
+                    bloque
+                ).fetchall())
+        finally:
+            conn.execute('DETACH DATABASE archivo_consulta')
+    return eventos
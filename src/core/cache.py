@@ -0,0 +1,116 @@
+"""
+Caché LRU con vencimiento (TTL) para las lecturas de la API.
+Cada entrada vence a los `ttl` segundos y, al superar `max_entradas`, se descarta
+la menos usada. Si varios hilos piden a la vez una clave ausente, solo uno la
+calcula y el resto espera su resultado (protección contra estampida).
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger('cache')
+
+class CacheLRU:
+    """Caché LRU con TTL, segura para múltiples hilos."""
+
+    def __init__(self, nombre, max_entradas, ttl):
+        self.nombre = nombre
+        self._max_entradas = max_entradas
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()   # clave -> (vencimiento, valor), la más usada al final
+        self._en_calculo = {}            # clave -> threading.Event del hilo que la calcula
+        # Se incrementa en cada invalidación: un cálculo iniciado antes no se guarda
+        self._generacion = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.descartes = 0
+        self.invalidaciones = 0
+
+    def obtener(self, clave, calcular):
+        """
+        Devuelve el valor en caché para `clave` o lo calcula con `calcular()`.
+        El valor devuelto es compartido: no debe modificarse.
+
+        Args:
+            clave (tuple): Clave hashable de la consulta.
+            calcular (callable): Función sin argumentos que obtiene el valor.
+
+        Returns:
+            object: Valor de la consulta.
+        """
+        while True:
+            with self._lock:
+                entrada = self._entradas.get(clave)
+                if entrada is not None:
+                    if entrada[0] > time.monotonic():
+                        self._entradas.move_to_end(clave)
+                        self.aciertos += 1
+                        return entrada[1]
+                    del self._entradas[clave]
+                
+                en_calculo = self._en_calculo.get(clave)
+                if en_calculo is None:
+                    # Este hilo calcula la clave; los demás esperan su resultado
+                    en_calculo = threading.Event()
+                    self._en_calculo[clave] = en_calculo
+                    generacion = self._generacion
+                    self.fallos += 1
+                    break
+            # Otro hilo la está calculando: esperar y volver a buscar
+            en_calculo.wait()
+        
+        try:
+            valor = calcular()
+            with self._lock:
+                if generacion == self._generacion:
+                    self._entradas[clave] = (time.monotonic() + self._ttl, valor)
+                    self._entradas.move_to_end(clave)
+                    while len(self._entradas) > self._max_entradas:
+                        self._entradas.popitem(last=False)
+                        self.descartes += 1
+            return valor
+        finally:
+            with self._lock:
+                del self._en_calculo[clave]
+            en_calculo.set()
+
+    def invalidar(self, claves=None):
+        """
+        Elimina entradas de la caché.
+
+        Args:
+            claves (iterable, optional): Claves a eliminar. Si es None, se vacía la caché.
+        """
+        with self._lock:
+            self._generacion += 1
+            self.invalidaciones += 1
+            if claves is None:
+                self._entradas.clear()
+            else:
+                for clave in claves:
+                    self._entradas.pop(clave, None)
+
+    def estadisticas(self):
+        """
+        Contadores de uso para ajustar el tamaño y el TTL.
+
+        Returns:
+            dict: Entradas actuales, aciertos, fallos, tasa de aciertos, descartes por
+            tamaño e invalidaciones.
+        """
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'nombre': self.nombre,
+                'entradas': len(self._entradas),
+                'max_entradas': self._max_entradas,
+                'ttl': self._ttl,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': round(self.aciertos / consultas, 4) if consultas else None,
+                'descartes': self.descartes,
+                'invalidaciones': self.invalidaciones
+            }
@@ -4,6 +4,7 @@ Contiene todas las configuraciones y constantes utilizadas en el sistema.
 """
 
 import os
+import math
 import pytz
 import logging
 from datetime import datetime
@@ -35,25 +36,68 @@ class Config:
     # MODIFICADO: Usar solamente la base de datos en data/equipajes.db para evitar inconsistencias
     DB_PATH = os.path.join(BASE_DIR, 'data', 'equipajes.db')
     
-    # Crear directorio data si no existe
-    os.makedirs(os.path.join(BASE_DIR, 'data'), exist_ok=True)
-    
-    # Si existe la DB en la raíz pero no en data/, copiarla a data/ (migración)
+    # Base de datos de versiones anteriores, en la raíz del proyecto (ver preparar_directorio_datos)
     ROOT_DB_PATH = os.path.join(BASE_DIR, 'equipajes.db')
-    if os.path.exists(ROOT_DB_PATH) and not os.path.exists(DB_PATH):
-        import shutil
-        try:
-            shutil.copy2(ROOT_DB_PATH, DB_PATH)
-            logger.info(f"Base de datos migrada de raíz a data/: {DB_PATH}")
-        except Exception as e:
-            logger.error(f"Error al migrar la base de datos: {e}")
     
-    logger.info(f"Usando base de datos en: {DB_PATH}")
+    # Motor de almacenamiento de eventos: 'sqlite' (por defecto) o 'memoria' (sin disco,
+    # para pruebas de carga y benchmarks). Ver src/core/repositorio.py
+    BACKEND_ALMACENAMIENTO = os.environ.get('BACKEND_ALMACENAMIENTO', 'sqlite')
+    
+    # Caché de lecturas de la API delante del motor de almacenamiento (ver src/core/cache.py)
+    CACHE_HABILITADA = os.environ.get('CACHE_API', 'True') == 'True'
+    CACHE_MAX_ENTRADAS = 512       # Entradas por caché antes de descartar las menos usadas
+    CACHE_TTL = 30                 # Segundos de validez de una entrada aunque no haya escrituras
+    
+    # Serialización y compresión de respuestas de la API (ver src/api/respuestas.py)
+    JSON_RAPIDO = os.environ.get('JSON_RAPIDO', 'True') == 'True'   # orjson si está instalado
+    GZIP_MIN_BYTES = 1024          # Respuestas más chicas se envían sin comprimir (0 desactiva)
+    GZIP_NIVEL = 3                 # Buen equilibrio: el nivel 6 reduce ~10% más al doble de CPU
+    
+    # Configuración de conexiones SQLite (pool y pragmas)
+    DB_POOL_SIZE = 8               # Conexiones reutilizables para las peticiones Flask
+    DB_BUSY_TIMEOUT_MS = 5000      # Espera máxima ante bloqueos de escritura
+    DB_SYNCHRONOUS = 'NORMAL'      # Seguro con WAL y mucho más rápido que FULL
+    DB_CACHE_SIZE_KB = 16384       # Caché de páginas por conexión (16 MB)
+    DB_MMAP_SIZE = 64 * 1024 * 1024  # Lecturas mapeadas en memoria (64 MB)
+    
+    # Archivo histórico: valijas completadas hace más de ARCHIVO_DIAS días se mueven
+    # a un archivo SQLite por mes en ARCHIVO_DIR (ver src/core/archivar.py)
+    ARCHIVO_DIR = os.path.join(BASE_DIR, 'data', 'archivo')
+    ARCHIVO_DIAS = 30
     
     # Configuración del simulador
     INTERVALO_GENERACION = 30  # Generar nuevo evento cada X segundos
     MAX_VALIJAS_ACTIVAS = 10   # Máximo de valijas activas simultáneamente
     
+    # Tamaño máximo de un lote en POST /api/eventos/lote
+    MAX_EVENTOS_LOTE = 1000
+    
+    # Tamaño máximo de página en /api/eventos y /api/valijas
+    MAX_LIMITE_PAGINA = 1000
+    
+    # Filas leídas por bloque (fetchmany) al exportar eventos (GET /api/export y src/core/exportar.py)
+    EXPORT_TAMANO_BLOQUE = 5000
+    
+    # Máximo de valijas por consulta en POST /api/valijas/historial
+    MAX_VALIJAS_HISTORIAL = 5000
+    
+    # Stream de notificaciones en tiempo real (GET /api/stream)
+    SSE_MAX_SUSCRIPTORES = 50      # Conexiones simultáneas; el resto recibe 503 y usa polling
+    SSE_HISTORIAL = 1000           # Mensajes recientes retenidos para reanudar con Last-Event-ID
+    SSE_COLA_SUSCRIPTOR = 500      # Mensajes pendientes por suscriptor antes de forzar un reinicio
+    SSE_HEARTBEAT = 15             # Segundos entre comentarios de keep-alive
+    
+    # Outbox transaccional hacia Kafka (ver src/core/outbox.py y src/eda/relay_outbox.py)
+    OUTBOX_HABILITADO = os.environ.get('OUTBOX_KAFKA', 'True') == 'True'
+    OUTBOX_TAMANO_LOTE = 500       # Mensajes publicados por ciclo del relay
+    OUTBOX_INTERVALO = 0.5         # Segundos de espera cuando no hay mensajes pendientes
+    OUTBOX_ESPERA_MAX = 30         # Espera máxima entre reintentos si el broker no responde
+    OUTBOX_TIMEOUT_ENVIO = 10      # Segundos para que el broker confirme un lote
+    OUTBOX_RETENCION_HORAS = 24    # Los mensajes enviados se purgan pasado este tiempo
+    
+    # Analítica por ventanas del consumidor Kafka (GET /api/analitica, ver src/eda/analitica.py)
+    ANALITICA_MAX_MINUTOS = 24 * 60    # Duración máxima de la ventana consultada
+    
     # Lista de aeropuertos disponibles
     AEROPUERTOS = [
         'EZE - Buenos Aires', 'AEP - Buenos Aires', 'COR - Córdoba', 
@@ -67,10 +111,68 @@ class Config:
     PORT = 5000
 
 # Funciones de utilidad
+def preparar_directorio_datos(db_path=None):
+    """
+    Crea el directorio de la base de datos y, si existe la DB en la raíz del proyecto
+    pero no en data/, la copia a data/ (migración). Se ejecuta al abrir la primera
+    conexión, no al importar la configuración.
+    
+    Args:
+        db_path (str, optional): Ruta de la base de datos. Por defecto Config.DB_PATH.
+    """
+    db_path = db_path or Config.DB_PATH
+    db_dir = os.path.dirname(db_path)
+    if not os.path.exists(db_dir):
+        os.makedirs(db_dir, exist_ok=True)
+        logger.info(f"Creado directorio para la base de datos: {db_dir}")
+    if db_path == Config.DB_PATH and os.path.exists(Config.ROOT_DB_PATH) and not os.path.exists(db_path):
+        import shutil
+        try:
+            shutil.copy2(Config.ROOT_DB_PATH, db_path)
+            logger.info(f"Base de datos migrada de raíz a data/: {db_path}")
+        except Exception as e:
+            logger.error(f"Error al migrar la base de datos: {e}")
+
 def get_datetime_argentina():
     """Retorna el datetime actual en la zona horaria de Argentina"""
     return datetime.now(Config.ZONA_HORARIA)
 
+# Mayor marca de tiempo representable con datetime (9999-12-31 23:59:59.999 UTC)
+EPOCH_MS_MAX = 253402300799999
+
+def timestamp_a_epoch_ms(valor):
+    """
+    Convierte una marca de tiempo a milisegundos desde epoch (UTC).
+    Acepta datetime, texto ISO 8601 o un número epoch (en segundos o milisegundos).
+    Las marcas sin zona horaria se interpretan en la hora de Argentina.
+    
+    Raises:
+        ValueError: Si el valor no se puede interpretar como marca de tiempo
+            (incluidos los números no finitos o fuera del rango de datetime).
+    """
+    if isinstance(valor, datetime):
+        dt = valor
+    else:
+        texto = str(valor).strip()
+        try:
+            numero = float(texto)
+        except ValueError:
+            if texto.endswith('Z'):
+                texto = texto[:-1] + '+00:00'
+            dt = datetime.fromisoformat(texto)
+        else:
+            # Valores chicos se asumen en segundos, el resto en milisegundos
+            if not math.isfinite(numero):
+                raise ValueError(f"Marca de tiempo no finita: {texto}")
+            ms = int(round(numero * 1000)) if abs(numero) < 1e11 else int(numero)
+            if abs(ms) > EPOCH_MS_MAX:
+                raise ValueError(f"Marca de tiempo fuera de rango: {texto}")
+            return ms
+    
+    if dt.tzinfo is None:
+        dt = Config.ZONA_HORARIA.localize(dt)
+    return int(round(dt.timestamp() * 1000))
+
 # Registrar información sobre la configuración
 if Config.ON_PYTHONANYWHERE:
     logger.info(f"Ejecutando en PythonAnywhere. DB_PATH: {Config.DB_PATH}")
@@ -5,12 +5,18 @@ Este módulo proporciona funciones para realizar operaciones CRUD en la base de
 
 import sqlite3
 import os
+import time
+import queue
 import logging
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime
 import pytz
+from flask import g, has_app_context
 
 # Importar la configuración centralizada
-from src.core.config import Config
+from src.core.config import Config, preparar_directorio_datos, timestamp_a_epoch_ms
+from src.core import archivo, estadisticas, notificaciones, outbox
+from src.core.migraciones import aplicar_migraciones, poblar_valija_estado
 
 logger = logging.getLogger('db-service')
 
@@ -26,60 +32,204 @@ def get_datetime_argentina():
 DB_PATH = Config.DB_PATH
 logger.info(f"Base de datos configurada en: {DB_PATH}")
 
+class PoolConexiones:
+    """
+    Pool de conexiones SQLite persistentes.
+    
+    Las conexiones se abren una sola vez con modo WAL y pragmas ajustados, y se
+    reutilizan entre peticiones para evitar el costo de conectar en cada llamada.
+    """
+    
+    def __init__(self, db_path, tamano=Config.DB_POOL_SIZE):
+        self.db_path = db_path
+        self.tamano = tamano
+        self._libres = queue.LifoQueue(maxsize=tamano)
+        self._lock = threading.Lock()
+        self._directorio_verificado = False
+        self._esquema_verificado = False
+    
+    def _verificar_directorio(self):
+        # Verificar si el directorio existe (solo la primera vez)
+        if self._directorio_verificado:
+            return
+        preparar_directorio_datos(self.db_path)
+        self._directorio_verificado = True
+    
+    def _verificar_esquema(self, conn):
+        # La base se crea o actualiza con la primera conexión del proceso, no al importar
+        with self._lock:
+            if self._esquema_verificado:
+                return
+            aplicar_migraciones(conn)
+            self._esquema_verificado = True
+    
+    def crear_conexion(self):
+        """
+        Abre una nueva conexión configurada con WAL y los pragmas del sistema.
+        La primera conexión del pool aplica las migraciones pendientes.
+        
+        Returns:
+            sqlite3.Connection: Conexión lista para usar.
+        """
+        with self._lock:
+            self._verificar_directorio()
+        try:
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=Config.DB_BUSY_TIMEOUT_MS / 1000,
+                check_same_thread=False
+            )
+            conn.row_factory = sqlite3.Row  # Para obtener los resultados como diccionarios
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(f'PRAGMA synchronous={Config.DB_SYNCHRONOUS}')
+            conn.execute(f'PRAGMA cache_size=-{int(Config.DB_CACHE_SIZE_KB)}')
+            conn.execute(f'PRAGMA mmap_size={int(Config.DB_MMAP_SIZE)}')
+            conn.execute(f'PRAGMA busy_timeout={int(Config.DB_BUSY_TIMEOUT_MS)}')
+            if not self._esquema_verificado:
+                self._verificar_esquema(conn)
+            return conn
+        except Exception as e:
+            logger.error(f"Error crítico al conectar a la base de datos {self.db_path}: {e}")
+            raise
+    
+    def obtener(self):
+        """Toma una conexión libre del pool o abre una nueva si no hay disponibles."""
+        try:
+            return self._libres.get_nowait()
+        except queue.Empty:
+            return self.crear_conexion()
+    
+    def devolver(self, conn):
+        """Devuelve una conexión al pool; si está lleno, la cierra."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self._libres.put_nowait(conn)
+        except (queue.Full, sqlite3.Error):
+            conn.close()
+    
+    def cerrar_todas(self):
+        """Cierra todas las conexiones libres del pool."""
+        while True:
+            try:
+                self._libres.get_nowait().close()
+            except queue.Empty:
+                break
+
+# Pool compartido y conexiones propias de hilos fuera de Flask (p. ej. el simulador)
+_pool = PoolConexiones(DB_PATH)
+_local = threading.local()
+
 def get_db_connection():
     """
-    Establece una conexión con la base de datos SQLite.
+    Obtiene una conexión persistente con la base de datos SQLite.
+    
+    Dentro de un contexto de aplicación Flask la conexión se toma del pool y se
+    libera al terminar el contexto (ver registrar_teardown). Fuera de Flask,
+    cada hilo conserva su propia conexión durante toda su vida.
+    No se debe cerrar la conexión devuelta.
     
     Returns:
         sqlite3.Connection: Objeto de conexión a la base de datos.
     """
-    # Verificar si el directorio existe
-    db_dir = os.path.dirname(DB_PATH)
-    if not os.path.exists(db_dir):
-        os.makedirs(db_dir, exist_ok=True)
-        logger.info(f"Creado directorio para la base de datos: {db_dir}")
+    if has_app_context():
+        if '_db_conn' not in g:
+            g._db_conn = _pool.obtener()
+        return g._db_conn
     
-    # Conectar a la base de datos única en data/equipajes.db
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row  # Para obtener los resultados como diccionarios
-        return conn
-    except Exception as e:
-        logger.error(f"Error crítico al conectar a la base de datos {DB_PATH}: {e}")
-        raise
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = _pool.crear_conexion()
+        _local.conn = conn
+    return conn
+
+def liberar_db_connection(exception=None):
+    """Devuelve al pool la conexión del contexto de aplicación actual."""
+    conn = g.pop('_db_conn', None)
+    if conn is not None:
+        _pool.devolver(conn)
+
+def cerrar_db_connection_hilo():
+    """Cierra la conexión persistente del hilo actual (fuera de Flask)."""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+def registrar_teardown(app):
+    """
+    Registra la liberación de conexiones en el ciclo de vida de la app Flask.
+    
+    Args:
+        app (Flask): Aplicación Flask.
+    """
+    app.teardown_appcontext(liberar_db_connection)
 
 def inicializar_db():
     """
-    Inicializa la base de datos si no existe.
-    Crea la tabla de eventos_equipaje.
+    Inicializa la base de datos si no existe y aplica las migraciones pendientes.
+    Las bases existentes se actualizan a la última versión del esquema.
     
     Returns:
         bool: True si se creó la base de datos, False si ya existía o hubo un error.
     """
     try:
-        if not os.path.exists(DB_PATH):
+        creada = not os.path.exists(DB_PATH)
+        if creada:
             logger.info(f"Creando base de datos {DB_PATH}")
-            conn = get_db_connection()
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS eventos_equipaje (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    id_valija TEXT NOT NULL,
-                    evento TEXT NOT NULL,
-                    timestamp TEXT NOT NULL,
-                    origen TEXT,
-                    destino TEXT,
-                    peso REAL
-                );
-            ''')
-            conn.commit()
-            conn.close()
+        conn = get_db_connection()
+        aplicar_migraciones(conn)
+        if creada:
             logger.info("Base de datos creada correctamente")
-            return True
-        return False
+        return creada
     except Exception as e:
         logger.error(f"Error al inicializar la base de datos: {e}")
         return False
 
+def _actualizar_valija_estado(conn, id_evento, id_valija, evento, origen, destino, peso,
+                              timestamp, timestamp_ms):
+    """
+    Actualiza el estado actual de una valija dentro de la transacción en curso.
+    Solo reemplaza el estado si el evento no es más antiguo que el ya registrado.
+    """
+    conn.execute(
+        '''
+        INSERT INTO valija_estado
+        (id_valija, estado, origen, destino, peso, ultimo_evento, ultimo_evento_ms, id_ultimo_evento)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(id_valija) DO UPDATE SET
+            estado = excluded.estado,
+            origen = excluded.origen,
+            destino = excluded.destino,
+            peso = excluded.peso,
+            ultimo_evento = excluded.ultimo_evento,
+            ultimo_evento_ms = excluded.ultimo_evento_ms,
+            id_ultimo_evento = excluded.id_ultimo_evento
+        WHERE excluded.ultimo_evento_ms >= valija_estado.ultimo_evento_ms
+        ''',
+        (id_valija, evento, origen, destino, peso, timestamp, timestamp_ms, id_evento)
+    )
+
+def reconstruir_valija_estado():
+    """
+    Reconstruye la tabla valija_estado a partir del historial completo de eventos.
+    Útil si la tabla quedó desincronizada (por ejemplo, tras editar eventos a mano).
+    
+    Returns:
+        int: Cantidad de valijas registradas, o -1 si hubo un error.
+    """
+    try:
+        conn = get_db_connection()
+        with conn:
+            conn.execute('BEGIN')
+            poblar_valija_estado(conn)
+        cantidad = conn.execute('SELECT COUNT(*) FROM valija_estado').fetchone()[0]
+        logger.info(f"Tabla valija_estado reconstruida con {cantidad} valijas")
+        return cantidad
+    except Exception as e:
+        logger.error(f"Error al reconstruir valija_estado: {e}")
+        return -1
+
 def insertar_evento(id_valija, evento, origen, destino, peso, timestamp=None):
     """
     Inserta un evento de equipaje en la base de datos.
@@ -91,6 +241,7 @@ def insertar_evento(id_valija, evento, origen, destino, peso, timestamp=None):
         destino (str): Lugar de destino del equipaje.
         peso (float): Peso del equipaje en kg.
         timestamp (str, optional): Marca de tiempo en formato ISO. Si es None, se utiliza la hora actual.
+            Se guarda también como epoch en milisegundos (timestamp_ms) para ordenar y filtrar.
         
     Returns:
         bool: True si se insertó correctamente, False en caso contrario.
@@ -99,50 +250,258 @@ def insertar_evento(id_valija, evento, origen, destino, peso, timestamp=None):
         timestamp = get_datetime_argentina().isoformat()
         
     try:
+        timestamp_ms = timestamp_a_epoch_ms(timestamp)
         conn = get_db_connection()
-        conn.execute(
-            '''
-            INSERT INTO eventos_equipaje 
-            (id_valija, evento, timestamp, origen, destino, peso)
-            VALUES (?, ?, ?, ?, ?, ?)
-            ''',
-            (id_valija, evento, timestamp, origen, destino, peso)
-        )
-        conn.commit()
-        conn.close()
+        with conn:
+            # Tomar el bloqueo de escritura antes de consultar si la valija es nueva:
+            # dos inserciones concurrentes de la misma valija la contarían dos veces
+            conn.execute('BEGIN IMMEDIATE')
+            valija_nueva = conn.execute(
+                'SELECT 1 FROM valija_estado WHERE id_valija = ?', (id_valija,)
+            ).fetchone() is None
+            cursor = conn.execute(
+                '''
+                INSERT INTO eventos_equipaje 
+                (id_valija, evento, timestamp, timestamp_ms, origen, destino, peso)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''',
+                (id_valija, evento, timestamp, timestamp_ms, origen, destino, peso)
+            )
+            # Mantener el estado actual en la misma transacción
+            _actualizar_valija_estado(conn, cursor.lastrowid, id_valija, evento,
+                                      origen, destino, peso, timestamp, timestamp_ms)
+            ahora_ms = int(time.time() * 1000)
+            estadisticas.registrar_eventos(conn, [(evento, timestamp_ms)], int(valija_nueva), ahora_ms)
+            if Config.OUTBOX_HABILITADO:
+                # El mensaje para Kafka se confirma junto con el evento (ver outbox.py)
+                outbox.registrar(conn, [(cursor.lastrowid, id_valija, evento, timestamp_ms,
+                                         origen, destino, peso)], ahora_ms)
         logger.info(f"Evento insertado: {evento} para valija {id_valija}")
+        notificaciones.publicar_eventos([{
+            'id': cursor.lastrowid,
+            'id_valija': id_valija,
+            'evento': evento,
+            'timestamp': timestamp,
+            'timestamp_ms': timestamp_ms,
+            'origen': origen,
+            'destino': destino,
+            'peso': peso
+        }], int(valija_nueva))
         return True
     except Exception as e:
         logger.error(f"Error al insertar evento: {e}")
         return False
 
-def obtener_eventos(limit=100):
+def insertar_eventos_lote(eventos):
+    """
+    Inserta un lote de eventos de equipaje en una única transacción.
+    El estado actual de las valijas afectadas se actualiza en la misma transacción.
+    
+    Args:
+        eventos (list): Lista de diccionarios con las claves 'id_valija', 'evento',
+            'origen', 'destino', 'peso' y opcionalmente 'timestamp' (ISO).
+        
+    Returns:
+        int: Cantidad de eventos insertados, o -1 si hubo un error (no se inserta ninguno).
+    """
+    if not eventos:
+        return 0
+    
+    ahora = get_datetime_argentina().isoformat()
+    
+    try:
+        filas = []
+        for e in eventos:
+            timestamp = e.get('timestamp') or ahora
+            filas.append((e['id_valija'], e['evento'], timestamp, timestamp_a_epoch_ms(timestamp),
+                          e.get('origen'), e.get('destino'), e.get('peso')))
+        
+        conn = get_db_connection()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            id_previo = conn.execute(
+                'SELECT COALESCE(MAX(id), 0) FROM eventos_equipaje'
+            ).fetchone()[0]
+            conn.executemany(
+                '''
+                INSERT INTO eventos_equipaje 
+                (id_valija, evento, timestamp, timestamp_ms, origen, destino, peso)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''',
+                filas
+            )
+            # Los ids del lote son consecutivos: la transacción tiene el bloqueo de escritura
+            ultimo_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+            valijas_nuevas = conn.execute(
+                '''
+                SELECT COUNT(DISTINCT id_valija) FROM eventos_equipaje e
+                WHERE id > ? AND NOT EXISTS (
+                    SELECT 1 FROM valija_estado v WHERE v.id_valija = e.id_valija
+                )
+                ''',
+                (id_previo,)
+            ).fetchone()[0]
+            # Actualizar el estado actual con el evento más reciente de cada valija del lote
+            conn.execute(
+                '''
+                INSERT INTO valija_estado
+                (id_valija, estado, origen, destino, peso, ultimo_evento, ultimo_evento_ms, id_ultimo_evento)
+                SELECT id_valija, evento, origen, destino, peso, timestamp, timestamp_ms, id
+                FROM (
+                    SELECT e.*, ROW_NUMBER() OVER (
+                        PARTITION BY id_valija ORDER BY timestamp_ms DESC, id DESC
+                    ) AS orden
+                    FROM eventos_equipaje e
+                    WHERE id > ?
+                )
+                WHERE orden = 1
+                ON CONFLICT(id_valija) DO UPDATE SET
+                    estado = excluded.estado,
+                    origen = excluded.origen,
+                    destino = excluded.destino,
+                    peso = excluded.peso,
+                    ultimo_evento = excluded.ultimo_evento,
+                    ultimo_evento_ms = excluded.ultimo_evento_ms,
+                    id_ultimo_evento = excluded.id_ultimo_evento
+                WHERE excluded.ultimo_evento_ms >= valija_estado.ultimo_evento_ms
+                ''',
+                (id_previo,)
+            )
+            ahora_ms = int(time.time() * 1000)
+            estadisticas.registrar_eventos(conn, [(f[1], f[3]) for f in filas], valijas_nuevas, ahora_ms)
+            primer_id = ultimo_id - len(filas) + 1
+            if Config.OUTBOX_HABILITADO:
+                outbox.registrar(conn, [(primer_id + i, f[0], f[1], f[3], f[4], f[5], f[6])
+                                        for i, f in enumerate(filas)], ahora_ms)
+        logger.info(f"Lote de {len(filas)} eventos insertado")
+        notificaciones.publicar_eventos([
+            dict(zip(('id', 'id_valija', 'evento', 'timestamp', 'timestamp_ms',
+                      'origen', 'destino', 'peso'), (primer_id + i,) + fila))
+            for i, fila in enumerate(filas)
+        ], valijas_nuevas)
+        return len(filas)
+    except Exception as e:
+        logger.error(f"Error al insertar lote de eventos: {e}")
+        return -1
+
+def _condiciones_filtros(filtros, columna_estado, columna_tiempo):
+    """
+    Traduce los filtros de consulta a condiciones SQL.
+    
+    Args:
+        filtros (dict): Claves opcionales 'estados' (lista), 'aeropuerto' (origen o destino),
+            'desde_ms' (inclusive), 'hasta_ms' (exclusivo) y 'prefijo' (del id de valija).
+        columna_estado (str): Columna con el tipo de evento o estado.
+        columna_tiempo (str): Columna con la marca de tiempo en epoch ms.
+        
+    Returns:
+        tuple: (lista de condiciones, lista de parámetros).
+    """
+    condiciones = []
+    parametros = []
+    filtros = filtros or {}
+    
+    if filtros.get('estados'):
+        condiciones.append(f"{columna_estado} IN ({', '.join('?' for _ in filtros['estados'])})")
+        parametros.extend(filtros['estados'])
+    if filtros.get('aeropuerto'):
+        condiciones.append('(origen = ? OR destino = ?)')
+        parametros.extend([filtros['aeropuerto'], filtros['aeropuerto']])
+    if filtros.get('desde_ms') is not None:
+        condiciones.append(f'{columna_tiempo} >= ?')
+        parametros.append(filtros['desde_ms'])
+    if filtros.get('hasta_ms') is not None:
+        condiciones.append(f'{columna_tiempo} < ?')
+        parametros.append(filtros['hasta_ms'])
+    if filtros.get('prefijo'):
+        # Rango en lugar de LIKE para poder usar el índice sobre id_valija
+        condiciones.append('id_valija >= ? AND id_valija < ?')
+        parametros.extend([filtros['prefijo'], filtros['prefijo'] + '\U0010ffff'])
+    
+    return condiciones, parametros
+
+def _consultar_dicts(conn, consulta, parametros=()):
+    """
+    Ejecuta una consulta leyendo las filas como tuplas y arma un diccionario por fila,
+    sin pasar por sqlite3.Row (una sola copia por fila antes de serializar).
+    """
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    cursor.execute(consulta, parametros)
+    columnas = [columna[0] for columna in cursor.description]
+    return [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+
+def obtener_eventos(limit=100, antes=None, since_id=None, filtros=None):
     """
     Obtiene los eventos más recientes de la base de datos.
     
     Args:
         limit (int, optional): Número máximo de eventos a obtener. Por defecto 100.
+        antes (tuple, optional): Cursor (timestamp_ms, id) del último evento de la página
+            anterior; se devuelven los eventos estrictamente más antiguos.
+        since_id (int, optional): Devuelve solo eventos con id mayor (insertados después).
+        filtros (dict, optional): Filtros de estado, aeropuerto, rango de tiempo y prefijo de id.
         
     Returns:
         list: Lista de eventos ordenados por timestamp descendente.
     """
     try:
-        conn = get_db_connection()
-        eventos = conn.execute(
-            'SELECT * FROM eventos_equipaje ORDER BY timestamp DESC LIMIT ?',
-            (limit,)
-        ).fetchall()
-        conn.close()
+        condiciones, parametros = _condiciones_filtros(filtros, 'evento', 'timestamp_ms')
+        if antes is not None:
+            condiciones.append('(timestamp_ms, id) < (?, ?)')
+            parametros.extend(antes)
+        if since_id is not None:
+            condiciones.append('id > ?')
+            parametros.append(since_id)
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
         
-        # Convertir los objetos Row a diccionarios
-        return [dict(evento) for evento in eventos]
+        conn = get_db_connection()
+        return _consultar_dicts(
+            conn,
+            f'SELECT * FROM eventos_equipaje {where} ORDER BY timestamp_ms DESC, id DESC LIMIT ?',
+            (*parametros, limit)
+        )
     except Exception as e:
         logger.error(f"Error al obtener eventos: {e}")
         return []
 
+def iterar_eventos(filtros=None, tamano_bloque=None):
+    """
+    Recorre los eventos de la tabla en vivo (sin los archivados) en orden de inserción,
+    en bloques leídos con fetchmany, para exportar historiales de cualquier tamaño con
+    memoria constante. Usa una conexión propia que se cierra al terminar el recorrido.
+    
+    Args:
+        filtros (dict, optional): Filtros de estado, aeropuerto, rango de tiempo y prefijo de id.
+        tamano_bloque (int, optional): Filas por bloque. Por defecto Config.EXPORT_TAMANO_BLOQUE.
+        
+    Yields:
+        list: Tuplas con las columnas de archivo.COLUMNAS_EVENTO.
+    """
+    tamano_bloque = tamano_bloque or Config.EXPORT_TAMANO_BLOQUE
+    condiciones, parametros = _condiciones_filtros(filtros, 'evento', 'timestamp_ms')
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+    
+    conn = _pool.crear_conexion()
+    try:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(
+            f'SELECT {archivo.COLUMNAS_EVENTO} FROM eventos_equipaje {where} ORDER BY id',
+            parametros
+        )
+        while True:
+            filas = cursor.fetchmany(tamano_bloque)
+            if not filas:
+                break
+            yield filas
+    finally:
+        conn.close()
+
 def obtener_valija(id_valija):
     """
     Obtiene todos los eventos de una valija específica.
+    Si la valija fue archivada, incluye también sus eventos del archivo mensual.
     
     Args:
         id_valija (str): ID de la valija a consultar.
@@ -153,10 +512,15 @@ def obtener_valija(id_valija):
     try:
         conn = get_db_connection()
         eventos = conn.execute(
-            'SELECT * FROM eventos_equipaje WHERE id_valija = ? ORDER BY timestamp',
+            'SELECT * FROM eventos_equipaje WHERE id_valija = ? ORDER BY timestamp_ms, id',
             (id_valija,)
         ).fetchall()
-        conn.close()
+        
+        # Consultar el archivo histórico (búsqueda por clave en el catálogo)
+        archivados = archivo.obtener_eventos_archivados(conn, id_valija)
+        if archivados:
+            eventos = sorted(list(archivados) + list(eventos),
+                             key=lambda e: (e['timestamp_ms'] or 0, e['id']))
         
         # Convertir los objetos Row a diccionarios
         return [dict(evento) for evento in eventos]
@@ -164,53 +528,141 @@ def obtener_valija(id_valija):
         logger.error(f"Error al obtener información de valija {id_valija}: {e}")
         return []
 
-def obtener_todas_valijas():
+def obtener_historial_valijas(ids, solo_ultimo=False):
+    """
+    Obtiene el historial de varias valijas con una consulta por bloque de IDs,
+    en lugar de una consulta por valija.
+    
+    Args:
+        ids (list): IDs de las valijas a consultar.
+        solo_ultimo (bool, optional): Si es True, devuelve solo el evento más reciente
+            de cada valija (leído vía valija_estado, sin recorrer el historial).
+        
+    Returns:
+        dict: {id_valija: lista de eventos ordenados por timestamp} o, con solo_ultimo,
+        {id_valija: evento más reciente}. Las valijas inexistentes no se incluyen.
+    """
+    try:
+        conn = get_db_connection()
+        ids = list(dict.fromkeys(ids))
+        filas = []
+        for inicio in range(0, len(ids), archivo.TAMANO_BLOQUE_IDS):
+            bloque = ids[inicio:inicio + archivo.TAMANO_BLOQUE_IDS]
+            marcadores = ', '.join('?' for _ in bloque)
+            if solo_ultimo:
+                consulta = f'''
+                    SELECT e.* FROM valija_estado v
+                    JOIN eventos_equipaje e ON e.id = v.id_ultimo_evento
+                    WHERE v.id_valija IN ({marcadores})
+                '''
+            else:
+                consulta = f'SELECT * FROM eventos_equipaje WHERE id_valija IN ({marcadores})'
+            filas.extend(dict(fila) for fila in conn.execute(consulta, bloque).fetchall())
+        
+        if not solo_ultimo:
+            # Completar con los eventos de valijas archivadas
+            filas.extend(dict(fila) for fila in archivo.obtener_eventos_archivados_lote(conn, ids))
+        
+        filas.sort(key=lambda e: (e['timestamp_ms'] or 0, e['id']))
+        resultado = {}
+        for fila in filas:
+            if solo_ultimo:
+                resultado[fila['id_valija']] = fila
+            else:
+                resultado.setdefault(fila['id_valija'], []).append(fila)
+        return resultado
+    except Exception as e:
+        logger.error(f"Error al obtener historial de valijas: {e}")
+        return {}
+
+def obtener_todas_valijas(limit=None, antes=None, filtros=None):
     """
     Obtiene la lista de todas las valijas con su estado actual.
     Garantiza que los campos requeridos nunca sean None para evitar errores en el frontend.
     
+    Args:
+        limit (int, optional): Número máximo de valijas. Por defecto sin límite.
+        antes (tuple, optional): Cursor (ultimo_evento_ms, id_valija) de la última valija de
+            la página anterior; se devuelven las valijas con último evento anterior.
+        filtros (dict, optional): Filtros de estado, aeropuerto, rango de tiempo y prefijo de id.
+    
     Returns:
         list: Lista de valijas con su estado actual.
     """
     try:
+        condiciones, parametros = _condiciones_filtros(filtros, 'estado', 'ultimo_evento_ms')
+        if antes is not None:
+            condiciones.append('(ultimo_evento_ms, id_valija) < (?, ?)')
+            parametros.extend(antes)
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+        
         conn = get_db_connection()
-        valijas = conn.execute(
-            '''
-            SELECT id_valija, 
-                   MAX(timestamp) as ultimo_evento,
-                   (SELECT evento FROM eventos_equipaje e2 
-                    WHERE e2.id_valija = e1.id_valija 
-                    ORDER BY timestamp DESC LIMIT 1) as estado,
-                   (SELECT origen FROM eventos_equipaje e2 
-                    WHERE e2.id_valija = e1.id_valija 
-                    ORDER BY timestamp DESC LIMIT 1) as origen,
-                   (SELECT destino FROM eventos_equipaje e2 
-                    WHERE e2.id_valija = e1.id_valija 
-                    ORDER BY timestamp DESC LIMIT 1) as destino
-            FROM eventos_equipaje e1
-            GROUP BY id_valija
-            ORDER BY ultimo_evento DESC
-            '''
-        ).fetchall()
-        conn.close()
-        # Convertir los objetos Row a diccionarios y limpiar valores None
-        valijas_list = []
-        for valija in valijas:
-            v = dict(valija)
-            v['id_valija'] = v.get('id_valija') or ''
-            v['ultimo_evento'] = v.get('ultimo_evento') or ''
-            v['estado'] = v.get('estado') or 'desconocido'
-            v['origen'] = v.get('origen') or 'No especificado'
-            v['destino'] = v.get('destino') or 'No especificado'
-            valijas_list.append(v)
-        return valijas_list
+        # Los valores nulos o vacíos se reemplazan en la consulta misma
+        return _consultar_dicts(
+            conn,
+            f'''
+            SELECT COALESCE(id_valija, '') AS id_valija,
+                   COALESCE(ultimo_evento, '') AS ultimo_evento,
+                   ultimo_evento_ms,
+                   COALESCE(NULLIF(estado, ''), 'desconocido') AS estado,
+                   COALESCE(NULLIF(origen, ''), 'No especificado') AS origen,
+                   COALESCE(NULLIF(destino, ''), 'No especificado') AS destino,
+                   peso
+            FROM valija_estado
+            {where}
+            ORDER BY ultimo_evento_ms DESC, id_valija DESC
+            LIMIT ?
+            ''',
+            (*parametros, -1 if limit is None else limit)
+        )
     except Exception as e:
         logger.error(f"Error al obtener lista de valijas: {e}")
         return []
 
+def archivar_valijas_completadas(dias=None):
+    """
+    Mueve a los archivos mensuales las valijas completadas hace más de `dias` días.
+    
+    Args:
+        dias (int, optional): Antigüedad mínima. Por defecto Config.ARCHIVO_DIAS.
+        
+    Returns:
+        dict: Cantidad de valijas archivadas por mes, o None si hubo un error.
+    """
+    if dias is None:
+        dias = Config.ARCHIVO_DIAS
+    try:
+        conn = get_db_connection()
+        return archivo.archivar_valijas_completadas(conn, dias, int(time.time() * 1000))
+    except Exception as e:
+        logger.error(f"Error al archivar valijas completadas: {e}")
+        return None
+
+def obtener_version_datos():
+    """
+    Obtiene un token que cambia cada vez que se modifican los datos consultables:
+    el mayor id de evento (crece con cada inserción) y la cantidad de valijas únicas
+    (disminuye al archivar). Ambos se leen por clave, sin recorrer tablas.
+    
+    Returns:
+        str: Token de versión, o None si no se pudo calcular.
+    """
+    try:
+        conn = get_db_connection()
+        max_id, valijas = conn.execute('''
+            SELECT
+                (SELECT MAX(id) FROM eventos_equipaje),
+                (SELECT valor FROM estadisticas_contador WHERE nombre = 'valijas_unicas')
+        ''').fetchone()
+        return f"{max_id or 0}.{valijas or 0}"
+    except Exception as e:
+        logger.error(f"Error al obtener versión de los datos: {e}")
+        return None
+
 def obtener_estadisticas():
     """
     Obtiene estadísticas generales de los eventos de equipaje.
+    Se leen de los contadores precalculados, en tiempo constante respecto del historial.
     
     Returns:
         dict: Diccionario con las estadísticas.
@@ -219,60 +671,36 @@ def obtener_estadisticas():
     resultado = {
         'por_tipo': [],
         'ultimas_24h': 0,
-        'valijas_unicas': 0
+        'valijas_unicas': 0,
+        'ultimo_id': 0
     }
     
-    conn = None
     try:
         conn = get_db_connection()
-        
-        # Contar eventos por tipo
-        eventos_por_tipo = conn.execute(
-            'SELECT evento, COUNT(*) as cantidad FROM eventos_equipaje GROUP BY evento'
-        ).fetchall()
-        
-        # Obtener el total de valijas únicas
-        valijas_unicas = conn.execute(
-            'SELECT COUNT(DISTINCT id_valija) as cantidad FROM eventos_equipaje'
-        ).fetchone()
-        
-        # Convertir a formato adecuado para JSON
-        tipos = [dict(evento) for evento in eventos_por_tipo]
-        resultado['por_tipo'] = tipos
-        resultado['valijas_unicas'] = valijas_unicas['cantidad'] if valijas_unicas else 0
-        
-        # Contar eventos de las últimas 24 horas
-        try:
-            # Usamos el datetime actual y restamos 24 horas
-            dt_actual = get_datetime_argentina()
-            dt_limite = dt_actual - timedelta(hours=24)
-            fecha_limite = dt_limite.isoformat()
-            
-            eventos_recientes = conn.execute(
-                'SELECT COUNT(*) as cantidad FROM eventos_equipaje WHERE timestamp > ?',
-                (fecha_limite,)
-            ).fetchone()
-            
-            resultado['ultimas_24h'] = eventos_recientes['cantidad'] if eventos_recientes else 0
-        except Exception as fecha_error:
-            logger.error(f"Error al calcular fecha límite: {fecha_error}")
-            # Si hay un error con la fecha, mantenemos el valor por defecto
-            resultado['ultimas_24h'] = 0
-    
+        resultado = estadisticas.obtener(conn, int(time.time() * 1000))
     except Exception as e:
         logger.error(f"Error al obtener estadísticas: {e}")
         # Ya tenemos los valores por defecto en resultado
     
-    finally:
-        # Cerrar la conexión solo si se abrió correctamente
-        if conn:
-            try:
-                conn.close()
-            except Exception as close_error:
-                logger.error(f"Error al cerrar la conexión: {close_error}")
-    
     return resultado
 
+def reconstruir_estadisticas():
+    """
+    Recalcula los contadores de estadísticas a partir del historial completo.
+    
+    Returns:
+        bool: True si se reconstruyeron correctamente, False en caso contrario.
+    """
+    try:
+        conn = get_db_connection()
+        with conn:
+            conn.execute('BEGIN')
+            estadisticas.reconstruir(conn, int(time.time() * 1000))
+        return True
+    except Exception as e:
+        logger.error(f"Error al reconstruir estadísticas: {e}")
+        return False
+
 def obtener_valijas_incompletas(limit=10):
     """
     Obtiene valijas que no han completado su ciclo (no tienen evento de entrega).
@@ -287,22 +715,86 @@ def obtener_valijas_incompletas(limit=10):
         conn = get_db_connection()
         
         valijas_incompletas = conn.execute('''
-            SELECT e1.id_valija, e1.evento, e1.origen, e1.destino, e1.peso, e1.timestamp
-            FROM eventos_equipaje e1
-            JOIN (
-                SELECT id_valija, MAX(timestamp) as last_timestamp
-                FROM eventos_equipaje
-                GROUP BY id_valija
-            ) e2 ON e1.id_valija = e2.id_valija AND e1.timestamp = e2.last_timestamp
-            WHERE e1.evento != 'equipaje_entregado'
-            ORDER BY e1.timestamp DESC
+            SELECT id_valija, estado AS evento, origen, destino, peso, ultimo_evento AS timestamp
+            FROM valija_estado
+            WHERE estado != 'equipaje_entregado'
+            ORDER BY ultimo_evento_ms DESC
             LIMIT ?
         ''', (limit,)).fetchall()
-        
-        conn.close()
-        
         # Convertir los objetos Row a diccionarios
         return [dict(valija) for valija in valijas_incompletas]
     except Exception as e:
         logger.error(f"Error al obtener valijas incompletas: {e}")
-        return []
\ No newline at end of file
+        return []
+
+def obtener_outbox_pendientes(limite=None):
+    """
+    Obtiene los mensajes del outbox que todavía no se publicaron en Kafka.
+    
+    Args:
+        limite (int, optional): Cantidad máxima. Por defecto Config.OUTBOX_TAMANO_LOTE.
+        
+    Returns:
+        list: Tuplas (id, mensaje) en orden de inserción, o lista vacía si hubo un error.
+    """
+    try:
+        conn = get_db_connection()
+        return outbox.obtener_pendientes(conn, limite or Config.OUTBOX_TAMANO_LOTE)
+    except Exception as e:
+        logger.error(f"Error al leer el outbox: {e}")
+        return []
+
+def marcar_outbox_enviados(ids):
+    """
+    Marca como enviados los mensajes del outbox confirmados por Kafka.
+    
+    Args:
+        ids (list): Ids de los mensajes.
+        
+    Returns:
+        bool: True si se marcaron correctamente, False en caso contrario.
+    """
+    if not ids:
+        return True
+    try:
+        conn = get_db_connection()
+        with conn:
+            outbox.marcar_enviados(conn, ids, int(time.time() * 1000))
+        return True
+    except Exception as e:
+        logger.error(f"Error al marcar mensajes del outbox como enviados: {e}")
+        return False
+
+def purgar_outbox(horas=None):
+    """
+    Elimina los mensajes del outbox enviados hace más de `horas` horas.
+    
+    Args:
+        horas (int, optional): Antigüedad mínima. Por defecto Config.OUTBOX_RETENCION_HORAS.
+        
+    Returns:
+        int: Cantidad de mensajes eliminados, o -1 si hubo un error.
+    """
+    if horas is None:
+        horas = Config.OUTBOX_RETENCION_HORAS
+    try:
+        conn = get_db_connection()
+        with conn:
+            return outbox.purgar_enviados(conn, int(time.time() * 1000) - horas * 3600 * 1000)
+    except Exception as e:
+        logger.error(f"Error al purgar el outbox: {e}")
+        return -1
+
+def obtener_estado_outbox():
+    """
+    Obtiene la cantidad de mensajes pendientes del outbox y la antigüedad del más viejo.
+    
+    Returns:
+        dict: Estado del outbox, o None si hubo un error.
+    """
+    try:
+        conn = get_db_connection()
+        return outbox.obtener_estado(conn)
+    except Exception as e:
+        logger.error(f"Error al obtener el estado del outbox: {e}")
+        return None
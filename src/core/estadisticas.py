@@ -0,0 +1,172 @@
+"""
+Módulo de estadísticas precalculadas del sistema de gestión de equipajes.
+Mantiene contadores por tipo de evento, la cantidad de valijas únicas y buckets
+por minuto para la ventana deslizante de 24 horas. Los contadores se actualizan
+en la misma transacción que cada inserción, por lo que el dashboard los consulta
+en tiempo constante sin recorrer eventos_equipaje.
+"""
+
+import logging
+from collections import Counter
+
+logger = logging.getLogger('estadisticas')
+
+# Ventana deslizante de eventos recientes, en minutos
+VENTANA_MINUTOS = 24 * 60
+MS_POR_MINUTO = 60 * 1000
+
+def crear_tablas(conn):
+    """
+    Crea las tablas de contadores si no existen.
+
+    Args:
+        conn (sqlite3.Connection): Conexión a la base de datos.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS estadisticas_evento (
+            evento TEXT PRIMARY KEY,
+            cantidad INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS estadisticas_minuto (
+            minuto INTEGER PRIMARY KEY,
+            cantidad INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS estadisticas_contador (
+            nombre TEXT PRIMARY KEY,
+            valor INTEGER NOT NULL
+        )
+    ''')
+
+def _inicio_ventana(ahora_ms):
+    """Primer minuto (epoch en minutos) incluido en la ventana de 24 horas."""
+    return ahora_ms // MS_POR_MINUTO - VENTANA_MINUTOS + 1
+
+def registrar_eventos(conn, eventos, valijas_nuevas, ahora_ms):
+    """
+    Suma un grupo de eventos recién insertados a los contadores.
+    Debe ejecutarse dentro de la transacción de la inserción.
+
+    Args:
+        conn (sqlite3.Connection): Conexión a la base de datos.
+        eventos (list): Tuplas (evento, timestamp_ms) de los eventos insertados.
+        valijas_nuevas (int): Cantidad de valijas que aparecen por primera vez.
+        ahora_ms (int): Hora actual en epoch ms, para podar la ventana.
+    """
+    inicio = _inicio_ventana(ahora_ms)
+    por_tipo = Counter(evento for evento, _ in eventos)
+    por_minuto = Counter(
+        timestamp_ms // MS_POR_MINUTO for _, timestamp_ms in eventos
+        if timestamp_ms is not None and timestamp_ms // MS_POR_MINUTO >= inicio
+    )
+
+    conn.executemany(
+        '''
+        INSERT INTO estadisticas_evento (evento, cantidad) VALUES (?, ?)
+        ON CONFLICT(evento) DO UPDATE SET cantidad = cantidad + excluded.cantidad
+        ''',
+        por_tipo.items()
+    )
+    conn.executemany(
+        '''
+        INSERT INTO estadisticas_minuto (minuto, cantidad) VALUES (?, ?)
+        ON CONFLICT(minuto) DO UPDATE SET cantidad = cantidad + excluded.cantidad
+        ''',
+        por_minuto.items()
+    )
+    if valijas_nuevas:
+        conn.execute(
+            '''
+            INSERT INTO estadisticas_contador (nombre, valor) VALUES ('valijas_unicas', ?)
+            ON CONFLICT(nombre) DO UPDATE SET valor = valor + excluded.valor
+            ''',
+            (valijas_nuevas,)
+        )
+    # Descartar los buckets que salieron de la ventana
+    conn.execute('DELETE FROM estadisticas_minuto WHERE minuto < ?', (inicio,))
+
+def descontar_eventos(conn, por_tipo, valijas):
+    """
+    Resta de los contadores eventos que dejan la tabla en vivo (por ejemplo, al archivarlos).
+    Los buckets por minuto no se modifican: los eventos archivados son anteriores a la ventana.
+
+    Args:
+        conn (sqlite3.Connection): Conexión a la base de datos.
+        por_tipo (dict): Cantidad de eventos retirados por tipo de evento.
+        valijas (int): Cantidad de valijas retiradas.
+    """
+    conn.executemany(
+        'UPDATE estadisticas_evento SET cantidad = MAX(cantidad - ?, 0) WHERE evento = ?',
+        [(cantidad, evento) for evento, cantidad in por_tipo.items()]
+    )
+    conn.execute(
+        "UPDATE estadisticas_contador SET valor = MAX(valor - ?, 0) WHERE nombre = 'valijas_unicas'",
+        (valijas,)
+    )
+
+def obtener(conn, ahora_ms):
+    """
+    Lee las estadísticas desde los contadores precalculados.
+    El conteo de las últimas 24 horas tiene resolución de un minuto.
+
+    Args:
+        conn (sqlite3.Connection): Conexión a la base de datos.
+        ahora_ms (int): Hora actual en epoch ms.
+
+    Returns:
+        dict: Diccionario con 'por_tipo', 'ultimas_24h', 'valijas_unicas' y 'ultimo_id'
+        (id del evento más reciente incluido, para combinar con el stream en tiempo real).
+    """
+    por_tipo = conn.execute(
+        'SELECT evento, cantidad FROM estadisticas_evento WHERE cantidad > 0 ORDER BY evento'
+    ).fetchall()
+    ultimas_24h = conn.execute(
+        'SELECT COALESCE(SUM(cantidad), 0) FROM estadisticas_minuto WHERE minuto >= ?',
+        (_inicio_ventana(ahora_ms),)
+    ).fetchone()[0]
+    valijas_unicas = conn.execute(
+        "SELECT valor FROM estadisticas_contador WHERE nombre = 'valijas_unicas'"
+    ).fetchone()
+
+    ultimo_id = conn.execute('SELECT MAX(id) FROM eventos_equipaje').fetchone()[0]
+
+    return {
+        'por_tipo': [{'evento': evento, 'cantidad': cantidad} for evento, cantidad in por_tipo],
+        'ultimas_24h': ultimas_24h,
+        'valijas_unicas': valijas_unicas[0] if valijas_unicas else 0,
+        'ultimo_id': ultimo_id or 0
+    }
+
+def reconstruir(conn, ahora_ms):
+    """
+    Recalcula todos los contadores a partir del historial de eventos.
+    Debe ejecutarse dentro de una transacción.
+
+    Args:
+        conn (sqlite3.Connection): Conexión a la base de datos.
+        ahora_ms (int): Hora actual en epoch ms.
+    """
+    conn.execute('DELETE FROM estadisticas_evento')
+    conn.execute('DELETE FROM estadisticas_minuto')
+    conn.execute('DELETE FROM estadisticas_contador')
+    conn.execute('''
+        INSERT INTO estadisticas_evento (evento, cantidad)
+        SELECT evento, COUNT(*) FROM eventos_equipaje GROUP BY evento
+    ''')
+    conn.execute(
+        '''
+        INSERT INTO estadisticas_minuto (minuto, cantidad)
+        SELECT timestamp_ms / ?, COUNT(*) FROM eventos_equipaje
+        WHERE timestamp_ms >= ?
+        GROUP BY timestamp_ms / ?
+        ''',
+        (MS_POR_MINUTO, _inicio_ventana(ahora_ms) * MS_POR_MINUTO, MS_POR_MINUTO)
+    )
+    conn.execute('''
+        INSERT INTO estadisticas_contador (nombre, valor)
+        SELECT 'valijas_unicas', COUNT(DISTINCT id_valija) FROM eventos_equipaje
+    ''')
+    logger.info("Contadores de estadísticas reconstruidos desde el historial")
@@ -0,0 +1,111 @@
+"""
+Exportación masiva del historial de eventos de equipaje.
+Convierte los bloques de filas de iterar_eventos() en CSV, NDJSON o Parquet sin
+cargar la tabla completa en memoria: CSV y NDJSON se generan por partes para
+enviarlos como respuesta en streaming, y Parquet se escribe un row group por bloque.
+Parquet requiere pandas y pyarrow (dependencias opcionales).
+"""
+
+import io
+import csv
+import json
+import logging
+
+from src.core.archivo import COLUMNAS_EVENTO
+
+logger = logging.getLogger('exportacion')
+
+COLUMNAS = [columna.strip() for columna in COLUMNAS_EVENTO.split(',')]
+
+# Formato -> (tipo de contenido, extensión de archivo)
+FORMATOS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+def generar_csv(bloques):
+    """
+    Genera el CSV por partes: la cabecera y luego un fragmento de texto por bloque.
+
+    Args:
+        bloques (iterable): Listas de tuplas con las columnas de COLUMNAS.
+
+    Yields:
+        str: Fragmentos consecutivos del archivo CSV.
+    """
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(COLUMNAS)
+    yield buffer.getvalue()
+    for filas in bloques:
+        buffer.seek(0)
+        buffer.truncate()
+        escritor.writerows(filas)
+        yield buffer.getvalue()
+
+def generar_ndjson(bloques):
+    """
+    Genera NDJSON (un objeto JSON por línea) por partes, un fragmento por bloque.
+
+    Args:
+        bloques (iterable): Listas de tuplas con las columnas de COLUMNAS.
+
+    Yields:
+        str: Fragmentos consecutivos del archivo NDJSON.
+    """
+    for filas in bloques:
+        yield ''.join(
+            json.dumps(dict(zip(COLUMNAS, fila)), ensure_ascii=False) + '\n' for fila in filas
+        )
+
+def parquet_disponible():
+    """Indica si están instaladas las dependencias para exportar a Parquet."""
+    try:
+        import pandas  # noqa: F401
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def escribir_parquet(bloques, destino):
+    """
+    Escribe los eventos en un archivo Parquet, un row group por bloque, de modo que la
+    memoria usada depende del tamaño de bloque y no de la cantidad de eventos.
+
+    Args:
+        bloques (iterable): Listas de tuplas con las columnas de COLUMNAS.
+        destino (str | file): Ruta o archivo binario de salida.
+
+    Returns:
+        int: Cantidad de eventos escritos.
+
+    Raises:
+        ImportError: Si pandas o pyarrow no están instalados.
+    """
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    esquema = pa.schema([
+        ('id', pa.int64()),
+        ('id_valija', pa.string()),
+        ('evento', pa.string()),
+        ('timestamp', pa.string()),
+        ('timestamp_ms', pa.int64()),
+        ('origen', pa.string()),
+        ('destino', pa.string()),
+        ('peso', pa.float64()),
+    ])
+
+    total = 0
+    with pq.ParquetWriter(destino, esquema, compression='snappy') as escritor:
+        for filas in bloques:
+            df = pd.DataFrame.from_records(filas, columns=COLUMNAS)
+            # Enteros con nulos: usar el tipo entero anulable de pandas en lugar de float
+            df['timestamp_ms'] = df['timestamp_ms'].astype('Int64')
+            df['peso'] = df['peso'].astype('float64')
+            escritor.write_table(pa.Table.from_pandas(df, schema=esquema, preserve_index=False))
+            total += len(filas)
+    logger.info(f"Exportados {total} eventos a Parquet")
+    return total
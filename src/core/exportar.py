@@ -0,0 +1,84 @@
+"""
+Script para exportar el historial de eventos de equipaje a CSV, NDJSON o Parquet.
+Lee la base por bloques, por lo que la memoria usada no depende del tamaño del historial.
+Uso: python src/core/exportar.py salida.csv [--formato csv|ndjson|parquet]
+         [--desde FECHA] [--hasta FECHA] [--aeropuerto AEROPUERTO] [--estado ESTADOS]
+Con salida '-' se escribe en la salida estándar (solo CSV y NDJSON).
+"""
+import os
+import sys
+import argparse
+
+# Ajustar el path para las importaciones
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.core.config import timestamp_a_epoch_ms
+from src.core import exportacion
+from src.core.db_service import DB_PATH, inicializar_db, iterar_eventos
+
+parser = argparse.ArgumentParser(description='Exporta el historial de eventos de equipaje.')
+parser.add_argument('salida', help="Archivo de salida ('-' para la salida estándar)")
+parser.add_argument('--formato', choices=list(exportacion.FORMATOS),
+                    help='Formato de salida (por defecto, según la extensión del archivo o csv)')
+parser.add_argument('--desde', help='Fecha inicial inclusive (ISO o epoch)')
+parser.add_argument('--hasta', help='Fecha final exclusiva (ISO o epoch)')
+parser.add_argument('--aeropuerto', help='Solo eventos con este origen o destino')
+parser.add_argument('--estado', help='Tipos de evento separados por coma')
+args = parser.parse_args()
+
+if not os.path.exists(DB_PATH):
+    print(f"No se encontró la base de datos en {DB_PATH}")
+    exit(1)
+
+formato = args.formato
+if formato is None:
+    extension = os.path.splitext(args.salida)[1].lstrip('.').lower()
+    formato = extension if extension in exportacion.FORMATOS else 'csv'
+
+filtros = {}
+try:
+    if args.desde:
+        filtros['desde_ms'] = timestamp_a_epoch_ms(args.desde)
+    if args.hasta:
+        filtros['hasta_ms'] = timestamp_a_epoch_ms(args.hasta)
+except ValueError as e:
+    print(f"Fecha inválida: {e}")
+    exit(1)
+if args.aeropuerto:
+    filtros['aeropuerto'] = args.aeropuerto
+if args.estado:
+    filtros['estados'] = [e.strip() for e in args.estado.split(',') if e.strip()]
+
+# Asegurar que el esquema esté actualizado antes de exportar
+inicializar_db()
+
+bloques = iterar_eventos(filtros)
+total = 0
+
+def contar(bloques):
+    """Cuenta las filas exportadas a medida que pasan los bloques."""
+    global total
+    for filas in bloques:
+        total += len(filas)
+        yield filas
+
+if formato == 'parquet':
+    if args.salida == '-':
+        print("La exportación a Parquet requiere un archivo de salida")
+        exit(1)
+    if not exportacion.parquet_disponible():
+        print("La exportación a Parquet requiere pandas y pyarrow")
+        exit(1)
+    exportacion.escribir_parquet(contar(bloques), args.salida)
+else:
+    generar = exportacion.generar_ndjson if formato == 'ndjson' else exportacion.generar_csv
+    salida = sys.stdout if args.salida == '-' else open(args.salida, 'w', encoding='utf-8', newline='')
+    try:
+        for fragmento in generar(contar(bloques)):
+            salida.write(fragmento)
+    finally:
+        if salida is not sys.stdout:
+            salida.close()
+
+if args.salida != '-':
+    print(f"{total} eventos exportados a {args.salida} ({formato})")
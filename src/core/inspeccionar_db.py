@@ -1,11 +1,37 @@
 """
-Script para inspeccionar la base de datos SQLite y listar las tablas existentes.
+Script para inspeccionar la base de datos SQLite y listar las tablas existentes,
+la versión de esquema, los índices y el plan de ejecución de las consultas frecuentes.
 """
 import sqlite3
 import os
+import sys
+
+# Ajustar el path para las importaciones
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.core.migraciones import VERSION_ACTUAL
 
 DB_PATH = os.path.join('data', 'equipajes.db')
 
+# Consultas frecuentes del sistema cuyo uso de índices se reporta
+CONSULTAS_FRECUENTES = {
+    'obtener_valija': (
+        'SELECT * FROM eventos_equipaje WHERE id_valija = ? ORDER BY timestamp_ms, id', ('x',)
+    ),
+    'obtener_eventos': (
+        'SELECT * FROM eventos_equipaje ORDER BY timestamp_ms DESC, id DESC LIMIT ?', (100,)
+    ),
+    'estadisticas por tipo': (
+        'SELECT evento, COUNT(*) FROM eventos_equipaje GROUP BY evento', ()
+    ),
+    'estadisticas ultimas 24h': (
+        'SELECT COUNT(*) FROM eventos_equipaje WHERE timestamp_ms > ?', (0,)
+    ),
+    'obtener_todas_valijas': (
+        'SELECT * FROM valija_estado ORDER BY ultimo_evento_ms DESC', ()
+    ),
+}
+
 if not os.path.exists(DB_PATH):
     print(f"No se encontró la base de datos en {DB_PATH}")
     exit(1)
@@ -13,14 +39,36 @@ if not os.path.exists(DB_PATH):
 conn = sqlite3.connect(DB_PATH)
 cursor = conn.cursor()
 
-print("Tablas en la base de datos:")
+version = cursor.execute("PRAGMA user_version").fetchone()[0]
+print(f"Versión de esquema: {version} (última disponible: {VERSION_ACTUAL})")
+if version < VERSION_ACTUAL:
+    print("  Hay migraciones pendientes: se aplicarán al iniciar la aplicación.")
+
+print("\nTablas en la base de datos:")
 cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-for row in cursor.fetchall():
-    print(row)
+tablas = [row[0] for row in cursor.fetchall()]
+for tabla in tablas:
+    print(tabla)
 
 print("\nEsquema de la tabla eventos_equipaje:")
 cursor.execute("PRAGMA table_info(eventos_equipaje)")
 for col in cursor.fetchall():
     print(col)
 
+print("\nÍndices:")
+for tabla in tablas:
+    for indice in cursor.execute(f"PRAGMA index_list('{tabla}')").fetchall():
+        columnas = [c[2] for c in conn.execute(f"PRAGMA index_info('{indice[1]}')").fetchall()]
+        print(f"{tabla}.{indice[1]}: ({', '.join(columnas)})")
+
+print("\nUso de índices en consultas frecuentes:")
+for nombre, (sql, parametros) in CONSULTAS_FRECUENTES.items():
+    try:
+        plan = cursor.execute(f"EXPLAIN QUERY PLAN {sql}", parametros).fetchall()
+        print(f"{nombre}:")
+        for paso in plan:
+            print(f"  {paso[-1]}")
+    except sqlite3.OperationalError as e:
+        print(f"{nombre}: no disponible ({e})")
+
 conn.close()
@@ -0,0 +1,220 @@
+"""
+Módulo de migraciones versionadas del esquema de la base de datos de equipajes.
+La versión aplicada se guarda en PRAGMA user_version y al iniciar se ejecutan,
+en orden, todas las migraciones pendientes sobre bases nuevas o existentes.
+"""
+
+import time
+import logging
+
+from src.core import archivo, estadisticas, outbox
+from src.core.config import timestamp_a_epoch_ms
+
+logger = logging.getLogger('migraciones')
+
+def _crear_eventos_equipaje(conn):
+    """Tabla principal con el historial de eventos de equipaje."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS eventos_equipaje (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            id_valija TEXT NOT NULL,
+            evento TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            origen TEXT,
+            destino TEXT,
+            peso REAL
+        )
+    ''')
+
+def _crear_valija_estado(conn):
+    """Tabla con el último estado conocido de cada valija, poblada desde el historial."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS valija_estado (
+            id_valija TEXT PRIMARY KEY,
+            estado TEXT NOT NULL,
+            origen TEXT,
+            destino TEXT,
+            peso REAL,
+            ultimo_evento TEXT NOT NULL,
+            id_ultimo_evento INTEGER NOT NULL
+        )
+    ''')
+    conn.execute(
+        'CREATE INDEX IF NOT EXISTS idx_valija_estado_ultimo ON valija_estado (ultimo_evento)'
+    )
+    conn.execute(
+        'CREATE INDEX IF NOT EXISTS idx_valija_estado_estado ON valija_estado (estado, ultimo_evento)'
+    )
+    conn.execute('DELETE FROM valija_estado')
+    conn.execute('''
+        INSERT INTO valija_estado
+        (id_valija, estado, origen, destino, peso, ultimo_evento, id_ultimo_evento)
+        SELECT id_valija, evento, origen, destino, peso, timestamp, id
+        FROM (
+            SELECT e.*, ROW_NUMBER() OVER (
+                PARTITION BY id_valija ORDER BY timestamp DESC, id DESC
+            ) AS orden
+            FROM eventos_equipaje e
+        )
+        WHERE orden = 1
+    ''')
+
+def _crear_indices_eventos(conn):
+    """Índices para el historial por valija, la ventana de 24h y el conteo por tipo."""
+    conn.execute(
+        'CREATE INDEX IF NOT EXISTS idx_valija_timestamp ON eventos_equipaje (id_valija, timestamp)'
+    )
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON eventos_equipaje (timestamp)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_evento ON eventos_equipaje (evento)')
+    # Redundante: (id_valija, timestamp) ya cubre las búsquedas por id_valija
+    conn.execute('DROP INDEX IF EXISTS idx_id_valija')
+    conn.execute('ANALYZE eventos_equipaje')
+
+def _epoch_ms_o_nulo(valor):
+    """Versión tolerante de timestamp_a_epoch_ms para el relleno de datos históricos."""
+    try:
+        return timestamp_a_epoch_ms(valor)
+    except (TypeError, ValueError):
+        return None
+
+def _agregar_timestamp_ms(conn):
+    """Columna numérica timestamp_ms (epoch en milisegundos) para ordenar y filtrar por tiempo."""
+    conn.create_function('epoch_ms', 1, _epoch_ms_o_nulo, deterministic=True)
+    conn.execute('ALTER TABLE eventos_equipaje ADD COLUMN timestamp_ms INTEGER')
+    conn.execute('UPDATE eventos_equipaje SET timestamp_ms = epoch_ms(timestamp)')
+    conn.execute('ALTER TABLE valija_estado ADD COLUMN ultimo_evento_ms INTEGER')
+    
+    # Reemplazar los índices sobre el texto ISO por índices sobre el entero
+    conn.execute('DROP INDEX IF EXISTS idx_valija_timestamp')
+    conn.execute('DROP INDEX IF EXISTS idx_timestamp')
+    conn.execute('DROP INDEX IF EXISTS idx_valija_estado_ultimo')
+    conn.execute('DROP INDEX IF EXISTS idx_valija_estado_estado')
+    conn.execute(
+        'CREATE INDEX idx_valija_timestamp_ms ON eventos_equipaje (id_valija, timestamp_ms)'
+    )
+    conn.execute('CREATE INDEX idx_timestamp_ms ON eventos_equipaje (timestamp_ms)')
+    conn.execute(
+        'CREATE INDEX idx_valija_estado_ultimo_ms ON valija_estado (ultimo_evento_ms)'
+    )
+    conn.execute(
+        'CREATE INDEX idx_valija_estado_estado_ms ON valija_estado (estado, ultimo_evento_ms)'
+    )
+    poblar_valija_estado(conn)
+    conn.execute('ANALYZE eventos_equipaje')
+
+def _crear_estadisticas(conn):
+    """Tablas de contadores precalculados para el dashboard, pobladas desde el historial."""
+    estadisticas.crear_tablas(conn)
+    estadisticas.reconstruir(conn, int(time.time() * 1000))
+
+def _crear_catalogo_archivo(conn):
+    """Catálogo de valijas movidas a los archivos mensuales."""
+    archivo.crear_tabla_catalogo(conn)
+
+def _crear_indices_paginacion(conn):
+    """Índices de valija_estado que incluyen id_valija para la paginación por cursor."""
+    conn.execute('DROP INDEX IF EXISTS idx_valija_estado_ultimo_ms')
+    conn.execute('DROP INDEX IF EXISTS idx_valija_estado_estado_ms')
+    conn.execute(
+        'CREATE INDEX idx_valija_estado_cursor ON valija_estado (ultimo_evento_ms, id_valija)'
+    )
+    conn.execute(
+        'CREATE INDEX idx_valija_estado_estado_cursor '
+        'ON valija_estado (estado, ultimo_evento_ms, id_valija)'
+    )
+
+def _crear_outbox(conn):
+    """Outbox de mensajes para Kafka. Los eventos ya existentes no se vuelven a publicar."""
+    outbox.crear_tabla(conn)
+
+def _catalogo_archivo_por_mes(conn):
+    """Catálogo de archivo con una fila por valija y mes (una valija puede archivarse más de una vez)."""
+    archivo.catalogo_por_mes(conn)
+
+# Lista ordenada de migraciones: (versión, descripción, función)
+MIGRACIONES = [
+    (1, 'Tabla eventos_equipaje', _crear_eventos_equipaje),
+    (2, 'Tabla valija_estado con el estado actual de cada valija', _crear_valija_estado),
+    (3, 'Índices de eventos_equipaje para las consultas frecuentes', _crear_indices_eventos),
+    (4, 'Marca de tiempo numérica timestamp_ms', _agregar_timestamp_ms),
+    (5, 'Contadores precalculados de estadísticas', _crear_estadisticas),
+    (6, 'Catálogo de valijas archivadas', _crear_catalogo_archivo),
+    (7, 'Índices de valija_estado para paginación por cursor', _crear_indices_paginacion),
+    (8, 'Outbox transaccional de mensajes para Kafka', _crear_outbox),
+    (9, 'Catálogo de archivo por valija y mes', _catalogo_archivo_por_mes),
+]
+
+VERSION_ACTUAL = MIGRACIONES[-1][0]
+
+def poblar_valija_estado(conn):
+    """
+    Reemplaza el contenido de valija_estado con el último evento de cada valija.
+    Debe ejecutarse dentro de una transacción.
+
+    Args:
+        conn (sqlite3.Connection): Conexión a la base de datos.
+    """
+    conn.execute('DELETE FROM valija_estado')
+    conn.execute('''
+        INSERT INTO valija_estado
+        (id_valija, estado, origen, destino, peso, ultimo_evento, ultimo_evento_ms, id_ultimo_evento)
+        SELECT id_valija, evento, origen, destino, peso, timestamp, timestamp_ms, id
+        FROM (
+            SELECT e.*, ROW_NUMBER() OVER (
+                PARTITION BY id_valija ORDER BY timestamp_ms DESC, id DESC
+            ) AS orden
+            FROM eventos_equipaje e
+        )
+        WHERE orden = 1
+    ''')
+
+def obtener_version(conn):
+    """
+    Obtiene la versión de esquema registrada en la base de datos.
+
+    Args:
+        conn (sqlite3.Connection): Conexión a la base de datos.
+
+    Returns:
+        int: Versión actual (0 si nunca se aplicó ninguna migración).
+    """
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def aplicar_migraciones(conn):
+    """
+    Aplica en orden las migraciones pendientes, cada una en su propia transacción
+    junto con la actualización de PRAGMA user_version. Es seguro ejecutarla desde
+    varios procesos a la vez (workers WSGI o scripts de mantenimiento):
+    cada migración toma el lock de escritura y vuelve a leer la versión antes de
+    aplicarse, por lo que solo la aplica el primero que llega.
+
+    Args:
+        conn (sqlite3.Connection): Conexión a la base de datos.
+
+    Returns:
+        int: Cantidad de migraciones aplicadas.
+    """
+    version = obtener_version(conn)
+    aplicadas = 0
+    for numero, descripcion, migracion in MIGRACIONES:
+        if numero <= version:
+            continue
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            # Otra conexión pudo aplicarla después de la lectura anterior
+            version = obtener_version(conn)
+            if numero <= version:
+                conn.rollback()
+                continue
+            logger.info(f"Aplicando migración {numero}: {descripcion}")
+            migracion(conn)
+            conn.execute(f'PRAGMA user_version = {int(numero)}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.error(f"Falló la migración {numero}: {descripcion}")
+            raise
+        aplicadas += 1
+    if aplicadas:
+        logger.info(f"Esquema actualizado a la versión {VERSION_ACTUAL}")
+    return aplicadas
@@ -0,0 +1,141 @@
+"""
+Centro de notificaciones en proceso (publicación/suscripción) para el stream en tiempo real.
+Las inserciones de eventos y el simulador publican mensajes; cada conexión a
+GET /api/stream es un suscriptor con su propia cola. Los últimos mensajes se
+conservan numerados para que un cliente que se reconecta pueda reanudar desde
+su Last-Event-ID sin perder eventos.
+"""
+
+import time
+import queue
+import logging
+import threading
+from collections import Counter, deque
+
+from src.core.config import Config
+
+logger = logging.getLogger('notificaciones')
+
+class Suscripcion:
+    """Cola de mensajes de un suscriptor del centro de notificaciones."""
+
+    def __init__(self, tamano_cola):
+        self._cola = queue.Queue(maxsize=tamano_cola)
+        # True si el cliente debe recargar el estado completo (no se pudo reanudar
+        # desde su Last-Event-ID o su cola se desbordó)
+        self.reiniciar = False
+
+    def entregar(self, mensaje):
+        """Encola un mensaje; si la cola está llena descarta y marca el reinicio."""
+        try:
+            self._cola.put_nowait(mensaje)
+        except queue.Full:
+            self.reiniciar = True
+
+    def siguiente(self, timeout):
+        """
+        Espera el próximo mensaje.
+
+        Args:
+            timeout (float): Segundos máximos de espera.
+
+        Returns:
+            tuple: (id, tipo, datos), o None si no llegó ningún mensaje a tiempo.
+        """
+        try:
+            return self._cola.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+class CentroNotificaciones:
+    """Distribuye mensajes numerados a todos los suscriptores activos."""
+
+    def __init__(self, max_suscriptores, tamano_historial, tamano_cola):
+        self._lock = threading.Lock()
+        self._secuencia = 0
+        self._historial = deque(maxlen=tamano_historial)
+        self._suscriptores = set()
+        self._max_suscriptores = max_suscriptores
+        self._tamano_cola = tamano_cola
+
+    def publicar(self, tipo, datos):
+        """
+        Publica un mensaje para todos los suscriptores.
+
+        Args:
+            tipo (str): Tipo de mensaje ('evento', 'estadisticas_delta', 'simulador').
+            datos (dict): Contenido serializable a JSON.
+        """
+        with self._lock:
+            self._secuencia += 1
+            mensaje = (self._secuencia, tipo, datos)
+            self._historial.append(mensaje)
+            for suscripcion in self._suscriptores:
+                suscripcion.entregar(mensaje)
+
+    def suscribir(self, ultimo_id=None):
+        """
+        Registra un suscriptor. Si se indica ultimo_id, se le reenvían los mensajes
+        posteriores que sigan en el historial; si ya no están, se marca el reinicio.
+
+        Args:
+            ultimo_id (int, optional): Id del último mensaje recibido (Last-Event-ID).
+
+        Returns:
+            Suscripcion: Nueva suscripción, o None si se alcanzó el máximo de suscriptores.
+        """
+        with self._lock:
+            if len(self._suscriptores) >= self._max_suscriptores:
+                return None
+            suscripcion = Suscripcion(self._tamano_cola)
+            if ultimo_id is not None:
+                primero = self._historial[0][0] if self._historial else self._secuencia + 1
+                if ultimo_id > self._secuencia or ultimo_id < primero - 1:
+                    # Id de otra ejecución del servidor o mensajes ya descartados
+                    suscripcion.reiniciar = True
+                else:
+                    for mensaje in self._historial:
+                        if mensaje[0] > ultimo_id:
+                            suscripcion.entregar(mensaje)
+            self._suscriptores.add(suscripcion)
+            return suscripcion
+
+    def cancelar(self, suscripcion):
+        """Elimina un suscriptor (al cerrarse su conexión)."""
+        with self._lock:
+            self._suscriptores.discard(suscripcion)
+
+    def cantidad_suscriptores(self):
+        """Cantidad de suscriptores activos."""
+        with self._lock:
+            return len(self._suscriptores)
+
+# Centro compartido por todo el proceso
+centro = CentroNotificaciones(Config.SSE_MAX_SUSCRIPTORES, Config.SSE_HISTORIAL,
+                              Config.SSE_COLA_SUSCRIPTOR)
+
+def publicar_eventos(eventos, valijas_nuevas):
+    """
+    Publica eventos recién insertados y la variación de estadísticas que producen.
+    Debe llamarse después de confirmar la transacción de la inserción.
+
+    Args:
+        eventos (list): Eventos insertados (diccionarios con id, id_valija, evento,
+            timestamp, timestamp_ms, origen, destino y peso).
+        valijas_nuevas (int): Cantidad de valijas que aparecen por primera vez.
+    """
+    try:
+        if not eventos:
+            return
+        limite_24h = int(time.time() * 1000) - 24 * 60 * 60 * 1000
+        for evento in eventos:
+            centro.publicar('evento', evento)
+        centro.publicar('estadisticas_delta', {
+            'por_tipo': dict(Counter(e['evento'] for e in eventos)),
+            'ultimas_24h': sum(1 for e in eventos
+                               if e['timestamp_ms'] is not None and e['timestamp_ms'] >= limite_24h),
+            'valijas_unicas': valijas_nuevas,
+            'hasta_id': max(e['id'] for e in eventos)
+        })
+    except Exception as e:
+        logger.error(f"Error al publicar notificación de eventos: {e}")
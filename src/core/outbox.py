@@ -0,0 +1,133 @@
+"""
+Outbox transaccional de los eventos que se publican en Kafka.
+Cada inserción en eventos_equipaje agrega, en la misma transacción, el mensaje que
+debe llegar al tópico de Kafka. El relay (src/eda/relay_outbox.py) lee los mensajes
+pendientes en lotes, los publica y los marca como enviados, de modo que la base y
+Kafka no divergen aunque el broker esté caído cuando se registra el evento.
+"""
+
+import json
+import logging
+
+from src.core.config import Config
+
+logger = logging.getLogger('outbox')
+
+def outbox_activo():
+    """Indica si los eventos se publican en Kafka a través del outbox (solo con SQLite)."""
+    return Config.OUTBOX_HABILITADO and Config.BACKEND_ALMACENAMIENTO == 'sqlite'
+
+def crear_tabla(conn):
+    """
+    Crea la tabla del outbox si no existe.
+
+    Args:
+        conn (sqlite3.Connection): Conexión a la base de datos.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS outbox_kafka (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            id_evento INTEGER NOT NULL,
+            mensaje TEXT NOT NULL,
+            creado_ms INTEGER NOT NULL,
+            enviado_ms INTEGER
+        )
+    ''')
+    # Índice parcial: el relay solo recorre los mensajes pendientes
+    conn.execute(
+        'CREATE INDEX IF NOT EXISTS idx_outbox_pendientes ON outbox_kafka (id) '
+        'WHERE enviado_ms IS NULL'
+    )
+    conn.execute(
+        'CREATE INDEX IF NOT EXISTS idx_outbox_enviados ON outbox_kafka (enviado_ms) '
+        'WHERE enviado_ms IS NOT NULL'
+    )
+
+def mensaje_kafka(id_valija, evento, timestamp_ms, origen, destino, peso):
+    """
+    Arma el mensaje que espera el consumidor del tópico eventos_equipaje.
+
+    Returns:
+        dict: Mensaje con 'equipaje_id', 'estado', 'timestamp' (epoch en segundos),
+        'origen', 'destino' y 'peso'.
+    """
+    return {
+        'equipaje_id': id_valija,
+        'estado': evento,
+        'timestamp': timestamp_ms // 1000,
+        'origen': origen,
+        'destino': destino,
+        'peso': float(peso) if peso is not None else None
+    }
+
+def registrar(conn, eventos, ahora_ms):
+    """
+    Agrega al outbox los mensajes de un grupo de eventos recién insertados.
+    Debe ejecutarse dentro de la transacción de la inserción.
+
+    Args:
+        conn (sqlite3.Connection): Conexión a la base de datos.
+        eventos (list): Tuplas (id, id_valija, evento, timestamp_ms, origen, destino, peso).
+        ahora_ms (int): Hora actual en epoch ms.
+    """
+    conn.executemany(
+        'INSERT INTO outbox_kafka (id_evento, mensaje, creado_ms) VALUES (?, ?, ?)',
+        [(id_evento, json.dumps(mensaje_kafka(*datos)), ahora_ms)
+         for id_evento, *datos in eventos]
+    )
+
+def obtener_pendientes(conn, limite):
+    """
+    Lee los mensajes pendientes más antiguos, en orden de inserción.
+
+    Args:
+        conn (sqlite3.Connection): Conexión a la base de datos.
+        limite (int): Cantidad máxima de mensajes.
+
+    Returns:
+        list: Tuplas (id, mensaje) con el mensaje ya decodificado.
+    """
+    filas = conn.execute(
+        'SELECT id, mensaje FROM outbox_kafka WHERE enviado_ms IS NULL ORDER BY id LIMIT ?',
+        (limite,)
+    ).fetchall()
+    return [(fila[0], json.loads(fila[1])) for fila in filas]
+
+def marcar_enviados(conn, ids, ahora_ms):
+    """
+    Marca mensajes como publicados.
+
+    Args:
+        conn (sqlite3.Connection): Conexión a la base de datos.
+        ids (list): Ids de outbox_kafka confirmados por el broker.
+        ahora_ms (int): Hora actual en epoch ms.
+    """
+    conn.executemany(
+        'UPDATE outbox_kafka SET enviado_ms = ? WHERE id = ?',
+        [(ahora_ms, id_outbox) for id_outbox in ids]
+    )
+
+def purgar_enviados(conn, antes_ms):
+    """
+    Elimina los mensajes enviados antes de antes_ms.
+
+    Returns:
+        int: Cantidad de mensajes eliminados.
+    """
+    cursor = conn.execute(
+        'DELETE FROM outbox_kafka WHERE enviado_ms IS NOT NULL AND enviado_ms < ?',
+        (antes_ms,)
+    )
+    return cursor.rowcount
+
+def obtener_estado(conn):
+    """
+    Resumen del outbox para monitoreo.
+
+    Returns:
+        dict: 'pendientes' y 'creado_ms_mas_antiguo' (None si no hay pendientes).
+    """
+    pendientes, mas_antiguo = conn.execute(
+        'SELECT COUNT(*), MIN(creado_ms) FROM outbox_kafka WHERE enviado_ms IS NULL'
+    ).fetchone()
+    return {'pendientes': pendientes, 'creado_ms_mas_antiguo': mas_antiguo}
@@ -0,0 +1,27 @@
+"""
+Script para reconstruir las tablas derivadas del historial de eventos_equipaje:
+el estado actual de cada valija (valija_estado) y los contadores de estadísticas.
+Uso: python src/core/reconstruir_estado.py
+"""
+import os
+import sys
+
+# Ajustar el path para las importaciones
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.core.db_service import DB_PATH, reconstruir_valija_estado, reconstruir_estadisticas
+
+if not os.path.exists(DB_PATH):
+    print(f"No se encontró la base de datos en {DB_PATH}")
+    exit(1)
+
+cantidad = reconstruir_valija_estado()
+if cantidad < 0:
+    print("Error al reconstruir la tabla valija_estado")
+    exit(1)
+print(f"Tabla valija_estado reconstruida: {cantidad} valijas")
+
+if not reconstruir_estadisticas():
+    print("Error al reconstruir los contadores de estadísticas")
+    exit(1)
+print("Contadores de estadísticas reconstruidos")
@@ -0,0 +1,192 @@
+"""
+Interfaz de almacenamiento de eventos de equipaje (patrón repositorio).
+Las rutas API y el simulador acceden a los datos a través de obtener_repositorio(),
+que devuelve el motor configurado en Config.BACKEND_ALMACENAMIENTO:
+    - 'sqlite': base de datos en data/equipajes.db (ver db_service.py).
+    - 'memoria': motor en memoria indexado, sin E/S de disco (pruebas de carga y benchmarks).
+"""
+
+import os
+import abc
+import logging
+import threading
+
+from src.core.config import Config
+
+logger = logging.getLogger('repositorio')
+
+class RepositorioEventos(abc.ABC):
+    """
+    Operaciones que debe implementar todo motor de almacenamiento de eventos.
+    Un motor al que le falta alguna no se puede instanciar.
+    """
+
+    nombre = None
+
+    @abc.abstractmethod
+    def inicializar(self):
+        """
+        Prepara el almacenamiento para su uso.
+
+        Returns:
+            bool: True si el almacenamiento quedó listo.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def insertar_evento(self, id_valija, evento, origen, destino, peso, timestamp=None):
+        """Inserta un evento. Devuelve True si se insertó correctamente."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def insertar_eventos_lote(self, eventos):
+        """Inserta un lote de eventos de forma atómica. Devuelve la cantidad o -1 si hubo un error."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def obtener_eventos(self, limit=100, antes=None, since_id=None, filtros=None):
+        """
+        Devuelve los eventos más recientes, del más nuevo al más antiguo.
+        `antes` es el cursor (timestamp_ms, id) de la página anterior, `since_id` limita
+        a eventos insertados después de ese id y `filtros` admite las claves 'estados',
+        'aeropuerto', 'desde_ms', 'hasta_ms' y 'prefijo'.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def obtener_valija(self, id_valija):
+        """Devuelve el historial de eventos de una valija ordenado por tiempo."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def obtener_historial_valijas(self, ids, solo_ultimo=False):
+        """
+        Devuelve {id_valija: historial} para varias valijas a la vez, o
+        {id_valija: último evento} si solo_ultimo es True.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def iterar_eventos(self, filtros=None, tamano_bloque=None):
+        """
+        Recorre todos los eventos que cumplen los filtros en orden de inserción, en
+        bloques de tuplas con las columnas de archivo.COLUMNAS_EVENTO (para exportar).
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def obtener_todas_valijas(self, limit=None, antes=None, filtros=None):
+        """
+        Devuelve el estado actual de las valijas, de la más reciente a la más antigua.
+        `antes` es el cursor (ultimo_evento_ms, id_valija) de la página anterior.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def obtener_estadisticas(self):
+        """
+        Devuelve un diccionario con 'por_tipo', 'ultimas_24h', 'valijas_unicas' y
+        'ultimo_id' (id del evento más reciente incluido en los contadores).
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def obtener_valijas_incompletas(self, limit=10):
+        """Devuelve las valijas cuyo último evento no es una entrega."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def obtener_version_datos(self):
+        """
+        Devuelve un token barato que cambia con cada modificación de los datos
+        (para las respuestas condicionales de la API), o None si no está disponible.
+        """
+        raise NotImplementedError
+
+    def estadisticas_cache(self):
+        """Contadores de la caché de lecturas (vacío si el motor no usa caché)."""
+        return []
+
+class RepositorioSQLite(RepositorioEventos):
+    """Motor SQLite: delega en las funciones de db_service."""
+
+    nombre = 'sqlite'
+
+    def __init__(self):
+        from src.core import db_service
+        self._db = db_service
+
+    def inicializar(self):
+        self._db.inicializar_db()
+        return os.path.exists(self._db.DB_PATH)
+
+    def insertar_evento(self, id_valija, evento, origen, destino, peso, timestamp=None):
+        return self._db.insertar_evento(id_valija, evento, origen, destino, peso, timestamp)
+
+    def insertar_eventos_lote(self, eventos):
+        return self._db.insertar_eventos_lote(eventos)
+
+    def obtener_eventos(self, limit=100, antes=None, since_id=None, filtros=None):
+        return self._db.obtener_eventos(limit, antes, since_id, filtros)
+
+    def obtener_valija(self, id_valija):
+        return self._db.obtener_valija(id_valija)
+
+    def obtener_historial_valijas(self, ids, solo_ultimo=False):
+        return self._db.obtener_historial_valijas(ids, solo_ultimo)
+
+    def iterar_eventos(self, filtros=None, tamano_bloque=None):
+        return self._db.iterar_eventos(filtros, tamano_bloque)
+
+    def obtener_todas_valijas(self, limit=None, antes=None, filtros=None):
+        return self._db.obtener_todas_valijas(limit, antes, filtros)
+
+    def obtener_estadisticas(self):
+        return self._db.obtener_estadisticas()
+
+    def obtener_valijas_incompletas(self, limit=10):
+        return self._db.obtener_valijas_incompletas(limit)
+
+    def obtener_version_datos(self):
+        return self._db.obtener_version_datos()
+
+def crear_repositorio(nombre):
+    """
+    Crea un motor de almacenamiento por nombre.
+
+    Args:
+        nombre (str): 'sqlite' o 'memoria'.
+
+    Returns:
+        RepositorioEventos: Nueva instancia del motor.
+    """
+    if nombre == 'sqlite':
+        return RepositorioSQLite()
+    if nombre == 'memoria':
+        from src.core.repositorio_memoria import RepositorioMemoria
+        return RepositorioMemoria()
+    raise ValueError(f"Backend de almacenamiento desconocido: {nombre}")
+
+_repositorio = None
+_lock = threading.Lock()
+
+def obtener_repositorio():
+    """
+    Devuelve el motor de almacenamiento configurado (una única instancia por proceso),
+    envuelto en la caché de lecturas si Config.CACHE_HABILITADA.
+
+    Returns:
+        RepositorioEventos: Motor seleccionado en Config.BACKEND_ALMACENAMIENTO.
+    """
+    global _repositorio
+    if _repositorio is None:
+        with _lock:
+            if _repositorio is None:
+                repositorio = crear_repositorio(Config.BACKEND_ALMACENAMIENTO)
+                if Config.CACHE_HABILITADA:
+                    from src.core.repositorio_cache import RepositorioCache
+                    repositorio = RepositorioCache(repositorio)
+                _repositorio = repositorio
+                logger.info(f"Usando backend de almacenamiento: {_repositorio.nombre}"
+                            f"{' con caché de lecturas' if Config.CACHE_HABILITADA else ''}")
+    return _repositorio
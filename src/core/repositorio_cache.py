@@ -0,0 +1,102 @@
+"""
+Repositorio con caché de lecturas delante de otro motor de almacenamiento.
+Las consultas por valija y las agregadas (listados, estadísticas) se guardan en
+cachés separadas; las entradas vencen por TTL.
+
+Todas las consultas llevan en la clave la versión de los datos del motor (la misma
+que usa la API para el ETag), leída antes de consultar: una respuesta nunca se sirve
+con un ETag más nuevo que sus datos, aunque la lectura ocurra entre el commit de una
+escritura y su invalidación, y los cambios hechos por otros procesos (otros workers
+WSGI, el relay o el script de archivo) se ven de inmediato. Cada escritura por este
+repositorio además vacía ambas cachés, cuyas entradas ya no se pueden volver a pedir.
+"""
+
+import logging
+
+from src.core.cache import CacheLRU
+from src.core.config import Config
+from src.core.repositorio import RepositorioEventos
+
+logger = logging.getLogger('repositorio-cache')
+
+def _clave_filtros(filtros):
+    """Convierte el diccionario de filtros en una tupla hashable para la clave de caché."""
+    if not filtros:
+        return None
+    return tuple(sorted(
+        (nombre, tuple(valor) if isinstance(valor, list) else valor)
+        for nombre, valor in filtros.items()
+    ))
+
+class RepositorioCache(RepositorioEventos):
+    """Envuelve un motor y cachea sus lecturas con invalidación por escritura."""
+
+    def __init__(self, motor, max_entradas=None, ttl=None):
+        self._motor = motor
+        self.nombre = motor.nombre
+        max_entradas = max_entradas or Config.CACHE_MAX_ENTRADAS
+        ttl = ttl or Config.CACHE_TTL
+        self._por_valija = CacheLRU('valijas', max_entradas, ttl)
+        self._agregados = CacheLRU('agregados', max_entradas, ttl)
+
+    def _clave_consulta(self, *consulta):
+        """Clave de una consulta: la versión actual de los datos más la consulta."""
+        return (self._motor.obtener_version_datos(),) + consulta
+
+    def _invalidar(self):
+        """Vacía ambas cachés: tras una escritura sus claves llevan una versión vieja."""
+        self._por_valija.invalidar()
+        self._agregados.invalidar()
+
+    def inicializar(self):
+        return self._motor.inicializar()
+
+    def insertar_evento(self, id_valija, evento, origen, destino, peso, timestamp=None):
+        resultado = self._motor.insertar_evento(id_valija, evento, origen, destino, peso, timestamp)
+        self._invalidar()
+        return resultado
+
+    def insertar_eventos_lote(self, eventos):
+        resultado = self._motor.insertar_eventos_lote(eventos)
+        self._invalidar()
+        return resultado
+
+    def obtener_eventos(self, limit=100, antes=None, since_id=None, filtros=None):
+        clave = self._clave_consulta('eventos', limit, tuple(antes) if antes else None, since_id,
+                                     _clave_filtros(filtros))
+        return self._agregados.obtener(
+            clave, lambda: self._motor.obtener_eventos(limit, antes, since_id, filtros))
+
+    def obtener_valija(self, id_valija):
+        return self._por_valija.obtener(
+            self._clave_consulta('valija', id_valija), lambda: self._motor.obtener_valija(id_valija))
+
+    def obtener_historial_valijas(self, ids, solo_ultimo=False):
+        # Consulta por lote ya optimizada; la combinación de ids rara vez se repite
+        return self._motor.obtener_historial_valijas(ids, solo_ultimo)
+
+    def iterar_eventos(self, filtros=None, tamano_bloque=None):
+        # Recorridos completos para exportar: no se cachean
+        return self._motor.iterar_eventos(filtros, tamano_bloque)
+
+    def obtener_todas_valijas(self, limit=None, antes=None, filtros=None):
+        clave = self._clave_consulta('valijas', limit, tuple(antes) if antes else None,
+                                     _clave_filtros(filtros))
+        return self._agregados.obtener(
+            clave, lambda: self._motor.obtener_todas_valijas(limit, antes, filtros))
+
+    def obtener_estadisticas(self):
+        return self._agregados.obtener(self._clave_consulta('estadisticas'), self._motor.obtener_estadisticas)
+
+    def obtener_valijas_incompletas(self, limit=10):
+        return self._agregados.obtener(
+            self._clave_consulta('incompletas', limit),
+            lambda: self._motor.obtener_valijas_incompletas(limit))
+
+    def obtener_version_datos(self):
+        # Debe reflejar el estado real del motor (se usa para validar respuestas 304)
+        return self._motor.obtener_version_datos()
+
+    def estadisticas_cache(self):
+        """Contadores de aciertos y fallos de cada caché."""
+        return [self._por_valija.estadisticas(), self._agregados.estadisticas()]
@@ -0,0 +1,251 @@
+"""
+Motor de almacenamiento en memoria para eventos de equipaje.
+Mantiene los mismos índices que la base SQLite, pero como estructuras de Python:
+    - historial por valija: dict de listas ordenadas por (timestamp_ms, id);
+    - índice temporal global: lista ordenada de (timestamp_ms, id);
+    - estado actual: dict por valija más una lista ordenada por último evento;
+    - contadores por tipo de evento.
+No persiste nada en disco; pensado para pruebas de carga y benchmarks.
+"""
+
+import bisect
+import logging
+import threading
+from collections import Counter
+from datetime import timedelta
+
+from src.core import notificaciones
+from src.core.archivo import COLUMNAS_EVENTO
+from src.core.config import Config, get_datetime_argentina, timestamp_a_epoch_ms
+from src.core.repositorio import RepositorioEventos
+
+logger = logging.getLogger('repositorio-memoria')
+
+COLUMNAS = [columna.strip() for columna in COLUMNAS_EVENTO.split(',')]
+
+class RepositorioMemoria(RepositorioEventos):
+    """Motor en memoria indexado, seguro para múltiples hilos."""
+
+    nombre = 'memoria'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._siguiente_id = 1
+        self._eventos = {}              # id -> evento
+        self._por_valija = {}           # id_valija -> [(timestamp_ms, id), ...] ordenada
+        self._indice_tiempo = []        # [(timestamp_ms, id), ...] ordenada
+        self._estado = {}               # id_valija -> (timestamp_ms, id) del último evento
+        self._indice_estado = []        # [(timestamp_ms, id_valija), ...] ordenada
+        self._por_tipo = Counter()
+
+    def inicializar(self):
+        return True
+
+    def _preparar(self, id_valija, evento, origen, destino, peso, timestamp):
+        """Construye el evento a insertar; lanza ValueError si la marca de tiempo es inválida."""
+        if timestamp is None:
+            timestamp = get_datetime_argentina().isoformat()
+        return {
+            'id_valija': id_valija,
+            'evento': evento,
+            'timestamp': timestamp,
+            'timestamp_ms': timestamp_a_epoch_ms(timestamp),
+            'origen': origen,
+            'destino': destino,
+            'peso': peso
+        }
+
+    def _agregar(self, evento):
+        """
+        Agrega un evento ya preparado a todos los índices. Requiere tener el lock.
+        Devuelve True si es el primer evento de la valija.
+        """
+        evento['id'] = self._siguiente_id
+        self._siguiente_id += 1
+        clave = (evento['timestamp_ms'], evento['id'])
+        id_valija = evento['id_valija']
+        valija_nueva = id_valija not in self._por_valija
+
+        self._eventos[evento['id']] = evento
+        bisect.insort(self._por_valija.setdefault(id_valija, []), clave)
+        bisect.insort(self._indice_tiempo, clave)
+        self._por_tipo[evento['evento']] += 1
+
+        # Actualizar el estado actual solo si el evento no es más antiguo que el registrado
+        anterior = self._estado.get(id_valija)
+        if anterior is None or clave >= anterior:
+            if anterior is not None:
+                posicion = bisect.bisect_left(self._indice_estado, (anterior[0], id_valija))
+                del self._indice_estado[posicion]
+            self._estado[id_valija] = clave
+            bisect.insort(self._indice_estado, (clave[0], id_valija))
+        return valija_nueva
+
+    def insertar_evento(self, id_valija, evento, origen, destino, peso, timestamp=None):
+        try:
+            nuevo = self._preparar(id_valija, evento, origen, destino, peso, timestamp)
+            with self._lock:
+                valija_nueva = self._agregar(nuevo)
+            logger.debug(f"Evento insertado: {evento} para valija {id_valija}")
+            notificaciones.publicar_eventos([dict(nuevo)], int(valija_nueva))
+            return True
+        except Exception as e:
+            logger.error(f"Error al insertar evento: {e}")
+            return False
+
+    def insertar_eventos_lote(self, eventos):
+        try:
+            # Validar todo el lote antes de modificar los índices
+            nuevos = [
+                self._preparar(e['id_valija'], e['evento'], e.get('origen'), e.get('destino'),
+                               e.get('peso'), e.get('timestamp'))
+                for e in eventos
+            ]
+            with self._lock:
+                valijas_nuevas = sum(self._agregar(nuevo) for nuevo in nuevos)
+            notificaciones.publicar_eventos([dict(nuevo) for nuevo in nuevos], valijas_nuevas)
+            return len(nuevos)
+        except Exception as e:
+            logger.error(f"Error al insertar lote de eventos: {e}")
+            return -1
+
+    @staticmethod
+    def _cumple_filtros(estado, evento, timestamp_ms, filtros):
+        """Indica si un evento (o estado de valija) cumple los filtros de consulta."""
+        if not filtros:
+            return True
+        if filtros.get('estados') and estado not in filtros['estados']:
+            return False
+        aeropuerto = filtros.get('aeropuerto')
+        if aeropuerto and aeropuerto not in (evento['origen'], evento['destino']):
+            return False
+        if filtros.get('desde_ms') is not None and timestamp_ms < filtros['desde_ms']:
+            return False
+        if filtros.get('hasta_ms') is not None and timestamp_ms >= filtros['hasta_ms']:
+            return False
+        if filtros.get('prefijo') and not evento['id_valija'].startswith(filtros['prefijo']):
+            return False
+        return True
+
+    def obtener_eventos(self, limit=100, antes=None, since_id=None, filtros=None):
+        with self._lock:
+            if since_id is not None:
+                # Los ids son crecientes: recorrer solo los insertados después de since_id
+                claves = sorted(
+                    (self._eventos[i]['timestamp_ms'], i)
+                    for i in range(max(since_id + 1, 1), self._siguiente_id)
+                )
+            else:
+                claves = self._indice_tiempo
+            fin = bisect.bisect_left(claves, tuple(antes)) if antes is not None else len(claves)
+
+            resultado = []
+            for posicion in range(fin - 1, -1, -1):
+                if len(resultado) >= limit:
+                    break
+                timestamp_ms, id_evento = claves[posicion]
+                evento = self._eventos[id_evento]
+                if self._cumple_filtros(evento['evento'], evento, timestamp_ms, filtros):
+                    resultado.append(dict(evento))
+            return resultado
+
+    def obtener_valija(self, id_valija):
+        with self._lock:
+            return [dict(self._eventos[id_evento])
+                    for _, id_evento in self._por_valija.get(id_valija, [])]
+
+    def obtener_historial_valijas(self, ids, solo_ultimo=False):
+        resultado = {}
+        with self._lock:
+            for id_valija in ids:
+                if id_valija not in self._por_valija:
+                    continue
+                if solo_ultimo:
+                    resultado[id_valija] = dict(self._eventos[self._estado[id_valija][1]])
+                else:
+                    resultado[id_valija] = [dict(self._eventos[id_evento])
+                                            for _, id_evento in self._por_valija[id_valija]]
+        return resultado
+
+    def iterar_eventos(self, filtros=None, tamano_bloque=None):
+        tamano_bloque = tamano_bloque or Config.EXPORT_TAMANO_BLOQUE
+        siguiente = 1
+        while True:
+            # Tomar el lock por bloque para no frenar las inserciones durante la exportación
+            with self._lock:
+                fin = min(siguiente + tamano_bloque, self._siguiente_id)
+                bloque = []
+                for id_evento in range(siguiente, fin):
+                    evento = self._eventos[id_evento]
+                    if self._cumple_filtros(evento['evento'], evento, evento['timestamp_ms'], filtros):
+                        bloque.append(tuple(evento[columna] for columna in COLUMNAS))
+            if fin <= siguiente:
+                break
+            siguiente = fin
+            if bloque:
+                yield bloque
+
+    def _valija(self, id_evento):
+        """Fila de estado actual a partir del último evento de una valija."""
+        evento = self._eventos[id_evento]
+        return {
+            'id_valija': evento['id_valija'] or '',
+            'ultimo_evento': evento['timestamp'] or '',
+            'ultimo_evento_ms': evento['timestamp_ms'],
+            'estado': evento['evento'] or 'desconocido',
+            'origen': evento['origen'] or 'No especificado',
+            'destino': evento['destino'] or 'No especificado',
+            'peso': evento['peso']
+        }
+
+    def obtener_todas_valijas(self, limit=None, antes=None, filtros=None):
+        resultado = []
+        with self._lock:
+            fin = len(self._indice_estado)
+            if antes is not None:
+                fin = bisect.bisect_left(self._indice_estado, tuple(antes))
+            for posicion in range(fin - 1, -1, -1):
+                if limit is not None and len(resultado) >= limit:
+                    break
+                timestamp_ms, id_valija = self._indice_estado[posicion]
+                id_evento = self._estado[id_valija][1]
+                evento = self._eventos[id_evento]
+                if self._cumple_filtros(evento['evento'], evento, timestamp_ms, filtros):
+                    resultado.append(self._valija(id_evento))
+        return resultado
+
+    def obtener_estadisticas(self):
+        limite_ms = timestamp_a_epoch_ms(get_datetime_argentina() - timedelta(hours=24))
+        with self._lock:
+            recientes = len(self._indice_tiempo) - bisect.bisect_right(
+                self._indice_tiempo, (limite_ms, float('inf')))
+            return {
+                'por_tipo': [{'evento': evento, 'cantidad': cantidad}
+                             for evento, cantidad in sorted(self._por_tipo.items())],
+                'ultimas_24h': recientes,
+                'valijas_unicas': len(self._por_valija),
+                'ultimo_id': self._siguiente_id - 1
+            }
+
+    def obtener_valijas_incompletas(self, limit=10):
+        resultado = []
+        with self._lock:
+            for _, id_valija in reversed(self._indice_estado):
+                if len(resultado) >= limit:
+                    break
+                evento = self._eventos[self._estado[id_valija][1]]
+                if evento['evento'] != 'equipaje_entregado':
+                    resultado.append({
+                        'id_valija': evento['id_valija'],
+                        'evento': evento['evento'],
+                        'origen': evento['origen'],
+                        'destino': evento['destino'],
+                        'peso': evento['peso'],
+                        'timestamp': evento['timestamp']
+                    })
+        return resultado
+
+    def obtener_version_datos(self):
+        # Los ids son crecientes y este motor no archiva: el último id identifica el estado
+        with self._lock:
+            return str(self._siguiente_id - 1)
@@ -0,0 +1,271 @@
+"""
+Analítica por ventanas de tiempo del flujo de eventos, por aeropuerto y por ruta.
+El consumidor agrega cada evento, según su marca de tiempo, en ventanas fijas
+(tumbling) de ANALITICA_PASO segundos: cantidad de eventos por estado, pérdidas y
+tiempos escaneado→cargado y cargado→entregado (calculados con el estado anterior de
+la valija, que el consumidor ya mantiene). Sobre esas ventanas mantiene además una
+ventana deslizante de ANALITICA_VENTANA segundos que avanza de a un paso: al entrar
+un evento se suma a los totales y al salir una ventana fija se restan sus valores,
+de modo que nunca se recorren los eventos.
+
+La memoria está acotada: la ventana deslizante conserva solo sus últimas ventanas
+fijas y cada dimensión admite hasta ANALITICA_MAX_CLAVES claves (las demás se
+agrupan en 'otros'). Lo agregado desde el último checkpoint se guarda como
+incrementos en la tabla estadisticas_ventana del almacén de estado, en la misma
+transacción que los offsets: al reiniciar no se cuenta dos veces un evento, y varios
+consumidores del grupo suman sobre las mismas filas. La API (GET /api/analitica)
+arma las ventanas deslizantes sumando las ventanas fijas guardadas.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+
+logger = logging.getLogger('analitica')
+
+ANALITICA_PASO = int(os.environ.get('ANALITICA_PASO', 60))              # Segundos de cada ventana fija
+ANALITICA_VENTANA = int(os.environ.get('ANALITICA_VENTANA', 15 * 60))    # Segundos de la ventana deslizante
+ANALITICA_MAX_CLAVES = int(os.environ.get('ANALITICA_MAX_CLAVES', 500))  # Aeropuertos o rutas por dimensión
+ANALITICA_RETENCION_DIAS = 7                                            # Ventanas fijas guardadas
+
+DIMENSIONES = ('aeropuerto', 'ruta')
+CAMPOS = ('eventos', 'escaneados', 'cargados', 'entregados', 'perdidos',
+          'carga_total_s', 'carga_cantidad', 'entrega_total_s', 'entrega_cantidad')
+CLAVE_OTROS = 'otros'
+
+class Acumulado:
+    """Totales de una clave en una ventana."""
+
+    __slots__ = CAMPOS
+
+    def __init__(self):
+        for campo in CAMPOS:
+            setattr(self, campo, 0)
+
+    def sumar(self, otro, signo=1):
+        for campo in CAMPOS:
+            setattr(self, campo, getattr(self, campo) + signo * getattr(otro, campo))
+
+    def vacio(self):
+        return self.eventos == 0
+
+    def valores(self):
+        return tuple(getattr(self, campo) for campo in CAMPOS)
+
+def resumir(clave, valores, segundos):
+    """
+    Métricas derivadas de los totales de una ventana.
+
+    Args:
+        clave (str): Aeropuerto o ruta.
+        valores (dict): Totales por campo (ver CAMPOS).
+        segundos (float): Duración de la ventana.
+
+    Returns:
+        dict: Totales más eventos por minuto, tasa de pérdida y tiempos promedio.
+    """
+    finalizadas = valores['entregados'] + valores['perdidos']
+    return {
+        'clave': clave,
+        'eventos': valores['eventos'],
+        'eventos_por_minuto': round(valores['eventos'] * 60 / segundos, 2) if segundos else None,
+        'escaneados': valores['escaneados'],
+        'cargados': valores['cargados'],
+        'entregados': valores['entregados'],
+        'perdidos': valores['perdidos'],
+        'tasa_perdida': round(valores['perdidos'] / finalizadas, 4) if finalizadas else None,
+        'escaneado_a_cargado_s': (round(valores['carga_total_s'] / valores['carga_cantidad'], 1)
+                                  if valores['carga_cantidad'] else None),
+        'cargado_a_entregado_s': (round(valores['entrega_total_s'] / valores['entrega_cantidad'], 1)
+                                  if valores['entrega_cantidad'] else None),
+    }
+
+class AnaliticaVentanas:
+    """Agregación incremental en ventanas fijas y deslizantes por aeropuerto y ruta."""
+
+    def __init__(self, paso=ANALITICA_PASO, ventana=ANALITICA_VENTANA, max_claves=ANALITICA_MAX_CLAVES):
+        self.paso = paso
+        self.pasos_ventana = max(ventana // paso, 1)
+        self.max_claves = max_claves
+        self.persistir = False   # Acumular incrementos para el almacén (ver volcar)
+        self._pendientes = {}    # (dimensión, clave, inicio) -> Acumulado desde el último volcado
+        self._fijas = {}         # inicio -> {(dimensión, clave): Acumulado} dentro de la ventana deslizante
+        self._deslizante = {}    # (dimensión, clave) -> Acumulado de la ventana deslizante
+        self._claves = {dimension: set() for dimension in DIMENSIONES}
+        self._fin = None         # Inicio de la ventana fija más reciente vista (marca de agua)
+
+    def _clave(self, dimension, clave):
+        claves = self._claves[dimension]
+        if clave in claves:
+            return clave
+        if len(claves) >= self.max_claves:
+            return CLAVE_OTROS
+        claves.add(clave)
+        return clave
+
+    def registrar(self, evento, anterior, timestamp):
+        """
+        Agrega un evento a sus ventanas.
+
+        Args:
+            evento (dict): Mensaje del tópico (estado, origen, destino).
+            anterior (dict): Estado previo de la valija ({'estado', 'timestamp'}) o None.
+            timestamp (float): Marca de tiempo del evento en epoch segundos.
+        """
+        estado = evento.get('estado')
+        origen = evento.get('origen')
+        destino = evento.get('destino')
+        delta = Acumulado()
+        delta.eventos = 1
+        if estado == 'equipaje_escaneado':
+            delta.escaneados = 1
+        elif estado == 'equipaje_cargado':
+            delta.cargados = 1
+            if anterior and anterior['estado'] == 'equipaje_escaneado':
+                delta.carga_total_s = max(timestamp - anterior['timestamp'], 0)
+                delta.carga_cantidad = 1
+        elif estado == 'equipaje_entregado':
+            delta.entregados = 1
+            if anterior and anterior['estado'] == 'equipaje_cargado':
+                delta.entrega_total_s = max(timestamp - anterior['timestamp'], 0)
+                delta.entrega_cantidad = 1
+        elif estado == 'equipaje_perdido':
+            delta.perdidos = 1
+
+        # El aeropuerto de un evento es el origen hasta la carga y el destino al finalizar
+        aeropuerto = destino if estado in ('equipaje_entregado', 'equipaje_perdido') else origen
+        claves = []
+        if aeropuerto:
+            claves.append(('aeropuerto', self._clave('aeropuerto', aeropuerto)))
+        if origen and destino:
+            claves.append(('ruta', self._clave('ruta', f'{origen} → {destino}')))
+        if not claves:
+            return
+
+        inicio = int(timestamp // self.paso) * self.paso
+        self.avanzar(inicio)
+        en_ventana = inicio > self._fin - self.pasos_ventana * self.paso
+        for clave in claves:
+            if self.persistir:
+                self._pendientes.setdefault(clave + (inicio,), Acumulado()).sumar(delta)
+            if en_ventana:
+                self._fijas.setdefault(inicio, {}).setdefault(clave, Acumulado()).sumar(delta)
+                self._deslizante.setdefault(clave, Acumulado()).sumar(delta)
+
+    def avanzar(self, inicio):
+        """Mueve la ventana deslizante hasta la ventana fija `inicio`, restando las que salen."""
+        if self._fin is not None and inicio <= self._fin:
+            return
+        self._fin = inicio
+        limite = inicio - self.pasos_ventana * self.paso
+        for vieja in [i for i in self._fijas if i <= limite]:
+            for clave, acumulado in self._fijas.pop(vieja).items():
+                total = self._deslizante[clave]
+                total.sumar(acumulado, -1)
+                if total.vacio():
+                    del self._deslizante[clave]
+                    if clave[1] != CLAVE_OTROS:
+                        self._claves[clave[0]].discard(clave[1])
+
+    def deslizante(self, dimension):
+        """
+        Métricas de la ventana deslizante actual.
+
+        Returns:
+            list: resumir() de cada clave de la dimensión, de más a menos eventos.
+        """
+        segundos = self.pasos_ventana * self.paso
+        filas = [resumir(clave, dict(zip(CAMPOS, acumulado.valores())), segundos)
+                 for (dim, clave), acumulado in self._deslizante.items() if dim == dimension]
+        return sorted(filas, key=lambda fila: fila['eventos'], reverse=True)
+
+    def resumen(self, cantidad=3):
+        """Texto con las rutas de mayor tasa de pérdida en la ventana deslizante."""
+        # Sin eventos recientes la ventana avanza igual con el reloj
+        self.avanzar(int(time.time() // self.paso) * self.paso)
+        rutas = [fila for fila in self.deslizante('ruta') if fila['tasa_perdida']]
+        rutas.sort(key=lambda fila: fila['tasa_perdida'], reverse=True)
+        detalle = ', '.join(f"{fila['clave']} {fila['tasa_perdida']:.1%}" for fila in rutas[:cantidad])
+        return (f"Analítica ({self.pasos_ventana * self.paso // 60} min): "
+                f"{sum(fila['eventos'] for fila in self.deslizante('aeropuerto'))} eventos"
+                + (f"; mayor pérdida: {detalle}" if detalle else ''))
+
+    def volcar(self, almacen):
+        """Pasa al almacén los incrementos pendientes (se guardan con el próximo checkpoint)."""
+        for (dimension, clave, inicio), acumulado in self._pendientes.items():
+            almacen.registrar_agregado(dimension, clave, inicio, acumulado.valores())
+        self._pendientes = {}
+
+def consultar(ruta, dimension, desde, hasta, clave=None):
+    """
+    Lee las ventanas fijas guardadas entre dos instantes (sin recorrer eventos).
+
+    Args:
+        ruta (str): Base del almacén de estado del consumidor.
+        dimension (str): 'aeropuerto' o 'ruta'.
+        desde (int): Inicio en epoch segundos (incluido).
+        hasta (int): Fin en epoch segundos (excluido).
+        clave (str, optional): Solo este aeropuerto o ruta.
+
+    Returns:
+        list: Tuplas (clave, inicio, {campo: valor}).
+    """
+    if not os.path.exists(ruta):
+        return []
+    conn = sqlite3.connect(f'file:{ruta}?mode=ro', uri=True, timeout=5)
+    try:
+        consulta = (f"SELECT clave, inicio, {', '.join(CAMPOS)} FROM estadisticas_ventana "
+                    f"WHERE dimension = ? AND inicio >= ? AND inicio < ?")
+        parametros = [dimension, desde, hasta]
+        if clave:
+            consulta += ' AND clave = ?'
+            parametros.append(clave)
+        try:
+            filas = conn.execute(consulta, parametros).fetchall()
+        except sqlite3.OperationalError as e:
+            # Almacén creado antes de la analítica: todavía no tiene la tabla
+            logger.warning(f"No se pudo leer la analítica: {e}")
+            return []
+        return [(fila[0], fila[1], dict(zip(CAMPOS, fila[2:]))) for fila in filas]
+    finally:
+        conn.close()
+
+def ventanas(ruta, dimension, minutos, clave=None, ahora=None):
+    """
+    Ventana deslizante de los últimos `minutos` (por clave) y sus ventanas fijas
+    (totales por paso), a partir de las ventanas fijas guardadas.
+
+    Args:
+        ruta (str): Base del almacén de estado del consumidor.
+        dimension (str): 'aeropuerto' o 'ruta'.
+        minutos (int): Duración de la ventana deslizante.
+        clave (str, optional): Solo este aeropuerto o ruta.
+        ahora (float, optional): Instante actual en epoch segundos.
+
+    Returns:
+        dict: {'dimension', 'paso_s', 'desde', 'hasta', 'deslizante': [...], 'fijas': [...]}.
+    """
+    ahora = time.time() if ahora is None else ahora
+    # Incluir la ventana fija en curso
+    hasta = (int(ahora // ANALITICA_PASO) + 1) * ANALITICA_PASO
+    desde = hasta - max(minutos * 60 // ANALITICA_PASO, 1) * ANALITICA_PASO
+    por_clave = {}
+    por_inicio = {}
+    for clave_fila, inicio, valores in consultar(ruta, dimension, desde, hasta, clave):
+        for totales in (por_clave.setdefault(clave_fila, dict.fromkeys(CAMPOS, 0)),
+                        por_inicio.setdefault(inicio, dict.fromkeys(CAMPOS, 0))):
+            for campo in CAMPOS:
+                totales[campo] += valores[campo]
+    deslizante = [resumir(c, totales, hasta - desde) for c, totales in por_clave.items()]
+    deslizante.sort(key=lambda fila: fila['eventos'], reverse=True)
+    fijas = [dict(resumir(clave or 'total', por_inicio[inicio], ANALITICA_PASO), inicio=inicio)
+             for inicio in sorted(por_inicio)]
+    return {
+        'dimension': dimension,
+        'paso_s': ANALITICA_PASO,
+        'desde': desde,
+        'hasta': hasta,
+        'deslizante': deslizante,
+        'fijas': fijas,
+    }
@@ -0,0 +1,111 @@
+"""
+Script de benchmark del consumidor: rendimiento con 1 proceso frente a N procesos.
+Requiere un broker Kafka en ejecución. Crea un tópico temporal con N particiones,
+publica M eventos con el id de valija como clave y, para cada configuración, lanza
+consumidor_paralelo.py con un grupo y un almacén de estado nuevos. Mide el tiempo
+hasta que el grupo confirmó los M offsets (checkpoint en cada lote).
+Uso: python src/eda/benchmark_consumidor.py [eventos] [procesos]
+"""
+import os
+import sys
+import json
+import time
+import random
+import signal
+import shutil
+import tempfile
+import subprocess
+
+from kafka import KafkaAdminClient, KafkaProducer
+from kafka.admin import NewTopic
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+KAFKA_BROKER = '127.0.0.1:9092'
+
+cantidad_eventos = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+procesos = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+marca = int(time.time())
+topico = f'benchmark_equipajes_{marca}'
+
+admin = KafkaAdminClient(bootstrap_servers=[KAFKA_BROKER])
+directorio = tempfile.mkdtemp(prefix='benchmark_consumidor_')
+
+def publicar_eventos():
+    """Publica los eventos de prueba (sin pérdidas, para no escribir reportes)."""
+    producer = KafkaProducer(
+        bootstrap_servers=[KAFKA_BROKER],
+        value_serializer=lambda v: json.dumps(v).encode('utf-8'),
+        key_serializer=lambda k: k.encode('utf-8'),
+        linger_ms=20, batch_size=64 * 1024
+    )
+    ahora = int(time.time())
+    valijas = [f'bench-{i}' for i in range(max(cantidad_eventos // 3, 1))]
+    for i in range(cantidad_eventos):
+        id_valija = random.choice(valijas)
+        producer.send(topico, key=id_valija, value={
+            'equipaje_id': id_valija,
+            'estado': random.choice(['equipaje_escaneado', 'equipaje_cargado', 'equipaje_entregado']),
+            'timestamp': ahora + i // 1000,
+            'origen': 'EZE - Buenos Aires',
+            'destino': 'COR - Córdoba',
+            'peso': 20.0
+        })
+    producer.flush()
+    producer.close()
+
+def confirmados(grupo):
+    """Suma de los offsets confirmados por el grupo en el tópico de prueba."""
+    try:
+        offsets = admin.list_consumer_group_offsets(grupo)
+    except Exception:
+        return 0
+    return sum(meta.offset for particion, meta in offsets.items()
+               if particion.topic == topico and meta.offset > 0)
+
+def medir(cantidad_procesos):
+    """Devuelve (segundos hasta procesar todo, segundos desde el primer lote confirmado)."""
+    grupo = f'benchmark-{marca}-{cantidad_procesos}'
+    entorno = dict(
+        os.environ,
+        CONSUMIDOR_TOPICO=topico,
+        CONSUMIDOR_GRUPO=grupo,
+        CONSUMIDOR_ESTADO_DB=os.path.join(directorio, f'estado_{cantidad_procesos}.db'),
+        CONSUMIDOR_CHECKPOINT_INTERVALO='0'
+    )
+    proceso = subprocess.Popen(
+        [sys.executable, os.path.join('src', 'eda', 'consumidor_paralelo.py'), str(cantidad_procesos)],
+        cwd=RAIZ, env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    inicio = time.perf_counter()
+    primer_lote = None
+    try:
+        while True:
+            total = confirmados(grupo)
+            if total and primer_lote is None:
+                primer_lote = time.perf_counter()
+            if total >= cantidad_eventos:
+                fin = time.perf_counter()
+                return fin - inicio, fin - primer_lote
+            time.sleep(0.2)
+    finally:
+        proceso.send_signal(signal.SIGINT)
+        proceso.wait(60)
+
+try:
+    admin.create_topics([NewTopic(topico, num_partitions=procesos, replication_factor=1)])
+    print(f"Publicando {cantidad_eventos} eventos en {topico} ({procesos} particiones)...")
+    publicar_eventos()
+
+    print(f"\n{'Procesos':<10}{'Total (s)':>12}{'Procesamiento (s)':>20}{'Eventos/s':>12}")
+    for cantidad_procesos in sorted({1, procesos}):
+        total, procesamiento = medir(cantidad_procesos)
+        print(f"{cantidad_procesos:<10}{total:>12.1f}{procesamiento:>20.1f}"
+              f"{cantidad_eventos / max(procesamiento, 1e-9):>12.0f}")
+    print("\nTotal incluye el ingreso al grupo; Procesamiento se mide desde el primer lote confirmado.")
+finally:
+    try:
+        admin.delete_topics([topico])
+    except Exception:
+        pass
+    admin.close()
+    shutil.rmtree(directorio, ignore_errors=True)
@@ -0,0 +1,158 @@
+"""
+Prueba de carga de punta a punta sin broker: API → SQLite (outbox) → relay → Kafka
+en memoria → consumidor, todo en un solo proceso (KAFKA_TRANSPORTE=memoria).
+Varios clientes envían lotes a POST /api/eventos/lote con el cliente de pruebas de
+Flask, mientras el consumidor (con su almacén de estado y sus reportes) procesa el
+tópico en un hilo propio. Informa el rendimiento de la API y del pipeline completo y
+la latencia desde el envío a la API hasta que el consumidor procesó cada evento.
+Usa una base, un almacén y un directorio de reportes temporales. Con OUTBOX_KAFKA=False
+la API publica directamente con el productor asíncrono en lugar del relay.
+Uso: python src/eda/benchmark_pipeline.py [eventos] [clientes] [tamano_lote]
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+import threading
+import statistics
+
+# Transporte en memoria y archivos temporales, antes de importar los módulos que los leen
+directorio = tempfile.mkdtemp(prefix='benchmark_pipeline_')
+os.environ['KAFKA_TRANSPORTE'] = 'memoria'
+os.environ['DISABLE_SIMULATOR'] = 'True'
+os.environ['CONSUMIDOR_REPORTES_DIR'] = os.path.join(directorio, 'reportes')
+os.environ.pop('CONSUMIDOR_REPORTES_DB', None)
+
+# Ajustar el path para las importaciones
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.core import db_service
+from src.core.outbox import outbox_activo
+from src.core.repositorio import obtener_repositorio
+from src.eda import consumidor_kafka
+from src.eda.estado_consumidor import AlmacenEstado
+from src.eda.kafka_memoria import broker
+from src.eda.productor_kafka import productor
+from src.eda.relay_outbox import relay
+from app import crear_app
+
+cantidad_eventos = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+clientes = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+tamano_lote = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+
+db_service.DB_PATH = os.path.join(directorio, 'equipajes.db')
+db_service._pool = db_service.PoolConexiones(db_service.DB_PATH)
+productor.archivo_derrame = os.path.join(directorio, 'kafka_pendientes.ndjson')
+
+# Momento de envío a la API de cada evento (id de valija, estado) y mediciones del consumidor
+enviados = {}
+latencias = []         # Segundos desde el envío a la API hasta el fin de su lote en el consumidor
+latencias_kafka = []   # Milisegundos desde la publicación en Kafka hasta el fin de su lote
+procesados = 0
+lock = threading.Lock()
+completo = threading.Event()
+
+procesar_lote_original = consumidor_kafka.procesar_lote
+
+def procesar_lote_medido(mensajes):
+    """procesar_lote del consumidor, registrando la latencia de cada evento."""
+    global procesados
+    procesar_lote_original(mensajes)
+    ahora = time.perf_counter()
+    ahora_ms = time.time() * 1000
+    with lock:
+        for message in mensajes:
+            enviado = enviados.get((message.value.get('equipaje_id'), message.value.get('estado')))
+            if enviado is not None:
+                latencias.append(ahora - enviado)
+            latencias_kafka.append(ahora_ms - message.timestamp)
+        procesados += len(mensajes)
+        if procesados >= cantidad_eventos:
+            completo.set()
+
+def consumir():
+    """Hilo del consumidor: el almacén de estado (SQLite) se crea en el hilo que lo usa."""
+    consumidor_kafka.usar_almacen(AlmacenEstado(os.path.join(directorio, 'consumidor_estado.db')))
+    consumer = consumidor_kafka.crear_consumidor()
+    try:
+        consumidor_kafka.ejecutar(consumer)
+    finally:
+        completo.set()
+
+def generar_eventos(cliente):
+    """Eventos de las valijas de un cliente: escaneo, carga y entrega (1% perdidas)."""
+    eventos = []
+    aeropuertos = ['EZE - Buenos Aires', 'COR - Córdoba', 'MDZ - Mendoza', 'MAD - Madrid']
+    numero = 0
+    while len(eventos) < cantidad_eventos // clientes:
+        id_valija = f'carga-{cliente}-{numero}'
+        numero += 1
+        origen, destino = random.sample(aeropuertos, 2)
+        final = 'equipaje_perdido' if random.random() < 0.01 else 'equipaje_entregado'
+        for estado in ('equipaje_escaneado', 'equipaje_cargado', final):
+            eventos.append({'id_valija': id_valija, 'evento': estado, 'origen': origen,
+                            'destino': destino, 'peso': round(random.uniform(5, 30), 1)})
+    return eventos[:cantidad_eventos // clientes]
+
+def cliente_api(app, eventos, tiempos):
+    """Envía los eventos en lotes, como lo haría un integrador externo."""
+    cliente = app.test_client()
+    for i in range(0, len(eventos), tamano_lote):
+        lote = eventos[i:i + tamano_lote]
+        inicio = time.perf_counter()
+        with lock:
+            for evento in lote:
+                enviados[(evento['id_valija'], evento['evento'])] = inicio
+        respuesta = cliente.post('/api/eventos/lote', json=lote)
+        if respuesta.status_code != 200:
+            print(f"Error {respuesta.status_code} en la API: {respuesta.get_data(as_text=True)[:200]}")
+        tiempos.append(time.perf_counter() - inicio)
+
+def percentil(valores, p):
+    return valores[min(int(len(valores) * p / 100), len(valores) - 1)] if valores else 0.0
+
+try:
+    cantidad_eventos = cantidad_eventos // clientes * clientes
+    obtener_repositorio().inicializar()
+    app = crear_app(iniciar_en_primera_peticion=False)
+    if outbox_activo():
+        relay.iniciar()
+
+    consumidor_kafka.procesar_lote = procesar_lote_medido
+    threading.Thread(target=consumir, name='consumidor', daemon=True).start()
+
+    lotes = [generar_eventos(cliente) for cliente in range(clientes)]
+    tiempos_api = []
+    print(f"Enviando {cantidad_eventos} eventos con {clientes} clientes en lotes de {tamano_lote} "
+          f"({'outbox + relay' if outbox_activo() else 'publicación directa'})...")
+    inicio = time.perf_counter()
+    hilos = [threading.Thread(target=cliente_api, args=(app, eventos, tiempos_api)) for eventos in lotes]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    fin_api = time.perf_counter() - inicio
+    if not completo.wait(300):
+        print(f"Tiempo agotado: el consumidor procesó {procesados} de {cantidad_eventos} eventos")
+    fin_pipeline = time.perf_counter() - inicio
+
+    latencias.sort()
+    latencias_kafka.sort()
+    tiempos_api.sort()
+    print(f"\nAPI:      {cantidad_eventos / fin_api:>10.0f} eventos/s  "
+          f"(lote: mediana {statistics.median(tiempos_api) * 1000:.1f} ms, "
+          f"p99 {percentil(tiempos_api, 99) * 1000:.1f} ms)")
+    print(f"Pipeline: {procesados / fin_pipeline:>10.0f} eventos/s  ({procesados} eventos en {fin_pipeline:.1f} s)")
+    print(f"\n{'Latencia':<28}{'p50':>10}{'p95':>10}{'p99':>10}{'máx':>10}")
+    print(f"{'API → consumidor (ms)':<28}" + ''.join(
+        f"{percentil(latencias, p) * 1000:>10.1f}" for p in (50, 95, 99, 100)))
+    print(f"{'Kafka → consumidor (ms)':<28}" + ''.join(
+        f"{percentil(latencias_kafka, p):>10.1f}" for p in (50, 95, 99, 100)))
+    print(f"\nParticiones del tópico: {len(broker.particiones(consumidor_kafka.KAFKA_TOPIC))}; "
+          f"reportes de pérdida: {consumidor_kafka.escritor.escritas + consumidor_kafka.escritor.pendientes()}")
+finally:
+    relay.detener()
+    productor.cerrar()
+    shutil.rmtree(directorio, ignore_errors=True)
@@ -1,14 +1,52 @@
 """
 Microservicio consumidor de eventos Kafka para detección de equipajes perdidos
 y generación automática de reportes.
+
+Los mensajes se leen en lotes con poll(max_records=...). Cada lote se procesa como
+una unidad: se actualiza el estado de todos sus eventos y los reportes resultantes se
+encolan en el escritor de reportes (ver reportes_perdidas.py), que los escribe en sus
+destinos por cantidad o por tiempo. Los offsets se confirman manualmente (sin
+auto-commit) y siempre después de vaciar el escritor, por lo que ningún evento se
+confirma con su reporte sin guardar: si el consumidor se detiene antes, los eventos
+se vuelven a leer y los reportes se generan de nuevo.
+
+Cada valija en seguimiento tiene un vencimiento (su último evento + TIEMPO_MAX_ESPERA)
+en un índice ordenado (ver vencimientos.py) que se reprograma con cada cambio de
+estado. Las valijas entregadas o perdidas salen del seguimiento, y cada vencimiento
+se informa una única vez, tanto al procesar un lote como cuando no llegan mensajes.
+
+El estado de las valijas y los offsets procesados se guardan juntos en un almacén
+local (ver estado_consumidor.py) cada CONSUMIDOR_CHECKPOINT_INTERVALO segundos. Al
+reiniciar se restaura el último checkpoint y cada partición asignada retoma desde
+su offset guardado, en lugar de releer el tópico completo.
+
+Los eventos llegan con el id de valija como clave, así que todos los de una valija
+están en la misma partición y se procesan en orden. Varios procesos del grupo
+(ver consumidor_paralelo.py) se reparten las particiones: al perder una partición en
+un rebalanceo se guarda el checkpoint y se descarta su estado en memoria, y al recibir
+una se carga del almacén el estado de sus valijas.
+
+Cada evento se agrega además a la analítica por ventanas de tiempo (ver analitica.py):
+volumen, pérdidas y tiempos entre estados por aeropuerto y por ruta, guardados con
+cada checkpoint y servidos por GET /api/analitica.
 """
 
 import json
 import logging
 import time
-import csv
 import os
-from kafka import KafkaConsumer
+import sys
+from kafka import ConsumerRebalanceListener
+
+# Ajustar el path para las importaciones
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.core.config import timestamp_a_epoch_ms
+from src.eda.vencimientos import IndiceVencimientos
+from src.eda.estado_consumidor import AlmacenEstado
+from src.eda.reportes_perdidas import crear_escritor
+from src.eda.analitica import AnaliticaVentanas
+from src.eda.transporte import crear_consumidor as crear_cliente
 
 # Configuración de logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -16,68 +54,359 @@ logger = logging.getLogger('kafka-consumer')
 
 # Configuración de Kafka
 KAFKA_BROKER = '127.0.0.1:9092'  # Forzar IPv4
-KAFKA_TOPIC = 'eventos_equipaje'
+KAFKA_TOPIC = os.environ.get('CONSUMIDOR_TOPICO', 'eventos_equipaje')
+KAFKA_GRUPO = os.environ.get('CONSUMIDOR_GRUPO', 'reporte-equipajes')
+
+# Procesamiento por lotes
+CONSUMIDOR_TAMANO_LOTE = int(os.environ.get('CONSUMIDOR_TAMANO_LOTE', 500))     # Máximo de mensajes por poll
+CONSUMIDOR_TIMEOUT_MS = int(os.environ.get('CONSUMIDOR_TIMEOUT_MS', 1000))      # Espera máxima de cada poll
+CONSUMIDOR_INTERVALO_METRICAS = 30    # Segundos entre registros de métricas de rendimiento
+CONSUMIDOR_ESPERA_REINTENTO = 5       # Segundos antes de reintentar un lote que no se pudo procesar
 
 # Simulación de almacenamiento de estados de equipaje
 equipaje_estado = {}
 TIEMPO_MAX_ESPERA = 60 * 10  # 10 minutos para demo
+ESTADOS_FINALES = ('equipaje_entregado', 'equipaje_perdido')  # Fin del seguimiento
+
+# Vencimiento de cada valija en seguimiento (epoch segundos)
+vencimientos = IndiceVencimientos()
+
+# Almacén persistente del estado (None: solo en memoria)
+almacen = None
+
+# Reportes de equipaje perdido pendientes de escribir en sus destinos
+escritor = crear_escritor()
+
+# Ventanas de tiempo por aeropuerto y ruta
+analitica = AnaliticaVentanas()
+
+def timestamp_a_segundos(valor):
+    """
+    Normaliza la marca de tiempo de un evento (epoch en segundos o milisegundos, o
+    texto ISO 8601) a epoch en segundos. Si no se puede interpretar, usa la hora actual.
+    """
+    try:
+        return timestamp_a_epoch_ms(valor) / 1000
+    except (TypeError, ValueError):
+        logger.warning(f"Timestamp inválido en evento: {valor!r}; se usa la hora actual")
+        return time.time()
 
-def procesar_evento(evento):
+def actualizar_seguimiento(equipaje_id, info):
+    """
+    Actualiza una valija en memoria, en el índice de vencimientos y en el almacén.
+
+    Args:
+        equipaje_id (str): Id de la valija.
+        info (dict): {'estado', 'timestamp'} (epoch segundos), o None para dejar de seguirla.
+    """
+    if info is None:
+        equipaje_estado.pop(equipaje_id, None)
+        vencimientos.cancelar(equipaje_id)
+    else:
+        equipaje_estado[equipaje_id] = info
+        vencimientos.programar(equipaje_id, info['timestamp'] + TIEMPO_MAX_ESPERA)
+    if almacen is not None:
+        almacen.registrar_valija(equipaje_id, info)
+
+def procesar_evento(evento, reportes, particion=None):
+    """
+    Actualiza el estado de un equipaje. Si el evento es una pérdida, agrega la fila
+    de su reporte a `reportes` (se escribe al terminar el lote).
+
+    Args:
+        evento (dict): Mensaje del tópico eventos_equipaje.
+        reportes (list): Filas de reporte pendientes de escribir.
+        particion (int, optional): Partición de la que proviene el mensaje.
+    """
     equipaje_id = evento.get('equipaje_id')
     estado = evento.get('estado')
     timestamp = evento.get('timestamp')
     origen = evento.get('origen')
     destino = evento.get('destino')
     peso = evento.get('peso')
-    
+
     if not equipaje_id or not estado:
         logger.warning('Evento inválido: %s', evento)
         return
 
-    # Actualizar estado
-    equipaje_estado[equipaje_id] = {'estado': estado, 'timestamp': timestamp}
-    logger.info(f"Equipaje {equipaje_id} actualizado a estado '{estado}'")
+    # Agregar a las ventanas con el estado anterior (tiempos entre estados)
+    segundos = timestamp_a_segundos(timestamp)
+    analitica.registrar(evento, equipaje_estado.get(equipaje_id), segundos)
+
+    # Actualizar estado y reprogramar su vencimiento; las valijas finalizadas dejan de seguirse
+    if estado in ESTADOS_FINALES:
+        actualizar_seguimiento(equipaje_id, None)
+    else:
+        actualizar_seguimiento(equipaje_id, {'estado': estado,
+                                             'timestamp': segundos,
+                                             'particion': particion})
+    logger.debug(f"Equipaje {equipaje_id} actualizado a estado '{estado}'")
 
     # Si el evento es de equipaje perdido, generar reporte automático
     if estado == 'equipaje_perdido':
-        generar_reporte_perdida(equipaje_id, origen, destino, peso, timestamp)
-
-# Nueva función para guardar reporte de equipaje perdido
-def generar_reporte_perdida(equipaje_id, origen, destino, peso, timestamp):
-    ruta = os.path.join(os.path.dirname(__file__), 'reportes_perdidas.csv')
-    existe = os.path.isfile(ruta)
-    with open(ruta, 'a', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        if not existe:
-            writer.writerow(['id_valija', 'origen', 'destino', 'peso', 'timestamp'])
-        writer.writerow([equipaje_id, origen, destino, peso, timestamp])
-    logger.error(f"REPORTE AUTOMÁTICO: Equipaje perdido {equipaje_id} (origen: {origen}, destino: {destino}, peso: {peso}, timestamp: {timestamp}) guardado en {ruta}")
-
-def detectar_perdidas():
-    ahora = int(time.time())
-    for equipaje_id, info in equipaje_estado.items():
-        if info['estado'] != 'entregado' and (ahora - info['timestamp']) > TIEMPO_MAX_ESPERA:
-            logger.error(f"Equipaje perdido detectado: {equipaje_id}")
-            # Aquí se podría generar un reporte automático (guardar en DB, enviar email, etc.)
+        reportes.append([equipaje_id, origen, destino, peso, timestamp])
 
-if __name__ == '__main__':
-    consumer = KafkaConsumer(
-        KAFKA_TOPIC,
+def vaciar_reportes():
+    """
+    Escribe los reportes pendientes en todos los destinos.
+
+    Returns:
+        bool: True si no quedaron reportes pendientes (se pueden confirmar offsets).
+    """
+    try:
+        escritor.vaciar()
+        return True
+    except OSError as e:
+        logger.error(f"No se pudieron guardar los reportes de equipaje perdido: {e}")
+        return False
+
+def detectar_perdidas(ahora=None):
+    """
+    Informa las valijas sin novedades hace más de TIEMPO_MAX_ESPERA. Solo revisa las
+    vencidas (índice ordenado), y cada una se informa una vez y deja de seguirse.
+
+    Args:
+        ahora (float, optional): Instante actual en epoch segundos.
+
+    Returns:
+        list: Ids de las valijas detectadas como perdidas.
+    """
+    perdidas = vencimientos.vencidos(time.time() if ahora is None else ahora)
+    for equipaje_id in perdidas:
+        info = equipaje_estado.get(equipaje_id)
+        actualizar_seguimiento(equipaje_id, None)
+        logger.error(f"Equipaje perdido detectado: {equipaje_id} "
+                     f"(último estado: {info['estado'] if info else 'desconocido'})")
+        # Aquí se podría generar un reporte automático (guardar en DB, enviar email, etc.)
+    return perdidas
+
+def procesar_lote(mensajes):
+    """
+    Procesa un lote de mensajes como una unidad: estado, reportes (se encolan en el
+    escritor) y detección de pérdidas (una sola pasada por lote).
+
+    Args:
+        mensajes (list): Mensajes de Kafka con el evento en `value`.
+    """
+    reportes = []
+    for message in mensajes:
+        try:
+            procesar_evento(message.value, reportes, getattr(message, 'partition', None))
+        except Exception as e:
+            # Un mensaje malformado no debe bloquear la partición: se registra y se sigue
+            logger.error(f"Error procesando evento Kafka: {e} | Evento: {getattr(message, 'value', None)}")
+    for equipaje_id, origen, destino, peso, timestamp in reportes:
+        logger.error(f"REPORTE AUTOMÁTICO: Equipaje perdido {equipaje_id} (origen: {origen}, destino: {destino}, peso: {peso}, timestamp: {timestamp})")
+    escritor.agregar(reportes)
+    detectar_perdidas()
+
+class MetricasConsumidor:
+    """Rendimiento del consumidor: eventos por segundo y latencia de procesamiento por lote."""
+
+    def __init__(self, intervalo=CONSUMIDOR_INTERVALO_METRICAS):
+        self.intervalo = intervalo
+        self.eventos_total = 0
+        self.lotes_total = 0
+        self._reiniciar_ventana(time.monotonic())
+
+    def _reiniciar_ventana(self, ahora):
+        self._inicio_ventana = ahora
+        self._eventos = 0
+        self._lotes = 0
+        self._latencia_total = 0.0
+        self._latencia_max = 0.0
+
+    def registrar_lote(self, cantidad, latencia):
+        """Suma un lote procesado y registra las métricas si terminó la ventana."""
+        self.eventos_total += cantidad
+        self.lotes_total += 1
+        self._eventos += cantidad
+        self._lotes += 1
+        self._latencia_total += latencia
+        self._latencia_max = max(self._latencia_max, latencia)
+        ahora = time.monotonic()
+        if ahora - self._inicio_ventana >= self.intervalo:
+            logger.info(self.resumen(ahora))
+            logger.info(analitica.resumen())
+            self._reiniciar_ventana(ahora)
+
+    def resumen(self, ahora=None):
+        """Texto con las métricas de la ventana actual."""
+        transcurrido = max((ahora or time.monotonic()) - self._inicio_ventana, 1e-9)
+        promedio = self._latencia_total / self._lotes * 1000 if self._lotes else 0.0
+        return (f"Métricas: {self._eventos / transcurrido:.1f} eventos/s, {self._lotes} lotes, "
+                f"latencia por lote {promedio:.1f} ms (máx. {self._latencia_max * 1000:.1f} ms), "
+                f"total {self.eventos_total} eventos")
+
+def usar_almacen(almacen_estado):
+    """Registra los cambios de estado en el almacén persistente desde este momento."""
+    global almacen
+    almacen = almacen_estado
+    analitica.persistir = almacen_estado is not None
+
+def restaurar_estado(particiones=None):
+    """
+    Carga del último checkpoint el estado de las valijas de las particiones indicadas
+    (las que ya están en memoria no se modifican).
+
+    Args:
+        particiones (list, optional): Números de partición. Por defecto, todas.
+
+    Returns:
+        int: Cantidad de valijas restauradas.
+    """
+    restauradas = 0
+    for equipaje_id, info in almacen.cargar_estado(particiones).items():
+        if equipaje_id in equipaje_estado:
+            continue
+        equipaje_estado[equipaje_id] = info
+        vencimientos.programar(equipaje_id, info['timestamp'] + TIEMPO_MAX_ESPERA)
+        restauradas += 1
+    return restauradas
+
+def descartar_estado(particiones):
+    """
+    Quita de memoria las valijas de particiones que pasan a otro consumidor del grupo
+    (siguen en el almacén, desde donde las carga el nuevo dueño).
+
+    Returns:
+        int: Cantidad de valijas descartadas.
+    """
+    particiones = set(particiones)
+    descartadas = [equipaje_id for equipaje_id, info in equipaje_estado.items()
+                   if info.get('particion') in particiones]
+    for equipaje_id in descartadas:
+        del equipaje_estado[equipaje_id]
+        vencimientos.cancelar(equipaje_id)
+    return len(descartadas)
+
+def guardar_checkpoint(consumer):
+    """
+    Vacía los reportes pendientes, guarda el checkpoint (estado y offsets en una
+    transacción) y luego confirma los offsets en Kafka. Si los reportes o el checkpoint
+    no se pudieron guardar, los offsets no se confirman.
+    """
+    if not vaciar_reportes():
+        return False
+    analitica.volcar(almacen)
+    try:
+        almacen.checkpoint()
+    except Exception as e:
+        logger.error(f"No se pudo guardar el checkpoint del estado: {e}")
+        return False
+    try:
+        consumer.commit()
+    except Exception as e:
+        # Los offsets del almacén son los que se usan al reiniciar
+        logger.error(f"No se pudieron confirmar los offsets en Kafka: {e}")
+    return True
+
+class ReanudarDesdeCheckpoint(ConsumerRebalanceListener):
+    """
+    Rebalanceos del grupo: al perder particiones guarda el checkpoint y descarta su
+    estado; al recibirlas carga su estado y retoma desde los offsets guardados.
+    """
+
+    def __init__(self, consumer):
+        self.consumer = consumer
+
+    def on_partitions_revoked(self, revoked):
+        if revoked and almacen is not None:
+            guardar_checkpoint(self.consumer)
+            descartadas = descartar_estado(particion.partition for particion in revoked)
+            logger.info(f"Particiones revocadas: {sorted(p.partition for p in revoked)} "
+                        f"({descartadas} valijas pasan a otro consumidor)")
+
+    def on_partitions_assigned(self, assigned):
+        if almacen is None:
+            return
+        inicio = time.perf_counter()
+        restauradas = restaurar_estado([particion.partition for particion in assigned])
+        logger.info(f"Particiones asignadas: {sorted(p.partition for p in assigned)}; "
+                    f"{restauradas} valijas restauradas en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+        offsets = almacen.cargar_offsets()
+        for particion in assigned:
+            offset = offsets.get((particion.topic, particion.partition))
+            if offset is not None:
+                self.consumer.seek(particion, offset)
+                logger.info(f"Partición {particion.partition} retomada desde el offset {offset}")
+
+def crear_consumidor():
+    """Crea el consumidor Kafka con confirmación manual de offsets."""
+    consumer = crear_cliente(
         bootstrap_servers=[KAFKA_BROKER],
         value_deserializer=lambda m: json.loads(m.decode('utf-8')),
         auto_offset_reset='earliest',
-        enable_auto_commit=True,
-        group_id='reporte-equipajes'
+        enable_auto_commit=False,
+        max_poll_records=CONSUMIDOR_TAMANO_LOTE,
+        group_id=KAFKA_GRUPO
     )
-    logger.info('Consumidor Kafka iniciado, esperando eventos...')
-    try:
-        while True:
-            for message in consumer:
+    consumer.subscribe([KAFKA_TOPIC], listener=ReanudarDesdeCheckpoint(consumer))
+    return consumer
+
+def ejecutar(consumer, tamano_lote=CONSUMIDOR_TAMANO_LOTE, timeout_ms=CONSUMIDOR_TIMEOUT_MS):
+    """
+    Bucle principal: lee un lote, lo procesa y confirma sus offsets (con almacén,
+    al guardar cada checkpoint).
+
+    Args:
+        consumer (KafkaConsumer): Consumidor suscripto al tópico.
+        tamano_lote (int): Máximo de mensajes por lote.
+        timeout_ms (int): Espera máxima de cada poll.
+    """
+    metricas = MetricasConsumidor()
+    while True:
+        por_particion = consumer.poll(timeout_ms=timeout_ms, max_records=tamano_lote)
+        mensajes = [message for lote in por_particion.values() for message in lote]
+        if not mensajes:
+            # Sin tráfico: revisar igual los vencimientos
+            detectar_perdidas()
+            if almacen is not None and almacen.checkpoint_pendiente():
+                guardar_checkpoint(consumer)
+            elif escritor.debe_vaciar():
+                vaciar_reportes()
+            continue
+        inicio = time.perf_counter()
+        try:
+            procesar_lote(mensajes)
+        except Exception as e:
+            # No confirmar: volver al primer offset del lote en cada partición y reintentar
+            logger.error(f"No se pudo procesar el lote de {len(mensajes)} eventos: {e}")
+            for particion, lote in por_particion.items():
+                consumer.seek(particion, lote[0].offset)
+            time.sleep(CONSUMIDOR_ESPERA_REINTENTO)
+            continue
+        if almacen is not None:
+            for particion, lote in por_particion.items():
+                almacen.registrar_offset(particion.topic, particion.partition, lote[-1].offset + 1)
+            if almacen.checkpoint_pendiente():
+                guardar_checkpoint(consumer)
+            elif escritor.debe_vaciar():
+                vaciar_reportes()
+        elif not escritor.pendientes() or escritor.debe_vaciar():
+            # Con reportes encolados los offsets se confirman recién al vaciarlos
+            if vaciar_reportes():
                 try:
-                    evento = message.value
-                    procesar_evento(evento)
-                    detectar_perdidas()
+                    consumer.commit()
                 except Exception as e:
-                    logger.error(f"Error procesando evento Kafka: {e} | Evento: {getattr(message, 'value', None)}")
+                    # P. ej. un rebalanceo: el lote se vuelve a entregar (procesarlo de nuevo es inocuo)
+                    logger.error(f"No se pudieron confirmar los offsets del lote: {e}")
+        metricas.registrar_lote(len(mensajes), time.perf_counter() - inicio)
+
+def main():
+    """Ejecuta el consumidor con estado persistente hasta que se lo detenga."""
+    usar_almacen(AlmacenEstado())
+    consumer = crear_consumidor()
+    logger.info(f"Consumidor Kafka iniciado (lotes de hasta {CONSUMIDOR_TAMANO_LOTE} eventos), esperando eventos...")
+    try:
+        ejecutar(consumer)
     except KeyboardInterrupt:
         logger.info('Consumidor detenido por el usuario.')
+    finally:
+        guardar_checkpoint(consumer)
+        consumer.close()
+        almacen.cerrar()
+        escritor.cerrar()
+
+if __name__ == '__main__':
+    main()
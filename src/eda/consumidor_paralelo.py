@@ -0,0 +1,93 @@
+"""
+Ejecuta N procesos consumidores en el grupo de Kafka 'reporte-equipajes'.
+Kafka reparte las particiones del tópico entre los procesos; como los eventos usan el
+id de valija como clave, cada valija pertenece a una sola partición y sus eventos se
+procesan en orden en un único proceso. Los procesos comparten el almacén de estado
+(cada uno escribe solo las valijas de sus particiones) y el archivo de reportes.
+El tópico necesita al menos N particiones para que todos los procesos trabajen:
+    kafka-topics.sh --alter --topic eventos_equipaje --partitions N --bootstrap-server 127.0.0.1:9092
+Uso: python src/eda/consumidor_paralelo.py [procesos]
+"""
+import os
+import sys
+import signal
+import logging
+import multiprocessing
+
+# Ajustar el path para las importaciones
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.eda import consumidor_kafka
+from src.eda.transporte import crear_consumidor, transporte_en_memoria
+
+logger = logging.getLogger('consumidor-paralelo')
+
+PROCESOS_POR_DEFECTO = os.cpu_count() or 2
+
+def _detener(numero, frame):
+    # Un solo aviso: la segunda señal no debe interrumpir el checkpoint final
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    raise KeyboardInterrupt
+
+def trabajador(numero):
+    """Proceso consumidor: se detiene con SIGTERM enviado por el proceso principal."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, _detener)
+    logger.info(f"Consumidor {numero} iniciado (pid {os.getpid()})")
+    try:
+        consumidor_kafka.main()
+    except KeyboardInterrupt:
+        # Detenido antes de unirse al grupo: no hay estado que guardar
+        logger.info(f"Consumidor {numero} detenido")
+
+def particiones_del_topico():
+    """Cantidad de particiones del tópico, o None si no se pudo consultar."""
+    try:
+        consumer = crear_consumidor(bootstrap_servers=[consumidor_kafka.KAFKA_BROKER])
+        try:
+            particiones = consumer.partitions_for_topic(consumidor_kafka.KAFKA_TOPIC)
+        finally:
+            consumer.close()
+        return len(particiones) if particiones else None
+    except Exception as e:
+        logger.warning(f"No se pudieron consultar las particiones del tópico: {e}")
+        return None
+
+def ejecutar(procesos):
+    """
+    Lanza los procesos consumidores y espera a que terminen. Ante Ctrl+C o SIGTERM
+    los detiene ordenadamente (cada uno guarda su checkpoint).
+
+    Args:
+        procesos (int): Cantidad de procesos.
+    """
+    particiones = particiones_del_topico()
+    if particiones is not None and particiones < procesos:
+        logger.warning(f"El tópico {consumidor_kafka.KAFKA_TOPIC} tiene {particiones} particiones: "
+                       f"{procesos - particiones} procesos quedarán sin trabajo")
+
+    contexto = multiprocessing.get_context('spawn')
+    trabajadores = [contexto.Process(target=trabajador, args=(numero,), name=f'consumidor-{numero}')
+                    for numero in range(procesos)]
+    for proceso in trabajadores:
+        proceso.start()
+
+    signal.signal(signal.SIGTERM, _detener)
+    try:
+        for proceso in trabajadores:
+            proceso.join()
+    except KeyboardInterrupt:
+        logger.info("Deteniendo consumidores...")
+        for proceso in trabajadores:
+            if proceso.is_alive():
+                proceso.terminate()
+        for proceso in trabajadores:
+            proceso.join(30)
+
+if __name__ == '__main__':
+    if transporte_en_memoria():
+        # Cada proceso tendría su propio broker en memoria, sin los eventos de la API
+        sys.exit("KAFKA_TRANSPORTE=memoria no se comparte entre procesos: usar el broker real")
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else PROCESOS_POR_DEFECTO
+    logger.info(f"Iniciando {cantidad} consumidores en el grupo {consumidor_kafka.KAFKA_GRUPO}")
+    ejecutar(cantidad)
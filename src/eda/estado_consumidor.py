@@ -0,0 +1,216 @@
+"""
+Almacén local y persistente del estado del consumidor Kafka.
+Guarda en SQLite el estado de cada valija en seguimiento y el próximo offset a leer
+de cada partición. Ambos se escriben en la misma transacción (checkpoint), de modo
+que al reiniciar el consumidor restaura el estado y retoma la lectura exactamente
+desde el último checkpoint, sin volver a leer el tópico completo.
+Entre checkpoints solo se acumulan en memoria las valijas modificadas, y cada
+checkpoint escribe únicamente esas filas.
+
+Cada valija se guarda con la partición de la que proviene (los eventos usan el id de
+valija como clave), de modo que varios consumidores del mismo grupo pueden compartir
+el almacén: cada uno carga y escribe solo las valijas de sus particiones asignadas.
+
+El checkpoint guarda también los incrementos de la analítica por ventanas (ver
+analitica.py) en la tabla estadisticas_ventana, sumándolos a los ya guardados.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+
+from src.eda.analitica import CAMPOS, ANALITICA_RETENCION_DIAS
+
+logger = logging.getLogger('estado-consumidor')
+
+ESTADO_DB_PATH = os.environ.get('CONSUMIDOR_ESTADO_DB', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'data', 'consumidor_estado.db'
+))
+CHECKPOINT_INTERVALO = float(os.environ.get('CONSUMIDOR_CHECKPOINT_INTERVALO', 5))  # Segundos (0: cada lote)
+COMPACTAR_CADA = int(os.environ.get('CONSUMIDOR_COMPACTAR_CADA', 100))  # Checkpoints entre compactaciones
+
+class AlmacenEstado:
+    """Estado de las valijas y offsets del consumidor, con checkpoints atómicos."""
+
+    def __init__(self, ruta=ESTADO_DB_PATH, intervalo=CHECKPOINT_INTERVALO,
+                 compactar_cada=COMPACTAR_CADA):
+        self.ruta = ruta
+        self.intervalo = intervalo
+        self.compactar_cada = compactar_cada
+        self._modificadas = {}   # equipaje_id -> (estado, timestamp), o None si se borró
+        self._offsets = {}       # (tópico, partición) -> próximo offset a leer
+        self._agregados = {}     # (dimensión, clave, inicio) -> incrementos por campo de analitica.CAMPOS
+        self._ultimo_checkpoint = time.monotonic()
+        self._checkpoints = 0
+
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        # Varios procesos del grupo pueden escribir a la vez: esperar en lugar de fallar
+        self._conn = sqlite3.connect(ruta, timeout=30)
+        # auto_vacuum solo se aplica a bases nuevas: permite liberar espacio al compactar
+        self._conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        with self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS valija_seguimiento (
+                    equipaje_id TEXT PRIMARY KEY,
+                    estado TEXT NOT NULL,
+                    timestamp REAL NOT NULL,
+                    particion INTEGER
+                )
+            ''')
+            columnas = [fila[1] for fila in self._conn.execute('PRAGMA table_info(valija_seguimiento)')]
+            if 'particion' not in columnas:
+                # Almacenes creados antes de guardar la partición de cada valija
+                self._conn.execute('ALTER TABLE valija_seguimiento ADD COLUMN particion INTEGER')
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_seguimiento_particion ON valija_seguimiento (particion)'
+            )
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS offsets (
+                    topico TEXT NOT NULL,
+                    particion INTEGER NOT NULL,
+                    offset INTEGER NOT NULL,
+                    PRIMARY KEY (topico, particion)
+                )
+            ''')
+            self._conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS estadisticas_ventana (
+                    dimension TEXT NOT NULL,
+                    clave TEXT NOT NULL,
+                    inicio INTEGER NOT NULL,
+                    {', '.join(f"{campo} {'REAL' if campo.endswith('_s') else 'INTEGER'} NOT NULL DEFAULT 0"
+                               for campo in CAMPOS)},
+                    PRIMARY KEY (dimension, inicio, clave)
+                )
+            ''')
+
+    def cargar_estado(self, particiones=None):
+        """
+        Lee el estado guardado en el último checkpoint.
+
+        Args:
+            particiones (list, optional): Solo las valijas de estas particiones (más las
+                guardadas sin partición). Por defecto, todas.
+
+        Returns:
+            dict: {equipaje_id: {'estado', 'timestamp', 'particion'}}.
+        """
+        consulta = 'SELECT equipaje_id, estado, timestamp, particion FROM valija_seguimiento'
+        parametros = ()
+        if particiones is not None:
+            particiones = list(particiones)
+            consulta += (f" WHERE particion IS NULL OR particion IN "
+                         f"({', '.join('?' * len(particiones))})")
+            parametros = particiones
+        filas = self._conn.execute(consulta, parametros).fetchall()
+        return {equipaje_id: {'estado': estado, 'timestamp': timestamp, 'particion': particion}
+                for equipaje_id, estado, timestamp, particion in filas}
+
+    def cargar_offsets(self):
+        """
+        Lee los offsets guardados en el último checkpoint.
+
+        Returns:
+            dict: {(tópico, partición): próximo offset a leer}.
+        """
+        filas = self._conn.execute('SELECT topico, particion, offset FROM offsets').fetchall()
+        return {(topico, particion): offset for topico, particion, offset in filas}
+
+    def registrar_valija(self, equipaje_id, info):
+        """
+        Marca el estado de una valija para el próximo checkpoint.
+
+        Args:
+            equipaje_id (str): Id de la valija.
+            info (dict): {'estado', 'timestamp', 'particion'}, o None si la valija dejó de seguirse.
+        """
+        self._modificadas[equipaje_id] = None if info is None else (
+            info['estado'], info['timestamp'], info.get('particion'))
+
+    def registrar_offset(self, topico, particion, offset):
+        """Registra el próximo offset a leer de una partición (ya procesado todo lo anterior)."""
+        self._offsets[(topico, particion)] = offset
+
+    def registrar_agregado(self, dimension, clave, inicio, valores):
+        """Suma incrementos de una ventana de la analítica para el próximo checkpoint."""
+        llave = (dimension, clave, inicio)
+        anteriores = self._agregados.get(llave)
+        self._agregados[llave] = (valores if anteriores is None else
+                                  tuple(a + b for a, b in zip(anteriores, valores)))
+
+    def checkpoint_pendiente(self):
+        """Indica si pasó el intervalo desde el último checkpoint y hay cambios para guardar."""
+        return ((self._modificadas or self._offsets or self._agregados) and
+                time.monotonic() - self._ultimo_checkpoint >= self.intervalo)
+
+    def checkpoint(self):
+        """
+        Guarda en una sola transacción las valijas modificadas, los offsets y los
+        incrementos de la analítica.
+
+        Returns:
+            int: Cantidad de valijas escritas.
+
+        Raises:
+            sqlite3.Error: Si no se pudo guardar (los cambios quedan pendientes).
+        """
+        modificadas = self._modificadas
+        with self._conn:
+            self._conn.executemany(
+                '''
+                INSERT INTO valija_seguimiento (equipaje_id, estado, timestamp, particion)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(equipaje_id) DO UPDATE SET
+                    estado = excluded.estado,
+                    timestamp = excluded.timestamp,
+                    particion = excluded.particion
+                ''',
+                [(equipaje_id, *valores) for equipaje_id, valores in modificadas.items()
+                 if valores is not None]
+            )
+            self._conn.executemany(
+                'DELETE FROM valija_seguimiento WHERE equipaje_id = ?',
+                [(equipaje_id,) for equipaje_id, valores in modificadas.items() if valores is None]
+            )
+            self._conn.executemany(
+                '''
+                INSERT INTO offsets (topico, particion, offset) VALUES (?, ?, ?)
+                ON CONFLICT(topico, particion) DO UPDATE SET offset = excluded.offset
+                ''',
+                [(topico, particion, offset) for (topico, particion), offset in self._offsets.items()]
+            )
+            self._conn.executemany(
+                f'''
+                INSERT INTO estadisticas_ventana (dimension, clave, inicio, {', '.join(CAMPOS)})
+                VALUES (?, ?, ?, {', '.join('?' * len(CAMPOS))})
+                ON CONFLICT(dimension, inicio, clave) DO UPDATE SET
+                    {', '.join(f'{campo} = {campo} + excluded.{campo}' for campo in CAMPOS)}
+                ''',
+                [llave + tuple(valores) for llave, valores in self._agregados.items()]
+            )
+        self._modificadas = {}
+        self._offsets = {}
+        self._agregados = {}
+        self._ultimo_checkpoint = time.monotonic()
+        self._checkpoints += 1
+        if self.compactar_cada and self._checkpoints % self.compactar_cada == 0:
+            self.compactar()
+        return len(modificadas)
+
+    def compactar(self):
+        """Purga la analítica vieja, libera las páginas ya borradas y trunca el WAL."""
+        try:
+            with self._conn:
+                self._conn.execute('DELETE FROM estadisticas_ventana WHERE inicio < ?',
+                                   (time.time() - ANALITICA_RETENCION_DIAS * 86400,))
+            self._conn.execute('PRAGMA incremental_vacuum').fetchall()
+            self._conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        except sqlite3.Error as e:
+            logger.warning(f"No se pudo compactar el almacén de estado: {e}")
+
+    def cerrar(self):
+        """Cierra la base (los cambios sin checkpoint se descartan)."""
+        self._conn.close()
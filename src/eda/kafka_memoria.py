@@ -0,0 +1,530 @@
+"""
+Broker Kafka en memoria para pruebas de carga y de punta a punta sin broker real.
+Implementa, dentro del mismo proceso, el subconjunto de kafka-python que usan el
+productor y el consumidor del sistema:
+    - Tópicos con particiones: cada partición es un log con offsets crecientes. Los
+      mensajes con clave van siempre a la misma partición (crc32 de la clave) y los
+      que no tienen clave se reparten en ronda.
+    - ProductorMemoria: send() devuelve un futuro con callbacks; con linger_ms los
+      envíos se agrupan en lotes que un hilo emisor entrega al completar batch_size
+      bytes o al vencer el linger, como el hilo de E/S de kafka-python.
+    - ConsumidorMemoria: grupos de consumidores con reparto de particiones,
+      rebalanceo al entrar o salir un miembro (con ConsumerRebalanceListener),
+      poll(max_records) por lotes, seek() y offsets confirmados por grupo.
+Los mensajes se guardan serializados (bytes), de modo que el costo de serializar y
+deserializar se mide igual que con el broker real. Cada partición retiene como
+máximo KAFKA_MEMORIA_RETENCION mensajes; un consumidor que quedó atrás de la
+retención sigue desde el mensaje más antiguo disponible.
+Se selecciona con KAFKA_TRANSPORTE=memoria (ver transporte.py). Al vivir en memoria
+del proceso, el productor y el consumidor deben ejecutarse en el mismo proceso
+(ver benchmark_pipeline.py).
+"""
+
+import os
+import time
+import zlib
+import logging
+import threading
+import itertools
+from collections import namedtuple
+
+logger = logging.getLogger('kafka-memoria')
+
+KAFKA_MEMORIA_PARTICIONES = int(os.environ.get('KAFKA_MEMORIA_PARTICIONES', 4))       # Particiones de los tópicos nuevos
+KAFKA_MEMORIA_RETENCION = int(os.environ.get('KAFKA_MEMORIA_RETENCION', 1000000))    # Mensajes retenidos por partición
+
+# Mismos campos que las estructuras de kafka-python (se comparan como tuplas)
+TopicPartition = namedtuple('TopicPartition', ['topic', 'partition'])
+RecordMetadata = namedtuple('RecordMetadata', ['topic', 'partition', 'offset', 'timestamp'])
+ConsumerRecord = namedtuple('ConsumerRecord', ['topic', 'partition', 'offset', 'timestamp', 'key', 'value'])
+
+class FuturoMemoria:
+    """Resultado de un envío, con la interfaz de kafka.future.Future que usa el productor."""
+
+    def __init__(self):
+        self.is_done = False
+        self.value = None
+        self.exception = None
+        self._callbacks = []
+        self._errbacks = []
+        self._lock = threading.Lock()
+        self._evento = threading.Event()
+
+    def succeeded(self):
+        return self.is_done and self.exception is None
+
+    def failed(self):
+        return self.is_done and self.exception is not None
+
+    def success(self, valor):
+        with self._lock:
+            self.value = valor
+            self.is_done = True
+            callbacks = self._callbacks
+        self._evento.set()
+        for callback in callbacks:
+            self._ejecutar(callback, valor)
+
+    def failure(self, error):
+        with self._lock:
+            self.exception = error
+            self.is_done = True
+            errbacks = self._errbacks
+        self._evento.set()
+        for errback in errbacks:
+            self._ejecutar(errback, error)
+
+    def add_callback(self, funcion, *args):
+        with self._lock:
+            if not self.is_done:
+                self._callbacks.append((funcion, args))
+                return self
+        if self.succeeded():
+            self._ejecutar((funcion, args), self.value)
+        return self
+
+    def add_errback(self, funcion, *args):
+        with self._lock:
+            if not self.is_done:
+                self._errbacks.append((funcion, args))
+                return self
+        if self.failed():
+            self._ejecutar((funcion, args), self.exception)
+        return self
+
+    def get(self, timeout=None):
+        """Espera el resultado. Lanza la excepción del envío si falló."""
+        if not self._evento.wait(timeout):
+            raise TimeoutError(f"El envío no se confirmó en {timeout} segundos")
+        if self.exception is not None:
+            raise self.exception
+        return self.value
+
+    @staticmethod
+    def _ejecutar(callback, valor):
+        funcion, args = callback
+        try:
+            funcion(*args, valor)
+        except Exception as e:
+            logger.error(f"Error en callback de envío: {e}")
+
+class _Particion:
+    """Log de una partición: mensajes (timestamp, clave, valor) desde el offset `base`."""
+
+    __slots__ = ('base', 'registros')
+
+    def __init__(self):
+        self.base = 0
+        self.registros = []
+
+    @property
+    def fin(self):
+        """Offset que tendrá el próximo mensaje."""
+        return self.base + len(self.registros)
+
+    def agregar(self, registro, retencion):
+        offset = self.fin
+        self.registros.append(registro)
+        # Recortar de a bloques para que el costo por mensaje sea constante
+        if retencion and len(self.registros) >= 2 * retencion:
+            sobrantes = len(self.registros) - retencion
+            del self.registros[:sobrantes]
+            self.base += sobrantes
+        return offset
+
+    def leer(self, offset, maximo):
+        inicio = max(offset, self.base) - self.base
+        return max(offset, self.base), self.registros[inicio:inicio + maximo]
+
+class _Grupo:
+    """Miembros, reparto de particiones y offsets confirmados de un grupo de consumidores."""
+
+    def __init__(self):
+        self.miembros = {}       # id de miembro -> tópicos suscriptos
+        self.generacion = 0
+        self.asignacion = {}     # id de miembro -> [TopicPartition]
+        self.pendientes = set()  # miembros que todavía no liberaron la asignación anterior
+        self.confirmados = {}    # TopicPartition -> próximo offset a leer
+
+class BrokerMemoria:
+    """Tópicos particionados y grupos de consumidores compartidos por los clientes del proceso."""
+
+    def __init__(self, particiones=KAFKA_MEMORIA_PARTICIONES, retencion=KAFKA_MEMORIA_RETENCION):
+        self.particiones_por_defecto = particiones
+        self.retencion = retencion
+        self.condicion = threading.Condition()
+        self._topicos = {}       # tópico -> [_Particion]
+        self._ronda = {}         # tópico -> contador para mensajes sin clave
+        self._grupos = {}
+        self._miembros = itertools.count(1)
+
+    def crear_topico(self, topico, particiones=None):
+        """Crea un tópico si no existe. Devuelve su cantidad de particiones."""
+        with self.condicion:
+            if topico not in self._topicos:
+                self._topicos[topico] = [_Particion() for _ in range(particiones or self.particiones_por_defecto)]
+                self._ronda[topico] = itertools.count()
+                self._rebalancear_suscriptos(topico)
+            return len(self._topicos[topico])
+
+    def particiones(self, topico):
+        """Números de partición de un tópico, o None si no existe."""
+        with self.condicion:
+            if topico not in self._topicos:
+                return None
+            return set(range(len(self._topicos[topico])))
+
+    def publicar(self, registros):
+        """
+        Agrega mensajes a sus particiones.
+
+        Args:
+            registros (list): Tuplas (tópico, partición o None, clave, valor, timestamp_ms).
+
+        Returns:
+            list: RecordMetadata de cada mensaje.
+        """
+        metadatos = []
+        with self.condicion:
+            for topico, particion, clave, valor, timestamp in registros:
+                if topico not in self._topicos:
+                    self.crear_topico(topico)
+                particiones = self._topicos[topico]
+                if particion is None:
+                    if clave is not None:
+                        particion = zlib.crc32(clave) % len(particiones)
+                    else:
+                        particion = next(self._ronda[topico]) % len(particiones)
+                offset = particiones[particion].agregar((timestamp, clave, valor), self.retencion)
+                metadatos.append(RecordMetadata(topico, particion, offset, timestamp))
+            self.condicion.notify_all()
+        return metadatos
+
+    def leer(self, particion, offset, maximo):
+        """Devuelve (offset del primer mensaje, [(timestamp, clave, valor)]) desde `offset`."""
+        return self._topicos[particion.topic][particion.partition].leer(offset, maximo)
+
+    def inicio(self, particion):
+        return self._topicos[particion.topic][particion.partition].base
+
+    def fin(self, particion):
+        return self._topicos[particion.topic][particion.partition].fin
+
+    def grupo(self, nombre):
+        if nombre not in self._grupos:
+            self._grupos[nombre] = _Grupo()
+        return self._grupos[nombre]
+
+    def unir(self, nombre, topicos):
+        """Suma un miembro a un grupo y rebalancea. Devuelve el id del miembro."""
+        with self.condicion:
+            for topico in topicos:
+                if topico not in self._topicos:
+                    self.crear_topico(topico)
+            miembro = next(self._miembros)
+            self.grupo(nombre).miembros[miembro] = list(topicos)
+            self._rebalancear(nombre)
+            return miembro
+
+    def salir(self, nombre, miembro):
+        """Quita un miembro del grupo y reparte sus particiones entre los demás."""
+        with self.condicion:
+            grupo = self.grupo(nombre)
+            if grupo.miembros.pop(miembro, None) is not None:
+                self._rebalancear(nombre)
+
+    def _rebalancear_suscriptos(self, topico):
+        for nombre, grupo in self._grupos.items():
+            if any(topico in topicos for topicos in grupo.miembros.values()):
+                self._rebalancear(nombre)
+
+    def _rebalancear(self, nombre):
+        # Reparto en ronda de las particiones de cada tópico entre sus suscriptos
+        grupo = self.grupo(nombre)
+        grupo.generacion += 1
+        grupo.asignacion = {miembro: [] for miembro in grupo.miembros}
+        for topico in sorted({t for topicos in grupo.miembros.values() for t in topicos}):
+            suscriptos = sorted(m for m, topicos in grupo.miembros.items() if topico in topicos)
+            for numero in range(len(self._topicos[topico])):
+                grupo.asignacion[suscriptos[numero % len(suscriptos)]].append(TopicPartition(topico, numero))
+        grupo.pendientes = set(grupo.miembros)
+        self.condicion.notify_all()
+
+    def retraso(self, nombre, topico):
+        """Mensajes del tópico que el grupo todavía no confirmó."""
+        with self.condicion:
+            grupo = self.grupo(nombre)
+            total = 0
+            for numero, particion in enumerate(self._topicos.get(topico, [])):
+                confirmado = grupo.confirmados.get(TopicPartition(topico, numero), particion.base)
+                total += particion.fin - max(confirmado, particion.base)
+            return total
+
+# Broker compartido por todos los clientes en memoria del proceso
+broker = BrokerMemoria()
+
+class ProductorMemoria:
+    """Productor con la interfaz de KafkaProducer sobre el broker en memoria."""
+
+    def __init__(self, value_serializer=None, key_serializer=None, linger_ms=0,
+                 batch_size=16384, broker_memoria=None, **opciones):
+        # Las demás opciones de KafkaProducer (bootstrap_servers, compression_type,
+        # max_block_ms, ...) no aplican en memoria
+        self._broker = broker_memoria or broker
+        self._serializar_valor = value_serializer
+        self._serializar_clave = key_serializer
+        self.linger_ms = linger_ms
+        self.batch_size = batch_size
+        self._condicion = threading.Condition()
+        self._lote = []          # (tópico, partición, clave, valor, timestamp, futuro)
+        self._bytes_lote = 0
+        self._inicio_lote = None
+        self._en_vuelo = 0       # Mensajes enviados todavía no entregados al broker
+        self._forzar = False
+        self._cerrado = False
+        self._hilo = None
+
+    def send(self, topic, value=None, key=None, partition=None, timestamp_ms=None):
+        """Encola un mensaje y devuelve un FuturoMemoria con su RecordMetadata."""
+        if self._cerrado:
+            raise RuntimeError("El productor está cerrado")
+        valor = self._serializar_valor(value) if self._serializar_valor else value
+        clave = self._serializar_clave(key) if self._serializar_clave and key is not None else key
+        registro = (topic, partition, clave, valor,
+                    timestamp_ms if timestamp_ms is not None else int(time.time() * 1000))
+        futuro = FuturoMemoria()
+        if not self.linger_ms:
+            self._entregar([registro + (futuro,)])
+            return futuro
+        with self._condicion:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._ejecutar, name='kafka-memoria-emisor', daemon=True)
+                self._hilo.start()
+            if not self._lote:
+                self._inicio_lote = time.monotonic()
+            self._lote.append(registro + (futuro,))
+            self._bytes_lote += len(valor or b'')
+            self._en_vuelo += 1
+            if self._bytes_lote >= self.batch_size:
+                self._condicion.notify_all()
+        return futuro
+
+    def _ejecutar(self):
+        """Hilo emisor: entrega cada lote al completarse o al vencer el linger."""
+        while True:
+            with self._condicion:
+                while not self._lote and not self._cerrado:
+                    self._condicion.wait()
+                if not self._lote:
+                    return
+                while not (self._forzar or self._cerrado or self._bytes_lote >= self.batch_size):
+                    restante = self._inicio_lote + self.linger_ms / 1000 - time.monotonic()
+                    if restante <= 0:
+                        break
+                    self._condicion.wait(restante)
+                lote, self._lote, self._bytes_lote = self._lote, [], 0
+                self._forzar = False
+            self._entregar(lote)
+            with self._condicion:
+                self._en_vuelo -= len(lote)
+                self._condicion.notify_all()
+
+    def _entregar(self, lote):
+        try:
+            metadatos = self._broker.publicar([registro[:5] for registro in lote])
+        except Exception as e:
+            for registro in lote:
+                registro[5].failure(e)
+            return
+        for registro, metadato in zip(lote, metadatos):
+            registro[5].success(metadato)
+
+    def flush(self, timeout=None):
+        """Entrega los lotes pendientes y espera su confirmación."""
+        with self._condicion:
+            if not self._en_vuelo:
+                return
+            self._forzar = True
+            self._condicion.notify_all()
+            if not self._condicion.wait_for(lambda: self._en_vuelo == 0, timeout):
+                raise TimeoutError(f"Quedaron {self._en_vuelo} mensajes sin entregar")
+
+    def close(self, timeout=None):
+        """Entrega lo pendiente y detiene el hilo emisor."""
+        try:
+            self.flush(timeout)
+        finally:
+            with self._condicion:
+                self._cerrado = True
+                self._condicion.notify_all()
+            if self._hilo is not None:
+                self._hilo.join(timeout)
+
+    def metrics(self):
+        return {}
+
+class ConsumidorMemoria:
+    """Consumidor con la interfaz de KafkaConsumer sobre el broker en memoria."""
+
+    def __init__(self, *topicos, group_id=None, value_deserializer=None, key_deserializer=None,
+                 auto_offset_reset='latest', enable_auto_commit=True, max_poll_records=500,
+                 broker_memoria=None, **opciones):
+        # Las demás opciones de KafkaConsumer (bootstrap_servers, ...) no aplican en memoria
+        self._broker = broker_memoria or broker
+        self.group_id = group_id
+        self._deserializar_valor = value_deserializer
+        self._deserializar_clave = key_deserializer
+        self.auto_offset_reset = auto_offset_reset
+        self.enable_auto_commit = enable_auto_commit
+        self.max_poll_records = max_poll_records
+        self._miembro = None
+        self._grupo = None
+        self._listener = None
+        self._generacion = 0     # Generación del grupo de la asignación vigente
+        self._liberada = 0       # Última generación en la que se liberó la asignación anterior
+        self._asignacion = []
+        self._posiciones = {}    # TopicPartition -> próximo offset a leer
+        self._siguiente = 0      # Partición por la que empieza el próximo poll (reparto justo)
+        if topicos:
+            self.subscribe(list(topicos))
+
+    def subscribe(self, topics, listener=None):
+        """Se une al grupo suscripto a los tópicos indicados."""
+        if self._miembro is not None:
+            raise RuntimeError("El consumidor ya está suscripto")
+        self._listener = listener
+        if self.group_id is None:
+            # Sin grupo: un grupo propio que nadie más comparte
+            self.group_id = f'_consumidor_{id(self)}'
+        self._miembro = self._broker.unir(self.group_id, topics)
+        self._grupo = self._broker.grupo(self.group_id)
+
+    def _sincronizar(self):
+        """
+        Aplica un rebalanceo del grupo en dos fases, como el protocolo de Kafka: primero
+        cada miembro libera su asignación (on_partitions_revoked, donde confirma sus
+        offsets) y recién cuando todos la liberaron cada uno toma la nueva.
+
+        Returns:
+            bool: True si la asignación vigente está lista para leer.
+        """
+        with self._broker.condicion:
+            generacion = self._grupo.generacion
+            if self._generacion == generacion:
+                return True
+            revocadas = self._asignacion if self._liberada != generacion else []
+        if revocadas and self._listener is not None:
+            self._listener.on_partitions_revoked(set(revocadas))
+        with self._broker.condicion:
+            if self._liberada != generacion:
+                self._asignacion = []
+                self._posiciones = {}
+                self._liberada = generacion
+                self._grupo.pendientes.discard(self._miembro)
+                self._broker.condicion.notify_all()
+            if self._grupo.generacion != generacion or self._grupo.pendientes:
+                return False
+            self._asignacion = list(self._grupo.asignacion.get(self._miembro, []))
+            for particion in self._asignacion:
+                offset = self._grupo.confirmados.get(particion)
+                if offset is None:
+                    offset = (self._broker.inicio(particion) if self.auto_offset_reset == 'earliest'
+                              else self._broker.fin(particion))
+                self._posiciones[particion] = offset
+            self._generacion = generacion
+            asignadas = list(self._asignacion)
+        if self._listener is not None:
+            self._listener.on_partitions_assigned(set(asignadas))
+        return True
+
+    def poll(self, timeout_ms=0, max_records=None, update_offsets=True):
+        """
+        Lee hasta max_records mensajes de las particiones asignadas, esperando hasta
+        timeout_ms si no hay ninguno.
+
+        Returns:
+            dict: {TopicPartition: [ConsumerRecord]}.
+        """
+        if self._miembro is None:
+            raise RuntimeError("El consumidor no está suscripto a ningún tópico")
+        if self.enable_auto_commit:
+            self.commit()
+        maximo = max_records or self.max_poll_records
+        limite = time.monotonic() + timeout_ms / 1000
+        while True:
+            listo = self._sincronizar()
+            with self._broker.condicion:
+                if listo and self._generacion == self._grupo.generacion:
+                    leidos = self._leer(maximo, update_offsets)
+                    if leidos:
+                        break
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    return {}
+                self._broker.condicion.wait(restante)
+        return {particion: [self._registro(particion, offset, datos) for offset, datos in registros]
+                for particion, registros in leidos.items()}
+
+    def _leer(self, maximo, avanzar):
+        leidos = {}
+        cantidad = len(self._asignacion)
+        for i in range(cantidad):
+            if maximo <= 0:
+                break
+            particion = self._asignacion[(self._siguiente + i) % cantidad]
+            offset, registros = self._broker.leer(particion, self._posiciones[particion], maximo)
+            if registros:
+                leidos[particion] = [(offset + n, datos) for n, datos in enumerate(registros)]
+                maximo -= len(registros)
+                if avanzar:
+                    self._posiciones[particion] = offset + len(registros)
+        if cantidad:
+            self._siguiente = (self._siguiente + 1) % cantidad
+        return leidos
+
+    def _registro(self, particion, offset, datos):
+        timestamp, clave, valor = datos
+        if self._deserializar_clave is not None and clave is not None:
+            clave = self._deserializar_clave(clave)
+        if self._deserializar_valor is not None:
+            valor = self._deserializar_valor(valor)
+        return ConsumerRecord(particion.topic, particion.partition, offset, timestamp, clave, valor)
+
+    def commit(self, offsets=None):
+        """Confirma en el grupo las posiciones actuales (o los offsets indicados)."""
+        if self._grupo is None:
+            return
+        if offsets is None:
+            offsets = self._posiciones
+        with self._broker.condicion:
+            for particion, offset in offsets.items():
+                self._grupo.confirmados[TopicPartition(*particion)] = getattr(offset, 'offset', offset)
+
+    def committed(self, partition):
+        """Offset confirmado por el grupo para una partición, o None."""
+        return self._grupo.confirmados.get(TopicPartition(*partition)) if self._grupo else None
+
+    def seek(self, partition, offset):
+        """Mueve la posición de lectura de una partición asignada."""
+        particion = TopicPartition(*partition)
+        if particion not in self._posiciones:
+            raise ValueError(f"La partición {particion} no está asignada a este consumidor")
+        self._posiciones[particion] = offset
+
+    def position(self, partition):
+        return self._posiciones.get(TopicPartition(*partition))
+
+    def assignment(self):
+        return set(self._asignacion)
+
+    def partitions_for_topic(self, topic):
+        return self._broker.particiones(topic)
+
+    def close(self, autocommit=True):
+        """Sale del grupo (sus particiones pasan a los demás miembros)."""
+        if self._miembro is None:
+            return
+        if autocommit and self.enable_auto_commit:
+            self.commit()
+        self._broker.salir(self.group_id, self._miembro)
+        self._miembro = None
@@ -1,20 +1,378 @@
 """
 Productor de eventos Kafka para el backend Flask.
 Permite publicar eventos de equipaje en el tópico de Kafka.
+
+En modo asíncrono (por defecto) los eventos se encolan sin esperar al broker:
+kafka-python los agrupa en lotes (linger/batch size) comprimidos y confirma cada
+envío en un callback que registra latencia y fallos. La cantidad de eventos sin
+confirmar está acotada; al llegar al límite se aplica la política configurada:
+    - 'bloquear': esperar hasta que se libere lugar (con tiempo máximo).
+    - 'descartar': descartar el evento y contarlo.
+    - 'derramar': guardar el evento en un archivo local que se reenvía al reiniciar.
+Al terminar el proceso se hace un flush para no perder los eventos en vuelo.
+
+La conexión con el broker se abre con la primera publicación, no al importar el
+módulo: sin broker disponible la aplicación arranca igual y los envíos fallan
+según la política configurada (reintentando la conexión cada KAFKA_REINTENTO_CONEXION).
+Con KAFKA_TRANSPORTE=memoria los eventos van al broker en memoria del proceso
+(ver transporte.py).
 """
 
+import os
 import json
-from kafka import KafkaProducer
+import time
+import atexit
+import shutil
+import logging
+import threading
+
+from src.eda.transporte import KAFKA_TRANSPORTE, crear_productor, transporte_en_memoria
+
+logger = logging.getLogger('kafka-producer')
 
 KAFKA_BROKER = '127.0.0.1:9092'  # Forzar IPv4
 KAFKA_TOPIC = 'eventos_equipaje'
 
-producer = KafkaProducer(
-    bootstrap_servers=[KAFKA_BROKER],
-    value_serializer=lambda v: json.dumps(v).encode('utf-8')
+# Configuración del modo de publicación
+KAFKA_ASINCRONO = os.environ.get('KAFKA_ASINCRONO', 'True') == 'True'
+KAFKA_LINGER_MS = 20              # Espera máxima para completar un lote
+KAFKA_BATCH_SIZE = 64 * 1024      # Tamaño de lote por partición (bytes)
+KAFKA_COMPRESION = 'gzip'         # Soportado por kafka-python sin dependencias extra
+KAFKA_MAX_BLOCK_MS = 1000         # Espera máxima de send() si el broker no responde
+KAFKA_MAX_PENDIENTES = 10000      # Eventos enviados sin confirmar antes de aplicar la política
+KAFKA_POLITICA = os.environ.get('KAFKA_POLITICA', 'derramar')  # 'bloquear', 'descartar' o 'derramar'
+KAFKA_ESPERA_BLOQUEO = 5          # Segundos máximos de espera con la política 'bloquear'
+KAFKA_ARCHIVO_DERRAME = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'data', 'kafka_pendientes.ndjson'
 )
+KAFKA_TIMEOUT_CIERRE = 10         # Segundos para el flush final al cerrar
+KAFKA_REINTENTO_CONEXION = 10     # Segundos entre intentos de conexión si el broker no responde
+
+POLITICAS = ('bloquear', 'descartar', 'derramar')
+
+class ProductorEventos:
+    """Publica eventos en Kafka en modo síncrono o asíncrono con buffer acotado."""
+
+    def __init__(self, asincrono=KAFKA_ASINCRONO, max_pendientes=KAFKA_MAX_PENDIENTES,
+                 politica=KAFKA_POLITICA, archivo_derrame=KAFKA_ARCHIVO_DERRAME):
+        if politica not in POLITICAS:
+            raise ValueError(f"Política de buffer desconocida: {politica}")
+        self.asincrono = asincrono
+        self.max_pendientes = max_pendientes
+        self.politica = politica
+        self.archivo_derrame = archivo_derrame
+        self._condicion = threading.Condition()
+        self._lock_derrame = threading.Lock()
+        self._pendientes = 0
+        self._cerrado = False
+        self._producer = None
+        self._lock_producer = threading.Lock()
+        self._ultimo_intento_conexion = None
+        self._metricas = {
+            'enviados': 0,
+            'confirmados': 0,
+            'fallidos': 0,
+            'descartados': 0,
+            'derramados': 0,
+            'latencia_ms_total': 0.0,
+            'latencia_ms_max': 0.0,
+        }
+
+    def _obtener_producer(self):
+        """
+        Devuelve el productor del transporte configurado, creándolo en el primer uso.
+
+        Raises:
+            Exception: Si no se pudo conectar con el broker (o se intentó hace menos
+            de KAFKA_REINTENTO_CONEXION segundos).
+        """
+        if self._producer is not None:
+            return self._producer
+        with self._lock_producer:
+            if self._producer is None:
+                ahora = time.monotonic()
+                if (self._ultimo_intento_conexion is not None and
+                        ahora - self._ultimo_intento_conexion < KAFKA_REINTENTO_CONEXION):
+                    raise ConnectionError("Broker de Kafka no disponible")
+                self._ultimo_intento_conexion = ahora
+                opciones = {}
+                if self.asincrono:
+                    opciones = {
+                        'linger_ms': KAFKA_LINGER_MS,
+                        'batch_size': KAFKA_BATCH_SIZE,
+                        'compression_type': KAFKA_COMPRESION,
+                        'max_block_ms': KAFKA_MAX_BLOCK_MS,
+                    }
+                self._producer = crear_productor(
+                    bootstrap_servers=[KAFKA_BROKER],
+                    value_serializer=lambda v: json.dumps(v).encode('utf-8'),
+                    key_serializer=lambda k: k.encode('utf-8') if k is not None else None,
+                    **opciones
+                )
+                logger.info("Productor Kafka en memoria" if transporte_en_memoria()
+                            else f"Productor Kafka conectado a {KAFKA_BROKER}")
+        return self._producer
+
+    def _enviar(self, producer, evento):
+        """
+        Envía un evento con el id de valija como clave: todos los eventos de una
+        valija van a la misma partición y el consumidor los recibe en orden.
+        """
+        return producer.send(KAFKA_TOPIC, value=evento, key=evento.get('equipaje_id'))
+
+    def publicar(self, evento):
+        """
+        Publica un evento. En modo síncrono espera la confirmación del broker.
+
+        Args:
+            evento (dict): Evento serializable a JSON.
+
+        Returns:
+            bool: True si el evento quedó enviado o encolado para envío.
+        """
+        if not self.asincrono:
+            producer = self._obtener_producer()
+            self._enviar(producer, evento)
+            producer.flush()
+            return True
+
+        if not self._reservar_lugar():
+            return self._aplicar_politica(evento)
+
+        inicio = time.perf_counter()
+        try:
+            futuro = self._enviar(self._obtener_producer(), evento)
+        except Exception as e:
+            # Sin metadatos del broker o buffer interno lleno: tratar como fallo de entrega
+            self._liberar_lugar()
+            self._registrar_fallo(evento, e)
+            return self.politica == 'derramar'
+        with self._condicion:
+            self._metricas['enviados'] += 1
+        futuro.add_callback(self._al_confirmar, inicio)
+        futuro.add_errback(self._al_fallar, evento)
+        return True
+
+    def publicar_lote(self, eventos):
+        """
+        Publica varios eventos. En modo síncrono hace un único flush al final.
+
+        Returns:
+            bool: True si todos los eventos quedaron enviados o encolados.
+        """
+        if not self.asincrono:
+            producer = self._obtener_producer()
+            for evento in eventos:
+                self._enviar(producer, evento)
+            producer.flush()
+            return True
+        resultados = [self.publicar(evento) for evento in eventos]
+        return all(resultados)
+
+    def publicar_confirmado(self, eventos, timeout=KAFKA_TIMEOUT_CIERRE):
+        """
+        Publica un lote y espera la confirmación del broker para cada evento, sin
+        pasar por el buffer acotado (lo usa el relay del outbox, que ya persiste
+        los pendientes en la base).
+
+        Args:
+            eventos (list): Eventos serializables a JSON.
+            timeout (float): Segundos máximos de espera de las confirmaciones.
+
+        Returns:
+            list: Un bool por evento, True si el broker confirmó la entrega.
+        """
+        futuros = []
+        try:
+            producer = self._obtener_producer()
+        except Exception as e:
+            logger.error(f"Error al conectar con Kafka: {e}")
+            producer = None
+        for evento in eventos:
+            try:
+                futuros.append(self._enviar(producer, evento) if producer else None)
+            except Exception as e:
+                logger.error(f"Error al publicar evento en Kafka: {e}")
+                futuros.append(None)
+        if producer is not None:
+            try:
+                producer.flush(timeout=timeout)
+            except Exception as e:
+                logger.error(f"No se confirmó el lote en Kafka: {e}")
+        resultados = [futuro is not None and futuro.is_done and futuro.succeeded()
+                      for futuro in futuros]
+        confirmados = sum(resultados)
+        with self._condicion:
+            self._metricas['enviados'] += len(eventos)
+            self._metricas['confirmados'] += confirmados
+            self._metricas['fallidos'] += len(eventos) - confirmados
+        return resultados
+
+    def _reservar_lugar(self):
+        """Reserva un lugar en el buffer de pendientes según la política configurada."""
+        with self._condicion:
+            if self._pendientes >= self.max_pendientes and self.politica == 'bloquear':
+                self._condicion.wait_for(lambda: self._pendientes < self.max_pendientes,
+                                         timeout=KAFKA_ESPERA_BLOQUEO)
+            if self._pendientes >= self.max_pendientes:
+                return False
+            self._pendientes += 1
+            return True
+
+    def _liberar_lugar(self):
+        with self._condicion:
+            self._pendientes -= 1
+            self._condicion.notify()
+
+    def _aplicar_politica(self, evento):
+        """Resuelve un evento que no entra en el buffer. Devuelve True si no se perdió."""
+        if self.politica == 'derramar':
+            return self._derramar(evento)
+        with self._condicion:
+            self._metricas['descartados'] += 1
+        logger.warning(f"Buffer de Kafka lleno ({self.max_pendientes} pendientes): evento descartado")
+        return False
+
+    def _al_confirmar(self, inicio, metadatos):
+        """Callback de entrega exitosa (se ejecuta en el hilo de E/S de kafka-python)."""
+        latencia_ms = (time.perf_counter() - inicio) * 1000
+        with self._condicion:
+            self._metricas['confirmados'] += 1
+            self._metricas['latencia_ms_total'] += latencia_ms
+            self._metricas['latencia_ms_max'] = max(self._metricas['latencia_ms_max'], latencia_ms)
+        self._liberar_lugar()
+
+    def _al_fallar(self, evento, error):
+        """Callback de entrega fallida (se ejecuta en el hilo de E/S de kafka-python)."""
+        self._liberar_lugar()
+        self._registrar_fallo(evento, error)
+
+    def _registrar_fallo(self, evento, error):
+        with self._condicion:
+            self._metricas['fallidos'] += 1
+        logger.error(f"Error al publicar evento en Kafka: {error}")
+        if self.politica == 'derramar':
+            self._derramar(evento)
+
+    def _derramar(self, evento):
+        """Guarda un evento en el archivo local de pendientes para reenviarlo más tarde."""
+        try:
+            with self._lock_derrame:
+                os.makedirs(os.path.dirname(self.archivo_derrame), exist_ok=True)
+                with open(self.archivo_derrame, 'a', encoding='utf-8') as archivo:
+                    archivo.write(json.dumps(evento) + '\n')
+            with self._condicion:
+                self._metricas['derramados'] += 1
+            return True
+        except Exception as e:
+            logger.error(f"No se pudo guardar el evento pendiente de Kafka: {e}")
+            with self._condicion:
+                self._metricas['descartados'] += 1
+            return False
+
+    def reenviar_derramados(self):
+        """
+        Reenvía los eventos guardados en el archivo de pendientes. El archivo se renombra
+        antes de leerlo, por lo que los eventos que vuelvan a fallar se derraman de nuevo.
+        Si quedó el archivo de un reenvío interrumpido, los pendientes nuevos se le agregan
+        y se reenvían todos (los ya publicados antes de la interrupción se repiten).
+
+        Returns:
+            int: Cantidad de eventos reenviados.
+        """
+        en_proceso = self.archivo_derrame + '.reenvio'
+        with self._lock_derrame:
+            if os.path.exists(self.archivo_derrame):
+                if os.path.exists(en_proceso):
+                    with open(self.archivo_derrame, encoding='utf-8') as nuevos, \
+                            open(en_proceso, 'a', encoding='utf-8') as anteriores:
+                        shutil.copyfileobj(nuevos, anteriores)
+                    os.remove(self.archivo_derrame)
+                else:
+                    os.replace(self.archivo_derrame, en_proceso)
+            elif not os.path.exists(en_proceso):
+                return 0
+        reenviados = 0
+        with open(en_proceso, encoding='utf-8') as archivo:
+            for linea in archivo:
+                if linea.strip():
+                    self.publicar(json.loads(linea))
+                    reenviados += 1
+        # Borrar el archivo solo cuando el broker confirmó o rechazó (y se volvieron a
+        # derramar) los eventos reenviados
+        if self.asincrono and self._producer is not None:
+            try:
+                self._producer.flush(timeout=KAFKA_TIMEOUT_CIERRE)
+            except Exception as e:
+                logger.error(f"Reenvío sin confirmar, se conserva {en_proceso}: {e}")
+                return reenviados
+        os.remove(en_proceso)
+        logger.info(f"Reenviados {reenviados} eventos pendientes de Kafka")
+        return reenviados
+
+    def metricas(self):
+        """
+        Métricas de publicación: profundidad de la cola de pendientes, contadores de
+        envíos, fallos, descartes y derrames, y latencia de confirmación.
+
+        Returns:
+            dict: Métricas actuales.
+        """
+        with self._condicion:
+            metricas = dict(self._metricas)
+            pendientes = self._pendientes
+        confirmados = metricas['confirmados']
+        return {
+            'modo': 'asincrono' if self.asincrono else 'sincrono',
+            'conectado': self._producer is not None,
+            'transporte': KAFKA_TRANSPORTE,
+            'politica': self.politica,
+            'pendientes': pendientes,
+            'max_pendientes': self.max_pendientes,
+            'enviados': metricas['enviados'],
+            'confirmados': confirmados,
+            'fallidos': metricas['fallidos'],
+            'descartados': metricas['descartados'],
+            'derramados': metricas['derramados'],
+            'latencia_ms_promedio': round(metricas['latencia_ms_total'] / confirmados, 2) if confirmados else None,
+            'latencia_ms_max': round(metricas['latencia_ms_max'], 2),
+        }
+
+    def cerrar(self, timeout=KAFKA_TIMEOUT_CIERRE):
+        """Envía los eventos pendientes y cierra el productor."""
+        if self._cerrado:
+            return
+        self._cerrado = True
+        if self._producer is None:
+            return
+        try:
+            self._producer.flush(timeout=timeout)
+        except Exception as e:
+            logger.error(f"No se pudieron enviar todos los eventos pendientes de Kafka: {e}")
+        self._producer.close(timeout=timeout)
+
+productor = ProductorEventos()
+atexit.register(productor.cerrar)
+
+def reenviar_pendientes():
+    """Reenvía los eventos derramados en ejecuciones anteriores (al iniciar los servicios)."""
+    if not productor.asincrono:
+        return 0
+    try:
+        return productor.reenviar_derramados()
+    except Exception as e:
+        logger.error(f"Error al reenviar eventos pendientes de Kafka: {e}")
+        return 0
 
 def publicar_evento_equipaje(evento: dict):
-    """Publica un evento de equipaje en Kafka."""
-    producer.send(KAFKA_TOPIC, evento)
-    producer.flush()
+    """Publica un evento de equipaje en Kafka (sin esperar al broker en modo asíncrono)."""
+    return productor.publicar(evento)
+
+def publicar_eventos_equipaje(eventos: list):
+    """Publica un lote de eventos de equipaje en Kafka (un único flush en modo síncrono)."""
+    return productor.publicar_lote(eventos)
+
+def metricas_productor():
+    """Métricas de publicación del productor Kafka."""
+    return productor.metricas()
@@ -0,0 +1,167 @@
+"""
+Relay del outbox transaccional hacia Kafka.
+Un hilo en segundo plano lee los mensajes pendientes de la tabla outbox_kafka en
+lotes, los publica en el tópico eventos_equipaje esperando la confirmación del
+broker y los marca como enviados. Si Kafka no responde, los mensajes quedan en la
+base y se reintenta con espera creciente; al volver el broker el relay se pone al
+día publicando lotes completos sin esperar entre ellos.
+La entrega es "al menos una vez": un corte entre la confirmación y la marca en la
+base puede reenviar un lote, y tras un fallo se reenvían también los mensajes
+posteriores de la misma valija para conservar su orden.
+Uso independiente: python src/eda/relay_outbox.py
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+
+# Ajustar el path para las importaciones
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.core.config import Config
+from src.core import db_service
+from src.eda.productor_kafka import productor
+
+logger = logging.getLogger('relay-outbox')
+
+# Ciclos del relay entre purgas de los mensajes ya enviados
+CICLOS_ENTRE_PURGAS = 1000
+
+class RelayOutbox:
+    """Publica en Kafka los mensajes pendientes del outbox desde un hilo propio."""
+
+    def __init__(self, tamano_lote=Config.OUTBOX_TAMANO_LOTE):
+        self.tamano_lote = tamano_lote
+        self._detener = threading.Event()
+        self._hilo = None
+        self._lock = threading.Lock()
+        self._metricas = {
+            'publicados': 0,
+            'fallidos': 0,
+            'lotes': 0,
+            'ultimo_envio': None,
+            'ultimo_error': None,
+        }
+
+    def procesar_lote(self):
+        """
+        Publica un lote de mensajes pendientes y marca los confirmados. Después del
+        primer mensaje fallido de una valija no se marca ninguno más de esa valija,
+        aunque el broker los haya confirmado: se reenvían todos en orden en el próximo
+        ciclo, y el consumidor nunca termina con un estado anterior al último.
+
+        Returns:
+            tuple: (cantidad leída, cantidad marcada como enviada).
+        """
+        pendientes = db_service.obtener_outbox_pendientes(self.tamano_lote)
+        if not pendientes:
+            return 0, 0
+        resultados = productor.publicar_confirmado([mensaje for _, mensaje in pendientes],
+                                                   timeout=Config.OUTBOX_TIMEOUT_ENVIO)
+        confirmados = []
+        con_fallos = set()
+        for (id_outbox, mensaje), ok in zip(pendientes, resultados):
+            if not ok:
+                con_fallos.add(mensaje.get('equipaje_id'))
+            elif mensaje.get('equipaje_id') not in con_fallos:
+                confirmados.append(id_outbox)
+        if not db_service.marcar_outbox_enviados(confirmados):
+            # Quedan pendientes y se reenvían en el próximo ciclo
+            confirmados = []
+        with self._lock:
+            self._metricas['lotes'] += 1
+            self._metricas['publicados'] += len(confirmados)
+            self._metricas['fallidos'] += len(pendientes) - len(confirmados)
+            if confirmados:
+                self._metricas['ultimo_envio'] = time.time()
+            if len(confirmados) < len(pendientes):
+                self._metricas['ultimo_error'] = time.time()
+        return len(pendientes), len(confirmados)
+
+    def _ejecutar(self):
+        logger.info("Relay del outbox iniciado")
+        espera_error = Config.OUTBOX_INTERVALO
+        ciclos = 0
+        while not self._detener.is_set():
+            try:
+                leidos, confirmados = self.procesar_lote()
+            except Exception as e:
+                logger.error(f"Error en el relay del outbox: {e}")
+                leidos, confirmados = 1, 0
+
+            ciclos += 1
+            if ciclos % CICLOS_ENTRE_PURGAS == 0:
+                db_service.purgar_outbox()
+
+            if leidos and confirmados < leidos:
+                # Broker caído o lento: reintentar con espera creciente
+                logger.warning(f"Kafka confirmó {confirmados} de {leidos} mensajes; "
+                               f"reintento en {espera_error:.1f} s")
+                self._detener.wait(espera_error)
+                espera_error = min(espera_error * 2, Config.OUTBOX_ESPERA_MAX)
+                continue
+            espera_error = Config.OUTBOX_INTERVALO
+            if leidos < self.tamano_lote:
+                # Al día: esperar nuevos mensajes. Con lotes completos se sigue sin pausa.
+                self._detener.wait(Config.OUTBOX_INTERVALO)
+        db_service.cerrar_db_connection_hilo()
+        logger.info("Relay del outbox detenido")
+
+    def iniciar(self):
+        """
+        Arranca el hilo del relay si no está en ejecución.
+
+        Returns:
+            bool: True si el relay quedó en ejecución.
+        """
+        if self._hilo is not None and self._hilo.is_alive():
+            return True
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._ejecutar, name='relay-outbox', daemon=True)
+        self._hilo.start()
+        return True
+
+    def detener(self, timeout=5):
+        """Detiene el hilo del relay al terminar el ciclo en curso."""
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+
+    def estado(self):
+        """
+        Estado del relay y del outbox para monitoreo.
+
+        Returns:
+            dict: Métricas del relay más 'pendientes' y 'creado_ms_mas_antiguo' del outbox.
+        """
+        with self._lock:
+            estado = dict(self._metricas)
+        estado['activo'] = self._hilo is not None and self._hilo.is_alive()
+        estado.update(db_service.obtener_estado_outbox() or {})
+        return estado
+
+relay = RelayOutbox()
+
+def iniciar_relay():
+    """Inicia el relay del outbox en segundo plano."""
+    return relay.iniciar()
+
+def estado_relay():
+    """Estado del relay y cantidad de mensajes pendientes del outbox."""
+    return relay.estado()
+
+# Para ejecutar el relay como proceso independiente
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    db_service.inicializar_db()
+    iniciar_relay()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        relay.detener()
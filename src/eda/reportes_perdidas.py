@@ -0,0 +1,250 @@
+"""
+Destinos de los reportes de equipaje perdido del consumidor Kafka.
+EscritorReportes acumula en memoria las filas de reporte y las escribe en todos sus
+destinos al superar REPORTES_MAX_FILAS filas o REPORTES_MAX_ESPERA segundos (y antes
+de cada confirmación de offsets, de modo que ningún offset se confirma con reportes
+sin guardar). Cada destino lleva sus propias filas pendientes: si uno falla, solo
+ese reintenta en el próximo vaciado y los demás no duplican filas.
+
+Destinos disponibles:
+- DestinoCSV: archivos en data/reportes/, rotados por día o por tamaño.
+- DestinoSQLite: tabla reportes_perdidas indexada (opcional, CONSUMIDOR_REPORTES_DB).
+Para agregar otro destino basta con heredar de DestinoReportes e implementar escribir().
+"""
+
+import os
+import abc
+import csv
+import time
+import sqlite3
+import logging
+
+logger = logging.getLogger('reportes-perdidas')
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+REPORTES_DIR = os.environ.get('CONSUMIDOR_REPORTES_DIR', os.path.join(RAIZ, 'data', 'reportes'))
+REPORTES_ROTACION = os.environ.get('CONSUMIDOR_REPORTES_ROTACION', 'diaria')  # 'diaria' o 'tamano'
+REPORTES_TAMANO_MAX = int(os.environ.get('CONSUMIDOR_REPORTES_TAMANO_MAX', 10 * 1024 * 1024))  # Bytes por archivo (0: sin límite)
+REPORTES_DB = os.environ.get('CONSUMIDOR_REPORTES_DB', '')  # Ruta de la base SQLite ('' la desactiva)
+REPORTES_MAX_FILAS = int(os.environ.get('CONSUMIDOR_REPORTES_MAX_FILAS', 500))     # Filas pendientes que fuerzan un vaciado
+REPORTES_MAX_ESPERA = float(os.environ.get('CONSUMIDOR_REPORTES_MAX_ESPERA', 5))   # Segundos máximos sin vaciar
+
+COLUMNAS = ['id_valija', 'origen', 'destino', 'peso', 'timestamp']
+
+class DestinoReportes(abc.ABC):
+    """Destino de reportes: recibe lotes de filas [id_valija, origen, destino, peso, timestamp]."""
+
+    nombre = 'destino'
+
+    @abc.abstractmethod
+    def escribir(self, filas):
+        """
+        Guarda un lote de filas de forma durable.
+
+        Raises:
+            Exception: Si no se pudo guardar (las filas se reintentan en el próximo vaciado).
+        """
+        raise NotImplementedError
+
+    def cerrar(self):
+        """Libera los recursos del destino."""
+
+class DestinoCSV(DestinoReportes):
+    """
+    Archivos CSV rotados: reportes_perdidas_AAAA-MM-DD.csv con rotación diaria, o
+    reportes_perdidas.csv con rotación por tamaño. Al superar el tamaño máximo se
+    continúa en el siguiente número (reportes_perdidas_AAAA-MM-DD.1.csv, ...).
+    """
+
+    nombre = 'csv'
+
+    def __init__(self, directorio=REPORTES_DIR, rotacion=REPORTES_ROTACION,
+                 tamano_max=REPORTES_TAMANO_MAX, prefijo='reportes_perdidas'):
+        if rotacion not in ('diaria', 'tamano'):
+            raise ValueError(f"Rotación de reportes desconocida: {rotacion}")
+        self.directorio = directorio
+        self.rotacion = rotacion
+        self.tamano_max = tamano_max
+        self.prefijo = prefijo
+        self._base = None
+        self._numero = 0
+
+    def _ruta(self, numero):
+        sufijo = f'.{numero}' if numero else ''
+        return os.path.join(self.directorio, f'{self._base}{sufijo}.csv')
+
+    def ruta_actual(self):
+        """Archivo en el que se escribirá el próximo lote."""
+        base = self.prefijo
+        if self.rotacion == 'diaria':
+            base += time.strftime('_%Y-%m-%d')
+        if base != self._base:
+            # Nuevo período (o primer uso): continuar en el último archivo existente
+            self._base = base
+            self._numero = 0
+            while os.path.exists(self._ruta(self._numero + 1)):
+                self._numero += 1
+        ruta = self._ruta(self._numero)
+        if self.tamano_max and os.path.exists(ruta) and os.path.getsize(ruta) >= self.tamano_max:
+            self._numero += 1
+            ruta = self._ruta(self._numero)
+        return ruta
+
+    def escribir(self, filas):
+        os.makedirs(self.directorio, exist_ok=True)
+        ruta = self.ruta_actual()
+        try:
+            # Creación exclusiva: con varios consumidores solo uno escribe el encabezado
+            f = open(ruta, 'x', newline='', encoding='utf-8')
+            nuevo = True
+        except FileExistsError:
+            f = open(ruta, 'a', newline='', encoding='utf-8')
+            nuevo = False
+        with f:
+            writer = csv.writer(f)
+            if nuevo:
+                writer.writerow(COLUMNAS)
+            writer.writerows(filas)
+            f.flush()
+            os.fsync(f.fileno())
+        return ruta
+
+class DestinoSQLite(DestinoReportes):
+    """Tabla reportes_perdidas en SQLite, indexada por valija y por timestamp."""
+
+    nombre = 'sqlite'
+
+    def __init__(self, ruta=REPORTES_DB):
+        self.ruta = ruta
+        self._conn = None
+
+    def _conectar(self):
+        if self._conn is None:
+            directorio = os.path.dirname(self.ruta)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            # Varios procesos del grupo pueden escribir a la vez: esperar en lugar de fallar
+            conn = sqlite3.connect(self.ruta, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with conn:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS reportes_perdidas (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        id_valija TEXT NOT NULL,
+                        origen TEXT,
+                        destino TEXT,
+                        peso REAL,
+                        timestamp TEXT,
+                        registrado_ms INTEGER NOT NULL
+                    )
+                ''')
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_reportes_valija ON reportes_perdidas (id_valija)')
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_reportes_timestamp ON reportes_perdidas (timestamp)')
+            self._conn = conn
+        return self._conn
+
+    def escribir(self, filas):
+        conn = self._conectar()
+        registrado_ms = int(time.time() * 1000)
+        with conn:
+            conn.executemany(
+                '''
+                INSERT INTO reportes_perdidas (id_valija, origen, destino, peso, timestamp, registrado_ms)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ''',
+                [(id_valija, origen, destino, peso, None if timestamp is None else str(timestamp), registrado_ms)
+                 for id_valija, origen, destino, peso, timestamp in filas]
+            )
+        return self.ruta
+
+    def cerrar(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+class EscritorReportes:
+    """Buffer de reportes con vaciado por cantidad o por tiempo hacia varios destinos."""
+
+    def __init__(self, destinos=None, max_filas=REPORTES_MAX_FILAS, max_espera=REPORTES_MAX_ESPERA):
+        self.max_filas = max_filas
+        self.max_espera = max_espera
+        self._pendientes = {}   # destino -> filas aún no escritas en ese destino
+        self._primera_pendiente = None
+        self.escritas = 0
+        for destino in destinos or []:
+            self.agregar_destino(destino)
+
+    def agregar_destino(self, destino):
+        """Suma un destino; recibe los reportes agregados desde este momento."""
+        self._pendientes[destino] = []
+
+    @property
+    def destinos(self):
+        return list(self._pendientes)
+
+    def pendientes(self):
+        """Cantidad máxima de filas sin escribir en algún destino."""
+        return max((len(filas) for filas in self._pendientes.values()), default=0)
+
+    def agregar(self, filas):
+        """Encola filas de reporte para todos los destinos (no escribe)."""
+        if not filas:
+            return
+        for pendientes in self._pendientes.values():
+            pendientes.extend(filas)
+        if self._primera_pendiente is None:
+            self._primera_pendiente = time.monotonic()
+
+    def debe_vaciar(self):
+        """Indica si se superó el máximo de filas o de espera desde la primera pendiente."""
+        if self._primera_pendiente is None:
+            return False
+        return (self.pendientes() >= self.max_filas or
+                time.monotonic() - self._primera_pendiente >= self.max_espera)
+
+    def vaciar(self):
+        """
+        Escribe las filas pendientes en cada destino.
+
+        Returns:
+            int: Cantidad de filas escritas (en el destino que más escribió).
+
+        Raises:
+            OSError: Si algún destino falló; sus filas quedan pendientes (no confirmar offsets).
+        """
+        escritas = 0
+        errores = []
+        for destino, filas in self._pendientes.items():
+            if not filas:
+                continue
+            try:
+                ubicacion = destino.escribir(filas)
+            except Exception as e:
+                logger.error(f"No se pudieron guardar {len(filas)} reportes en el destino {destino.nombre}: {e}")
+                errores.append(destino.nombre)
+                continue
+            logger.info(f"{len(filas)} reportes de equipaje perdido guardados en {ubicacion}")
+            escritas = max(escritas, len(filas))
+            self._pendientes[destino] = []
+        if errores:
+            raise OSError(f"Reportes pendientes en: {', '.join(errores)}")
+        self._primera_pendiente = None
+        self.escritas += escritas
+        return escritas
+
+    def cerrar(self):
+        """Intenta un último vaciado y cierra los destinos."""
+        try:
+            self.vaciar()
+        except OSError as e:
+            logger.error(f"Se descartan reportes sin guardar al cerrar: {e}")
+        for destino in self._pendientes:
+            destino.cerrar()
+
+def crear_escritor():
+    """Escritor con los destinos configurados: CSV rotado y, si hay ruta, SQLite."""
+    destinos = [DestinoCSV()]
+    if REPORTES_DB:
+        destinos.append(DestinoSQLite(REPORTES_DB))
+    return EscritorReportes(destinos)
@@ -0,0 +1,49 @@
+"""
+Selección del transporte de eventos del productor y el consumidor.
+KAFKA_TRANSPORTE='kafka' (por defecto) usa kafka-python contra el broker real;
+'memoria' usa el broker en memoria del proceso (ver kafka_memoria.py), con la misma
+interfaz, para pruebas de punta a punta y de carga sin broker.
+"""
+
+import os
+
+KAFKA_TRANSPORTE = os.environ.get('KAFKA_TRANSPORTE', 'kafka')
+
+TRANSPORTES = ('kafka', 'memoria')
+
+def transporte_en_memoria():
+    """Indica si los eventos viajan por el broker en memoria del proceso."""
+    return KAFKA_TRANSPORTE == 'memoria'
+
+def _validar():
+    if KAFKA_TRANSPORTE not in TRANSPORTES:
+        raise ValueError(f"Transporte de Kafka desconocido: {KAFKA_TRANSPORTE}")
+
+def crear_productor(**opciones):
+    """
+    Crea el productor del transporte configurado.
+
+    Args:
+        **opciones: Opciones de KafkaProducer (las que no aplican en memoria se ignoran).
+    """
+    _validar()
+    if transporte_en_memoria():
+        from src.eda.kafka_memoria import ProductorMemoria
+        return ProductorMemoria(**opciones)
+    from kafka import KafkaProducer
+    return KafkaProducer(**opciones)
+
+def crear_consumidor(*topicos, **opciones):
+    """
+    Crea el consumidor del transporte configurado.
+
+    Args:
+        *topicos: Tópicos a los que suscribirse (opcional).
+        **opciones: Opciones de KafkaConsumer (las que no aplican en memoria se ignoran).
+    """
+    _validar()
+    if transporte_en_memoria():
+        from src.eda.kafka_memoria import ConsumidorMemoria
+        return ConsumidorMemoria(*topicos, **opciones)
+    from kafka import KafkaConsumer
+    return KafkaConsumer(*topicos, **opciones)
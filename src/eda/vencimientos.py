@@ -0,0 +1,75 @@
+"""
+Índice de vencimientos para la detección de equipajes perdidos.
+Mantiene un min-heap ordenado por el instante de vencimiento de cada valija, de modo
+que consultar las valijas vencidas cuesta O(k log n) para k vencidas, en lugar de
+recorrer todas las valijas en seguimiento. Reprogramar una valija no borra su entrada
+anterior del heap: queda invalidada y se descarta al llegar al frente (borrado perezoso).
+"""
+
+import heapq
+
+class IndiceVencimientos:
+    """Vencimientos por clave con reprogramación, cancelación y disparo único."""
+
+    def __init__(self):
+        self._heap = []        # (vencimiento, secuencia, clave)
+        self._vigentes = {}    # clave -> secuencia de su entrada vigente en el heap
+        self._secuencia = 0
+
+    def __len__(self):
+        return len(self._vigentes)
+
+    def __contains__(self, clave):
+        return clave in self._vigentes
+
+    def programar(self, clave, vencimiento):
+        """
+        Programa (o reprograma) el vencimiento de una clave.
+
+        Args:
+            clave: Identificador (id de valija).
+            vencimiento (float): Instante de vencimiento en epoch segundos.
+        """
+        self._secuencia += 1
+        self._vigentes[clave] = self._secuencia
+        heapq.heappush(self._heap, (vencimiento, self._secuencia, clave))
+        self._compactar()
+
+    def cancelar(self, clave):
+        """Quita una clave del índice. No hace nada si no estaba programada."""
+        self._vigentes.pop(clave, None)
+
+    def proximo(self):
+        """Instante del próximo vencimiento vigente, o None si el índice está vacío."""
+        self._descartar_invalidas()
+        return self._heap[0][0] if self._heap else None
+
+    def vencidos(self, ahora):
+        """
+        Extrae las claves cuyo vencimiento ya pasó. Cada vencimiento se devuelve una
+        sola vez: la clave sale del índice hasta que se vuelva a programar.
+
+        Args:
+            ahora (float): Instante actual en epoch segundos.
+
+        Returns:
+            list: Claves vencidas, de la más antigua a la más reciente.
+        """
+        resultado = []
+        while self._heap and self._heap[0][0] <= ahora:
+            _, secuencia, clave = heapq.heappop(self._heap)
+            if self._vigentes.get(clave) == secuencia:
+                del self._vigentes[clave]
+                resultado.append(clave)
+        return resultado
+
+    def _descartar_invalidas(self):
+        while self._heap and self._vigentes.get(self._heap[0][2]) != self._heap[0][1]:
+            heapq.heappop(self._heap)
+
+    def _compactar(self):
+        # Si las entradas invalidadas superan a las vigentes, reconstruir el heap
+        if len(self._heap) > 2 * len(self._vigentes) + 1024:
+            self._heap = [entrada for entrada in self._heap
+                          if self._vigentes.get(entrada[2]) == entrada[1]]
+            heapq.heapify(self._heap)
@@ -16,14 +16,34 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 # Importar componentes centralizados
+from src.core import notificaciones
 from src.core.config import Config, get_datetime_argentina
-from src.core.db_service import insertar_evento, obtener_valijas_incompletas, inicializar_db
+from src.core.repositorio import obtener_repositorio
 
 # Configuración de logging
 logger = logging.getLogger('simulador-auto')
 
 # Estados de seguimiento de las valijas
 valijas_activas = {}  # Diccionario para mantener el estado de las valijas activas
+generacion = 0  # Se incrementa con cada cambio en valijas_activas (versión para la API)
+hilo_simulador = None  # Hilo en ejecución (uno por proceso)
+detener_evento = threading.Event()  # Pedido de detención desde detener_simulador()
+
+def obtener_estado():
+    """Estado general del simulador, tal como lo informa la API."""
+    return {
+        'activo': True,
+        'valijas_activas': len(valijas_activas),
+        'max_valijas': Config.MAX_VALIJAS_ACTIVAS,
+        'intervalo_generacion': Config.INTERVALO_GENERACION,
+        'timestamp': get_datetime_argentina().isoformat()
+    }
+
+def registrar_cambio():
+    """Marca que cambió el conjunto o el estado de las valijas activas y lo notifica."""
+    global generacion
+    generacion += 1
+    notificaciones.centro.publicar('simulador', obtener_estado())
 
 def generar_nuevo_equipaje():
     """Genera un nuevo equipaje con evento inicial (escaneado)."""
@@ -37,7 +57,7 @@ def generar_nuevo_equipaje():
     peso = round(random.uniform(5, 30), 1)  # Peso entre 5 y 30 kg
     
     # Insertar evento de escaneado usando el servicio de base de datos
-    insertar_evento(id_valija, 'equipaje_escaneado', origen, destino, peso)
+    obtener_repositorio().insertar_evento(id_valija, 'equipaje_escaneado', origen, destino, peso)
     
     # Agregar a valijas activas con tiempo estimado para próximo evento
     tiempo_proxima_accion = get_datetime_argentina() + timedelta(seconds=random.randint(30, 120))
@@ -49,6 +69,7 @@ def generar_nuevo_equipaje():
         'estado_actual': 'equipaje_escaneado',
         'tiempo_proxima_accion': tiempo_proxima_accion
     }
+    registrar_cambio()
     
     return id_valija
 
@@ -66,23 +87,24 @@ def procesar_equipajes_activos():
             # Determinar próximo estado según el estado actual
             if estado_actual == 'equipaje_escaneado':
                 # Cambiar a estado cargado
-                insertar_evento(id_valija, 'equipaje_cargado', 
-                               info['origen'], info['destino'], info['peso'])
+                obtener_repositorio().insertar_evento(id_valija, 'equipaje_cargado', 
+                                                     info['origen'], info['destino'], info['peso'])
                 
                 # Actualizar estado y programar próxima acción
                 info['estado_actual'] = 'equipaje_cargado'
                 info['tiempo_proxima_accion'] = get_datetime_argentina() + timedelta(
                     seconds=random.randint(60, 180))
+                registrar_cambio()
                 
             elif estado_actual == 'equipaje_cargado':
                 # 1 de cada 20 equipajes se marca como perdido
                 if random.randint(1, 20) == 1:
-                    insertar_evento(id_valija, 'equipaje_perdido', 
-                                   info['origen'], info['destino'], info['peso'])
+                    obtener_repositorio().insertar_evento(id_valija, 'equipaje_perdido', 
+                                                         info['origen'], info['destino'], info['peso'])
                     logger.warning(f"Valija {id_valija} marcada como PERDIDA por el simulador")
                 else:
-                    insertar_evento(id_valija, 'equipaje_entregado', 
-                                   info['origen'], info['destino'], info['peso'])
+                    obtener_repositorio().insertar_evento(id_valija, 'equipaje_entregado', 
+                                                         info['origen'], info['destino'], info['peso'])
                 # Marcar para eliminar de valijas activas
                 valijas_a_eliminar.append(id_valija)
     
@@ -90,12 +112,14 @@ def procesar_equipajes_activos():
     for id_valija in valijas_a_eliminar:
         del valijas_activas[id_valija]
         logger.info(f"Valija {id_valija} completó el ciclo y fue eliminada de activas")
+    if valijas_a_eliminar:
+        registrar_cambio()
 
 def cargar_estado_inicial():
     """Carga el estado de valijas existentes en la base de datos."""
     try:
         # Obtener valijas que no han completado su ciclo usando el servicio de base de datos
-        valijas_incompletas = obtener_valijas_incompletas()
+        valijas_incompletas = obtener_repositorio().obtener_valijas_incompletas()
         
         # Agregar valijas incompletas al seguimiento
         for valija in valijas_incompletas:
@@ -115,6 +139,7 @@ def cargar_estado_inicial():
                 'estado_actual': valija['evento'],
                 'tiempo_proxima_accion': tiempo_proxima_accion
             }
+            registrar_cambio()
             
         logger.info(f"Se cargaron {len(valijas_incompletas)} valijas incompletas para seguimiento")
     except Exception as e:
@@ -134,6 +159,7 @@ def agregar_valija_a_simulador(id_valija, origen, destino, peso, estado_actual):
             'estado_actual': estado_actual,
             'tiempo_proxima_accion': tiempo_proxima_accion
         }
+        registrar_cambio()
         logger.info(f"Valija {id_valija} añadida manualmente al simulador para cambio de estado automático")
 
 def simulador_eventos():
@@ -147,7 +173,7 @@ def simulador_eventos():
     ultima_generacion = get_datetime_argentina() - timedelta(seconds=Config.INTERVALO_GENERACION)
     
     try:
-        while True:
+        while not detener_evento.is_set():
             # Procesar equipajes activos existentes
             procesar_equipajes_activos()
             
@@ -158,8 +184,8 @@ def simulador_eventos():
                 ultima_generacion = get_datetime_argentina()
                 logger.info(f"Valijas activas: {len(valijas_activas)}")
             
-            # Breve pausa para no saturar la CPU
-            time.sleep(5)
+            # Breve pausa para no saturar la CPU (se interrumpe al detener el simulador)
+            detener_evento.wait(5)
             
     except Exception as e:
         logger.error(f"Error en el simulador: {e}")
@@ -167,15 +193,17 @@ def simulador_eventos():
         logger.info("Simulador detenido")
 
 def iniciar_simulador():
-    """Inicia el simulador en un hilo separado."""
+    """Inicia el simulador en un hilo separado (si ya está en ejecución no hace nada)."""
+    global hilo_simulador
+    if hilo_simulador is not None and hilo_simulador.is_alive():
+        logger.info("El simulador ya está en ejecución")
+        return True
     try:
-        # Verificar si la base de datos existe
-        logger.info(f"Verificando si la base de datos existe en: {Config.DB_PATH}")
-        if not os.path.exists(Config.DB_PATH):
-            # Intentar crearla
-            if not inicializar_db():
-                logger.error(f"No se pudo inicializar la base de datos. No se puede iniciar el simulador.")
-                return False
+        # Verificar que el almacenamiento esté listo (crea la base de datos si no existe)
+        logger.info(f"Verificando el almacenamiento ({Config.BACKEND_ALMACENAMIENTO})")
+        if not obtener_repositorio().inicializar():
+            logger.error(f"No se pudo inicializar la base de datos. No se puede iniciar el simulador.")
+            return False
         
         # Si estamos en PythonAnywhere, siempre forzar la activación del simulador
         if Config.ON_PYTHONANYWHERE:
@@ -186,8 +214,10 @@ def iniciar_simulador():
         # Crear y arrancar el hilo del simulador con más protección
         try:
             logger.info("Creando hilo del simulador...")
-            # Usar non-daemon thread para evitar que sea terminado automáticamente
-            hilo_simulador = threading.Thread(target=simulador_eventos, daemon=False)
+            # Hilo daemon: Python espera a los hilos no daemon antes de ejecutar los
+            # manejadores de atexit, y es atexit (detener_servicios) el que lo detiene
+            detener_evento.clear()
+            hilo_simulador = threading.Thread(target=simulador_eventos, daemon=True)
             logger.info("Iniciando hilo del simulador...")
             hilo_simulador.start()
             logger.info("Hilo del simulador iniciado correctamente")
@@ -208,6 +238,12 @@ def iniciar_simulador():
         logger.error(f"Error general al iniciar el simulador: {e}")
         return False
 
+def detener_simulador(timeout=10):
+    """Pide al hilo del simulador que termine y espera a que lo haga."""
+    detener_evento.set()
+    if hilo_simulador is not None:
+        hilo_simulador.join(timeout)
+
 # Para pruebas independientes
 if __name__ == "__main__":
     iniciar_simulador()
@@ -216,4 +252,5 @@ if __name__ == "__main__":
         while True:
             time.sleep(1)
     except KeyboardInterrupt:
+        detener_simulador()
         print("Simulador detenido por el usuario")
\ No newline at end of file
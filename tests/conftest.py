@@ -0,0 +1,56 @@
+"""
+Configuración común de las pruebas (pytest).
+Ejecutar desde la raíz del proyecto: python -m pytest
+"""
+import os
+import sys
+import threading
+
+import pytest
+
+# Ajustar el path para las importaciones
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Las pruebas no deben iniciar el simulador ni conectarse a un broker real
+os.environ.setdefault('DISABLE_SIMULATOR', 'True')
+os.environ.setdefault('KAFKA_TRANSPORTE', 'memoria')
+
+@pytest.fixture
+def base_sqlite(tmp_path, monkeypatch):
+    """Apunta db_service a una base SQLite temporal (se crea y migra con la primera conexión)."""
+    from src.core import db_service
+    ruta = str(tmp_path / 'equipajes.db')
+    pool = db_service.PoolConexiones(ruta)
+    monkeypatch.setattr(db_service, 'DB_PATH', ruta)
+    monkeypatch.setattr(db_service, '_pool', pool)
+    monkeypatch.setattr(db_service, '_local', threading.local())
+    yield ruta
+    db_service.cerrar_db_connection_hilo()
+    pool.cerrar_todas()
+
+@pytest.fixture(params=['sqlite', 'memoria'])
+def motor(request):
+    """Cada motor de almacenamiento, vacío (las pruebas que lo usan corren con ambos)."""
+    from src.core.repositorio import crear_repositorio
+    if request.param == 'sqlite':
+        request.getfixturevalue('base_sqlite')
+    repositorio = crear_repositorio(request.param)
+    repositorio.inicializar()
+    return repositorio
+
+@pytest.fixture
+def repositorio_memoria(monkeypatch):
+    """Reemplaza el motor de almacenamiento del proceso por uno en memoria vacío."""
+    from src.core import repositorio
+    from src.core.repositorio_memoria import RepositorioMemoria
+    motor = RepositorioMemoria()
+    monkeypatch.setattr(repositorio, '_repositorio', motor)
+    return motor
+
+@pytest.fixture
+def cliente(repositorio_memoria):
+    """Cliente de pruebas de Flask sobre el motor en memoria, sin servicios en segundo plano."""
+    from app import crear_app
+    app = crear_app(iniciar_en_primera_peticion=False)
+    app.config['TESTING'] = True
+    return app.test_client()
@@ -0,0 +1,105 @@
+"""Pruebas de la analítica por ventanas fijas y deslizantes."""
+import pytest
+
+from src.eda.analitica import CAMPOS, CLAVE_OTROS, AnaliticaVentanas, resumir
+
+def evento(estado, origen='EZE', destino='MAD'):
+    return {'estado': estado, 'origen': origen, 'destino': destino}
+
+def totales(analitica, dimension):
+    return {fila['clave']: fila['eventos'] for fila in analitica.deslizante(dimension)}
+
+class AlmacenFalso:
+    def __init__(self):
+        self.agregados = []
+
+    def registrar_agregado(self, dimension, clave, inicio, valores):
+        self.agregados.append((dimension, clave, inicio, dict(zip(CAMPOS, valores))))
+
+def test_registrar_agrupa_por_ventana_fija_y_aeropuerto():
+    analitica = AnaliticaVentanas(paso=60, ventana=180)
+    analitica.registrar(evento('equipaje_escaneado'), None, 1000)
+    analitica.registrar(evento('equipaje_cargado'), {'estado': 'equipaje_escaneado', 'timestamp': 1000}, 1030)
+    analitica.registrar(evento('equipaje_entregado'), {'estado': 'equipaje_cargado', 'timestamp': 1030}, 1090)
+
+    assert sorted(analitica._fijas) == [960, 1020, 1080]
+    # Hasta la carga cuenta el origen; al finalizar, el destino
+    assert totales(analitica, 'aeropuerto') == {'EZE': 2, 'MAD': 1}
+    ruta, = analitica.deslizante('ruta')
+    assert ruta['clave'] == 'EZE → MAD'
+    assert ruta['escaneado_a_cargado_s'] == 30
+    assert ruta['cargado_a_entregado_s'] == 60
+
+def test_avanzar_resta_las_ventanas_que_salen():
+    analitica = AnaliticaVentanas(paso=60, ventana=180)
+    analitica.registrar(evento('equipaje_escaneado', 'EZE', 'MAD'), None, 0)
+    analitica.registrar(evento('equipaje_escaneado', 'COR', 'MAD'), None, 60)
+    analitica.registrar(evento('equipaje_escaneado', 'COR', 'MAD'), None, 120)
+    assert totales(analitica, 'aeropuerto') == {'EZE': 1, 'COR': 2}
+
+    analitica.avanzar(180)
+    assert totales(analitica, 'aeropuerto') == {'COR': 2}
+    assert 0 not in analitica._fijas
+    # La clave que quedó vacía libera su lugar en la dimensión
+    assert 'EZE' not in analitica._claves['aeropuerto']
+
+    analitica.avanzar(300)
+    assert analitica._deslizante == {}
+    assert analitica._fijas == {}
+
+def test_avanzar_no_retrocede():
+    analitica = AnaliticaVentanas(paso=60, ventana=180)
+    analitica.registrar(evento('equipaje_escaneado'), None, 600)
+    analitica.avanzar(0)
+    assert analitica._fin == 600
+    assert totales(analitica, 'aeropuerto') == {'EZE': 1}
+
+def test_evento_tardio_fuera_de_la_ventana_solo_se_persiste():
+    analitica = AnaliticaVentanas(paso=60, ventana=180)
+    analitica.persistir = True
+    analitica.registrar(evento('equipaje_escaneado'), None, 600)
+    analitica.registrar(evento('equipaje_perdido'), None, 300)
+    # Dentro de la ventana, aunque llegue tarde, sí se suma
+    analitica.registrar(evento('equipaje_escaneado'), None, 500)
+
+    assert totales(analitica, 'aeropuerto') == {'EZE': 2}
+    assert 300 not in analitica._fijas
+
+    almacen = AlmacenFalso()
+    analitica.volcar(almacen)
+    claves = {(dimension, clave, inicio): valores['eventos']
+              for dimension, clave, inicio, valores in almacen.agregados}
+    assert claves == {
+        ('aeropuerto', 'EZE', 600): 1, ('ruta', 'EZE → MAD', 600): 1,
+        ('aeropuerto', 'MAD', 300): 1, ('ruta', 'EZE → MAD', 300): 1,
+        ('aeropuerto', 'EZE', 480): 1, ('ruta', 'EZE → MAD', 480): 1,
+    }
+    assert analitica._pendientes == {}
+
+def test_sin_persistir_no_acumula_incrementos():
+    analitica = AnaliticaVentanas(paso=60, ventana=180)
+    analitica.registrar(evento('equipaje_escaneado'), None, 600)
+    assert analitica._pendientes == {}
+
+def test_claves_excedentes_se_agrupan_en_otros():
+    analitica = AnaliticaVentanas(paso=60, ventana=180, max_claves=2)
+    for origen in ('EZE', 'COR', 'MDZ', 'ROS'):
+        analitica.registrar(evento('equipaje_escaneado', origen, 'MAD'), None, 600)
+    assert totales(analitica, 'aeropuerto') == {'EZE': 1, 'COR': 1, CLAVE_OTROS: 2}
+    assert totales(analitica, 'ruta') == {'EZE → MAD': 1, 'COR → MAD': 1, CLAVE_OTROS: 2}
+
+def test_evento_sin_aeropuerto_se_ignora():
+    analitica = AnaliticaVentanas(paso=60, ventana=180)
+    analitica.registrar({'estado': 'equipaje_escaneado'}, None, 600)
+    assert analitica._fin is None
+    assert analitica._deslizante == {}
+
+def test_resumir():
+    valores = dict.fromkeys(CAMPOS, 0)
+    valores.update(eventos=30, entregados=3, perdidos=1, carga_total_s=90, carga_cantidad=2)
+    fila = resumir('EZE', valores, 600)
+    assert fila['eventos_por_minuto'] == 3
+    assert fila['tasa_perdida'] == 0.25
+    assert fila['escaneado_a_cargado_s'] == 45
+    assert fila['cargado_a_entregado_s'] is None
+    assert resumir('EZE', dict.fromkeys(CAMPOS, 0), 600)['tasa_perdida'] is None
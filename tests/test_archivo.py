@@ -0,0 +1,83 @@
+"""Pruebas del archivo histórico mensual de valijas completadas."""
+import sqlite3
+
+import pytest
+
+from src.core import archivo, db_service, migraciones
+from src.core.config import Config, timestamp_a_epoch_ms
+
+MARZO_2024_MS = timestamp_a_epoch_ms('2024-03-15T12:00:00-03:00')
+MAYO_2024_MS = timestamp_a_epoch_ms('2024-05-15T12:00:00-03:00')
+
+@pytest.fixture
+def conn(base_sqlite, tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'ARCHIVO_DIR', str(tmp_path / 'archivo'))
+    return db_service.get_db_connection()
+
+def insertar(id_valija, evento, timestamp):
+    assert db_service.insertar_evento(id_valija, evento, 'EZE', 'MAD', 20.0, timestamp)
+
+def viaje(id_valija, dia):
+    insertar(id_valija, 'equipaje_escaneado', f'{dia}T10:00:00-03:00')
+    insertar(id_valija, 'equipaje_entregado', f'{dia}T22:00:00-03:00')
+
+def valijas_unicas(conn):
+    return conn.execute(
+        "SELECT valor FROM estadisticas_contador WHERE nombre = 'valijas_unicas'").fetchone()[0]
+
+def en_vivo(conn, id_valija):
+    return conn.execute('SELECT COUNT(*) FROM eventos_equipaje WHERE id_valija = ?', (id_valija,)).fetchone()[0]
+
+def test_archiva_solo_valijas_completadas_y_las_consulta_desde_el_archivo(conn):
+    viaje('v1', '2024-01-10')
+    insertar('v2', 'equipaje_escaneado', '2024-01-10T10:00:00-03:00')
+
+    assert archivo.archivar_valijas_completadas(conn, 30, MARZO_2024_MS) == {'2024_01': 1}
+
+    assert en_vivo(conn, 'v1') == 0
+    assert en_vivo(conn, 'v2') == 1
+    assert [v['id_valija'] for v in db_service.obtener_todas_valijas()] == ['v2']
+    assert valijas_unicas(conn) == 1
+    assert archivo.meses_archivados(conn, 'v1') == ['2024_01']
+    eventos = db_service.obtener_valija('v1')
+    assert [e['evento'] for e in eventos] == ['equipaje_escaneado', 'equipaje_entregado']
+    # Repetir no mueve nada más
+    assert archivo.archivar_valijas_completadas(conn, 30, MARZO_2024_MS) == {}
+
+def test_valija_archivada_dos_veces_conserva_ambos_meses(conn):
+    viaje('v1', '2024-01-10')
+    assert archivo.archivar_valijas_completadas(conn, 30, MARZO_2024_MS) == {'2024_01': 1}
+    viaje('v1', '2024-03-20')
+    assert archivo.archivar_valijas_completadas(conn, 30, MAYO_2024_MS) == {'2024_03': 1}
+
+    assert archivo.meses_archivados(conn, 'v1') == ['2024_01', '2024_03']
+    eventos = db_service.obtener_valija('v1')
+    assert [e['timestamp'][:10] for e in eventos] == ['2024-01-10', '2024-01-10', '2024-03-20', '2024-03-20']
+    assert [e['id'] for e in db_service.obtener_historial_valijas(['v1'])['v1']] == [e['id'] for e in eventos]
+
+def test_valija_con_evento_nuevo_durante_el_archivado_no_se_archiva(conn, monkeypatch):
+    viaje('v1', '2024-01-10')
+    adjuntar = archivo._adjuntar
+
+    def adjuntar_tras_un_nuevo_escaneo(conn, mes, alias):
+        # Entre la lectura de candidatas y la transacción llega un nuevo escaneo
+        insertar('v1', 'equipaje_escaneado', '2024-03-15T11:00:00-03:00')
+        adjuntar(conn, mes, alias)
+
+    monkeypatch.setattr(archivo, '_adjuntar', adjuntar_tras_un_nuevo_escaneo)
+    assert archivo.archivar_valijas_completadas(conn, 30, MARZO_2024_MS) == {}
+
+    assert en_vivo(conn, 'v1') == 3
+    assert [v['estado'] for v in db_service.obtener_todas_valijas()] == ['equipaje_escaneado']
+    assert valijas_unicas(conn) == 1
+    assert archivo.meses_archivados(conn, 'v1') == []
+
+def test_migracion_del_catalogo_conserva_las_valijas(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'equipajes.db'))
+    for _, _, migracion in migraciones.MIGRACIONES:
+        if migracion is migraciones._catalogo_archivo_por_mes:
+            # Fila registrada con el catálogo anterior (un mes por valija)
+            conn.execute("INSERT INTO valija_archivada (id_valija, mes) VALUES ('v1', '2024_01')")
+        migracion(conn)
+    conn.execute("INSERT INTO valija_archivada (id_valija, mes) VALUES ('v1', '2024_03')")
+    assert conn.execute('SELECT mes FROM valija_archivada ORDER BY mes').fetchall() == [('2024_01',), ('2024_03',)]
@@ -0,0 +1,149 @@
+"""Pruebas de la caché LRU con TTL y del repositorio con caché de lecturas."""
+import threading
+import time
+
+import pytest
+
+from src.core import cache as modulo_cache
+from src.core.cache import CacheLRU
+from src.core.repositorio_cache import RepositorioCache
+from src.core.repositorio_memoria import RepositorioMemoria
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(modulo_cache.time, 'monotonic', reloj)
+    return reloj
+
+def test_acierto_y_vencimiento_por_ttl(reloj):
+    cache = CacheLRU('prueba', max_entradas=10, ttl=30)
+    calculos = []
+    calcular = lambda: calculos.append(1) or len(calculos)
+    assert cache.obtener(('a',), calcular) == 1
+    assert cache.obtener(('a',), calcular) == 1
+    reloj.ahora += 29.9
+    assert cache.obtener(('a',), calcular) == 1
+    reloj.ahora += 0.2
+    assert cache.obtener(('a',), calcular) == 2
+    assert (cache.aciertos, cache.fallos) == (2, 2)
+
+def test_descarta_la_menos_usada(reloj):
+    cache = CacheLRU('prueba', max_entradas=2, ttl=30)
+    cache.obtener('a', lambda: 'a')
+    cache.obtener('b', lambda: 'b')
+    cache.obtener('a', lambda: 'otra')      # 'a' pasa a ser la más usada
+    cache.obtener('c', lambda: 'c')         # descarta 'b'
+    assert cache.obtener('a', lambda: 'nueva') == 'a'
+    assert cache.obtener('b', lambda: 'nueva') == 'nueva'
+    assert cache.estadisticas()['descartes'] == 2
+
+def test_invalidar_claves_o_todo(reloj):
+    cache = CacheLRU('prueba', max_entradas=10, ttl=30)
+    for clave in 'abc':
+        cache.obtener(clave, lambda: 1)
+    cache.invalidar(['a'])
+    assert cache.estadisticas()['entradas'] == 2
+    cache.invalidar()
+    assert cache.estadisticas()['entradas'] == 0
+
+def test_un_solo_calculo_por_clave_con_hilos_concurrentes():
+    cache = CacheLRU('prueba', max_entradas=10, ttl=30)
+    calculos = []
+    liberar = threading.Event()
+
+    def calcular():
+        calculos.append(1)
+        liberar.wait(5)
+        return 'valor'
+
+    resultados = []
+    hilos = [threading.Thread(target=lambda: resultados.append(cache.obtener('clave', calcular)))
+             for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    time.sleep(0.1)
+    liberar.set()
+    for hilo in hilos:
+        hilo.join()
+    assert resultados == ['valor'] * 8
+    assert len(calculos) == 1
+
+def test_error_al_calcular_libera_la_clave():
+    cache = CacheLRU('prueba', max_entradas=10, ttl=30)
+
+    def falla():
+        raise RuntimeError('sin base')
+
+    with pytest.raises(RuntimeError):
+        cache.obtener('clave', falla)
+    assert cache.obtener('clave', lambda: 'ok') == 'ok'
+
+def test_calculo_iniciado_antes_de_invalidar_no_se_guarda():
+    cache = CacheLRU('prueba', max_entradas=10, ttl=30)
+
+    def calcular_e_invalidar():
+        cache.invalidar()   # Una escritura termina mientras se calcula
+        return 'viejo'
+
+    assert cache.obtener('clave', calcular_e_invalidar) == 'viejo'
+    assert cache.obtener('clave', lambda: 'nuevo') == 'nuevo'
+
+def evento(id_valija):
+    return {'id_valija': id_valija, 'evento': 'equipaje_escaneado', 'origen': 'EZE',
+            'destino': 'MAD', 'peso': 1.0}
+
+def test_agregados_ven_escrituras_que_no_pasaron_por_la_cache():
+    """
+    Una escritura de otro proceso (p. ej. el archivo) o una lectura entre el commit y
+    la invalidación: la versión de los datos forma parte de la clave.
+    """
+    motor = RepositorioMemoria()
+    repositorio = RepositorioCache(motor, max_entradas=10, ttl=3600)
+    repositorio.insertar_eventos_lote([evento('v1')])
+    assert [v['id_valija'] for v in repositorio.obtener_todas_valijas()] == ['v1']
+    assert repositorio.obtener_estadisticas()['valijas_unicas'] == 1
+
+    motor.insertar_eventos_lote([evento('v2')])   # Sin invalidar la caché
+
+    assert {v['id_valija'] for v in repositorio.obtener_todas_valijas()} == {'v1', 'v2'}
+    assert repositorio.obtener_estadisticas()['valijas_unicas'] == 2
+    assert len(repositorio.obtener_eventos()) == 2
+
+def test_escritura_por_la_cache_invalida_la_valija():
+    motor = RepositorioMemoria()
+    repositorio = RepositorioCache(motor, max_entradas=10, ttl=3600)
+    repositorio.insertar_eventos_lote([evento('v1')])
+    assert len(repositorio.obtener_valija('v1')) == 1
+    repositorio.insertar_evento('v1', 'equipaje_cargado', 'EZE', 'MAD', 1.0)
+    assert len(repositorio.obtener_valija('v1')) == 2
+
+def test_valija_ve_escrituras_que_no_pasaron_por_la_cache():
+    motor = RepositorioMemoria()
+    repositorio = RepositorioCache(motor, max_entradas=10, ttl=3600)
+    repositorio.insertar_eventos_lote([evento('v1')])
+    assert len(repositorio.obtener_valija('v1')) == 1
+    motor.insertar_evento('v1', 'equipaje_cargado', 'EZE', 'MAD', 1.0)   # Otro worker o el relay
+    assert len(repositorio.obtener_valija('v1')) == 2
+
+def test_api_etag_nunca_mas_nuevo_que_el_cuerpo(cliente, repositorio_memoria, monkeypatch):
+    from src.core import repositorio as modulo_repositorio
+    repositorio = RepositorioCache(repositorio_memoria, max_entradas=10, ttl=3600)
+    monkeypatch.setattr(modulo_repositorio, '_repositorio', repositorio)
+    repositorio.insertar_eventos_lote([evento('v1')])
+
+    primera = cliente.get('/api/valijas')
+    assert [v['id_valija'] for v in primera.get_json()] == ['v1']
+
+    # Escritura confirmada en el motor cuya invalidación todavía no ocurrió
+    repositorio_memoria.insertar_eventos_lote([evento('v2')])
+    segunda = cliente.get('/api/valijas', headers={'If-None-Match': primera.headers['ETag']})
+    assert segunda.status_code == 200
+    assert segunda.headers['ETag'] != primera.headers['ETag']
+    assert {v['id_valija'] for v in segunda.get_json()} == {'v1', 'v2'}
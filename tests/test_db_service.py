@@ -0,0 +1,71 @@
+"""Pruebas de las inserciones en SQLite y de los contadores incrementales."""
+import sqlite3
+import threading
+
+from src.core import db_service
+
+def contadores():
+    estadisticas = db_service.obtener_estadisticas()
+    return estadisticas['valijas_unicas'], {fila['evento']: fila['cantidad'] for fila in estadisticas['por_tipo']}
+
+def test_insertar_evento_actualiza_estado_y_contadores(base_sqlite):
+    assert db_service.insertar_evento('v1', 'equipaje_escaneado', 'EZE', 'MAD', 20.0,
+                                      '2024-01-01T10:00:00-03:00')
+    assert db_service.insertar_evento('v1', 'equipaje_cargado', 'EZE', 'MAD', 20.0,
+                                      '2024-01-01T10:05:00-03:00')
+    # Un evento más antiguo que el estado actual no lo reemplaza
+    assert db_service.insertar_evento('v1', 'equipaje_escaneado', 'EZE', 'MAD', 20.0,
+                                      '2024-01-01T09:00:00-03:00')
+    assert db_service.obtener_todas_valijas()[0]['estado'] == 'equipaje_cargado'
+    assert contadores() == (1, {'equipaje_escaneado': 2, 'equipaje_cargado': 1})
+
+def test_lote_cuenta_cada_valija_nueva_una_vez(base_sqlite):
+    db_service.insertar_evento('v1', 'equipaje_escaneado', 'EZE', 'MAD', 20.0)
+    insertados = db_service.insertar_eventos_lote([
+        {'id_valija': 'v1', 'evento': 'equipaje_cargado', 'origen': 'EZE', 'destino': 'MAD', 'peso': 20.0},
+        {'id_valija': 'v2', 'evento': 'equipaje_escaneado', 'origen': 'COR', 'destino': 'MDZ', 'peso': 9.0},
+        {'id_valija': 'v2', 'evento': 'equipaje_cargado', 'origen': 'COR', 'destino': 'MDZ', 'peso': 9.0},
+    ])
+    assert insertados == 3
+    assert contadores()[0] == 2
+
+def test_inserciones_concurrentes_de_una_valija_nueva(base_sqlite, monkeypatch):
+    """
+    Dos hilos insertan a la vez el primer evento de la misma valija. Ambos se detienen
+    en la consulta de valija nueva hasta que llega el otro (o vence la espera): con el
+    bloqueo de escritura tomado antes de la consulta, solo uno la ve como nueva.
+    """
+    db_service.inicializar_db()
+    barrera = threading.Barrier(2, timeout=1)
+
+    class ConexionConEspera(sqlite3.Connection):
+        def execute(self, sql, *args):
+            if 'FROM valija_estado WHERE id_valija' in sql:
+                try:
+                    barrera.wait()
+                except threading.BrokenBarrierError:
+                    pass
+            return super().execute(sql, *args)
+
+    local = threading.local()
+
+    def conexion_del_hilo():
+        if not hasattr(local, 'conn'):
+            local.conn = sqlite3.connect(base_sqlite, timeout=10, factory=ConexionConEspera,
+                                         check_same_thread=False)
+            local.conn.row_factory = sqlite3.Row
+        return local.conn
+
+    monkeypatch.setattr(db_service, 'get_db_connection', conexion_del_hilo)
+    resultados = []
+    hilos = [threading.Thread(target=lambda: resultados.append(
+        db_service.insertar_evento('v1', 'equipaje_escaneado', 'EZE', 'MAD', 20.0))) for _ in range(2)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert resultados == [True, True]
+    conn = sqlite3.connect(base_sqlite)
+    assert conn.execute("SELECT valor FROM estadisticas_contador WHERE nombre = 'valijas_unicas'"
+                        ).fetchone()[0] == 1
@@ -0,0 +1,92 @@
+"""Pruebas de las migraciones versionadas del esquema."""
+import sqlite3
+
+import pytest
+
+from src.core import migraciones
+from src.core.migraciones import VERSION_ACTUAL, aplicar_migraciones, obtener_version
+
+def conectar(ruta):
+    conn = sqlite3.connect(ruta, timeout=5)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+@pytest.fixture
+def ruta_db(tmp_path):
+    return str(tmp_path / 'equipajes.db')
+
+def test_base_nueva_queda_en_la_ultima_version(ruta_db):
+    conn = conectar(ruta_db)
+    assert aplicar_migraciones(conn) == len(migraciones.MIGRACIONES)
+    assert obtener_version(conn) == VERSION_ACTUAL
+    tablas = {fila[0] for fila in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {'eventos_equipaje', 'valija_estado', 'estadisticas_evento', 'outbox_kafka'} <= tablas
+
+def test_volver_a_aplicar_no_hace_nada(ruta_db):
+    conn = conectar(ruta_db)
+    aplicar_migraciones(conn)
+    assert aplicar_migraciones(conn) == 0
+    assert aplicar_migraciones(conectar(ruta_db)) == 0
+
+def test_base_anterior_a_las_migraciones_se_completa(ruta_db):
+    conn = conectar(ruta_db)
+    conn.execute('''
+        CREATE TABLE eventos_equipaje (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, id_valija TEXT NOT NULL, evento TEXT NOT NULL,
+            timestamp TEXT NOT NULL, origen TEXT, destino TEXT, peso REAL
+        )
+    ''')
+    conn.executemany(
+        'INSERT INTO eventos_equipaje (id_valija, evento, timestamp, origen, destino, peso) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        [('v1', 'equipaje_escaneado', '2024-01-01T10:00:00-03:00', 'EZE', 'MAD', 20.0),
+         ('v1', 'equipaje_cargado', '2024-01-01T10:05:00-03:00', 'EZE', 'MAD', 20.0),
+         ('v2', 'equipaje_escaneado', 'fecha rota', 'COR', 'MDZ', 10.0)])
+    conn.commit()
+
+    aplicar_migraciones(conn)
+
+    ms = dict(conn.execute('SELECT id, timestamp_ms FROM eventos_equipaje').fetchall())
+    assert ms[1] == 1704114000000
+    assert ms[3] is None  # Los valores históricos ilegibles quedan nulos en lugar de abortar
+    estado = dict(conn.execute('SELECT id_valija, estado FROM valija_estado').fetchall())
+    assert estado == {'v1': 'equipaje_cargado', 'v2': 'equipaje_escaneado'}
+    assert conn.execute("SELECT valor FROM estadisticas_contador WHERE nombre = 'valijas_unicas'"
+                        ).fetchone()[0] == 2
+
+def test_lectura_de_version_concurrente(ruta_db, monkeypatch):
+    """
+    Dos conexiones leen la versión 0 antes de tomar el lock: la segunda no debe volver
+    a aplicar las migraciones que la primera ya aplicó (ALTER TABLE fallaría).
+    """
+    otra = conectar(ruta_db)
+    leer_version = migraciones.obtener_version
+    llamadas = []
+
+    def leer_y_dejar_pasar_a_la_otra(conn):
+        version = leer_version(conn)
+        if not llamadas:
+            llamadas.append(version)
+            # La otra conexión migra toda la base entre la lectura y el BEGIN
+            assert aplicar_migraciones(otra) == len(migraciones.MIGRACIONES)
+        return version
+
+    monkeypatch.setattr(migraciones, 'obtener_version', leer_y_dejar_pasar_a_la_otra)
+    conn = conectar(ruta_db)
+    assert aplicar_migraciones(conn) == 0
+    assert llamadas == [0]
+    assert leer_version(conn) == VERSION_ACTUAL
+
+def test_migracion_fallida_no_avanza_la_version(ruta_db, monkeypatch):
+    def falla(conn):
+        conn.execute('CREATE TABLE a_medias (x)')
+        raise RuntimeError('falla')
+
+    ultima = migraciones.MIGRACIONES[-1]
+    monkeypatch.setattr(migraciones, 'MIGRACIONES',
+                        migraciones.MIGRACIONES[:-1] + [(ultima[0], ultima[1], falla)])
+    conn = conectar(ruta_db)
+    with pytest.raises(RuntimeError):
+        aplicar_migraciones(conn)
+    assert obtener_version(conn) == VERSION_ACTUAL - 1
+    assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'a_medias'").fetchone() is None
@@ -0,0 +1,90 @@
+"""Pruebas de la paginación por cursor (keyset) de eventos y valijas."""
+import base64
+import json
+
+import pytest
+
+from src.api.routes import codificar_cursor, decodificar_cursor
+
+ESTADOS = ['equipaje_escaneado', 'equipaje_cargado', 'equipaje_entregado']
+
+def cargar(motor, valijas=7):
+    """Tres eventos por valija; las valijas pares comparten la misma marca de tiempo."""
+    eventos = []
+    for numero in range(valijas):
+        for paso, estado in enumerate(ESTADOS):
+            segundos = 1700000000 + (0 if numero % 2 == 0 else numero * 10) + paso
+            eventos.append({'id_valija': f'v{numero}', 'evento': estado, 'origen': 'EZE',
+                            'destino': 'MAD' if numero < 4 else 'COR', 'peso': 10.0,
+                            'timestamp': str(segundos)})
+    assert motor.insertar_eventos_lote(eventos) == len(eventos)
+
+def paginar(consultar, tamano, clave):
+    paginas = []
+    antes = None
+    while True:
+        pagina = consultar(tamano, antes)
+        paginas.append(pagina)
+        if len(pagina) < tamano:
+            return paginas
+        antes = clave(pagina[-1])
+
+def test_cursor_ida_y_vuelta():
+    assert decodificar_cursor(codificar_cursor([1700000000000, 42]), (int, int)) == (1700000000000, 42)
+    assert decodificar_cursor(codificar_cursor([1700000000000, 'v1']), (int, str)) == (1700000000000, 'v1')
+
+@pytest.mark.parametrize('valores', [
+    'no es base64 ni json', [1], [1, 2, 3], ['x', 1], [1, {'a': 1}], [True, 1], [1.5, 1], None,
+])
+def test_cursor_invalido(valores):
+    cursor = valores if isinstance(valores, str) else base64.urlsafe_b64encode(
+        json.dumps(valores).encode()).decode()
+    with pytest.raises(ValueError):
+        decodificar_cursor(cursor, (int, int))
+
+@pytest.mark.parametrize('tamano', [1, 2, 5, 21, 50])
+def test_eventos_paginados_sin_repetir_ni_saltear(motor, tamano):
+    cargar(motor)
+    todos = motor.obtener_eventos(limit=1000)
+    paginas = paginar(lambda limite, antes: motor.obtener_eventos(limit=limite, antes=antes),
+                      tamano, lambda e: (e['timestamp_ms'], e['id']))
+    assert [e['id'] for pagina in paginas for e in pagina] == [e['id'] for e in todos]
+    assert len(todos) == 21
+    claves = [(e['timestamp_ms'], e['id']) for e in todos]
+    assert claves == sorted(claves, reverse=True)
+
+@pytest.mark.parametrize('tamano', [1, 3, 7])
+def test_valijas_paginadas_con_empates_de_tiempo(motor, tamano):
+    cargar(motor)
+    paginas = paginar(lambda limite, antes: motor.obtener_todas_valijas(limit=limite, antes=antes),
+                      tamano, lambda v: (v['ultimo_evento_ms'], v['id_valija']))
+    ids = [v['id_valija'] for pagina in paginas for v in pagina]
+    assert sorted(ids) == [f'v{numero}' for numero in range(7)]
+    assert ids == [v['id_valija'] for v in motor.obtener_todas_valijas()]
+
+def test_filtros_y_since_id(motor):
+    cargar(motor)
+    filtros = {'estados': ['equipaje_entregado'], 'aeropuerto': 'COR'}
+    paginas = paginar(lambda limite, antes: motor.obtener_eventos(limit=limite, antes=antes, filtros=filtros),
+                      2, lambda e: (e['timestamp_ms'], e['id']))
+    assert sorted(e['id_valija'] for pagina in paginas for e in pagina) == ['v4', 'v5', 'v6']
+    ultimo_id = motor.obtener_estadisticas()['ultimo_id']
+    motor.insertar_evento('v9', 'equipaje_escaneado', 'EZE', 'MAD', 1.0, '1600000000')
+    assert [e['id_valija'] for e in motor.obtener_eventos(since_id=ultimo_id)] == ['v9']
+
+def test_api_recorre_las_paginas_con_la_cabecera(cliente, repositorio_memoria):
+    cargar(repositorio_memoria)
+    ids = []
+    url = '/api/valijas?limit=3'
+    while url:
+        respuesta = cliente.get(url)
+        assert respuesta.status_code == 200
+        ids.extend(v['id_valija'] for v in respuesta.get_json())
+        cursor = respuesta.headers.get('X-Cursor-Siguiente')
+        url = f'/api/valijas?limit=3&cursor={cursor}' if cursor else None
+    assert sorted(ids) == [f'v{numero}' for numero in range(7)]
+
+@pytest.mark.parametrize('ruta', ['/api/eventos', '/api/valijas'])
+def test_api_cursor_invalido_devuelve_400(cliente, ruta):
+    cursor = codificar_cursor(['x', 1])
+    assert cliente.get(f'{ruta}?cursor={cursor}').status_code == 400
@@ -0,0 +1,96 @@
+"""Pruebas del productor asíncrono: políticas del buffer, derrame y reenvío."""
+import json
+
+import pytest
+
+from src.eda import productor_kafka
+from src.eda.kafka_memoria import BrokerMemoria, ProductorMemoria, TopicPartition
+from src.eda.productor_kafka import KAFKA_TOPIC, ProductorEventos
+
+def evento(numero):
+    return {'equipaje_id': f'v{numero}', 'estado': 'equipaje_escaneado', 'timestamp': 1700000000 + numero}
+
+def publicados(broker):
+    particiones = broker.particiones(KAFKA_TOPIC) or set()
+    valores = []
+    for numero in particiones:
+        particion = TopicPartition(KAFKA_TOPIC, numero)
+        valores.extend(json.loads(valor) for _, _, valor in broker.leer(particion, 0, 10000)[1])
+    return sorted(valores, key=lambda e: e['timestamp'])
+
+def escribir(ruta, eventos):
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        for e in eventos:
+            archivo.write(json.dumps(e) + '\n')
+
+@pytest.fixture
+def broker(monkeypatch):
+    broker = BrokerMemoria(particiones=2)
+    monkeypatch.setattr(productor_kafka, 'crear_productor',
+                        lambda **opciones: ProductorMemoria(broker_memoria=broker, **opciones))
+    return broker
+
+@pytest.fixture
+def sin_broker(monkeypatch):
+    def falla(**opciones):
+        raise ConnectionError('sin broker')
+    monkeypatch.setattr(productor_kafka, 'crear_productor', falla)
+
+def test_publicar_y_cerrar_entrega_lo_encolado(broker, tmp_path):
+    productor = ProductorEventos(archivo_derrame=str(tmp_path / 'pendientes.ndjson'))
+    for numero in range(50):
+        assert productor.publicar(evento(numero))
+    productor.cerrar()
+    assert [e['equipaje_id'] for e in publicados(broker)] == [f'v{numero}' for numero in range(50)]
+    metricas = productor.metricas()
+    assert (metricas['confirmados'], metricas['pendientes']) == (50, 0)
+
+def test_sin_broker_deriva_al_archivo(sin_broker, tmp_path):
+    ruta = tmp_path / 'pendientes.ndjson'
+    productor = ProductorEventos(archivo_derrame=str(ruta))
+    assert productor.publicar(evento(1))
+    assert productor.publicar(evento(2))
+    assert [json.loads(linea) for linea in ruta.read_text().splitlines()] == [evento(1), evento(2)]
+    assert productor.metricas()['derramados'] == 2
+
+def test_buffer_lleno_con_politica_descartar(sin_broker, tmp_path):
+    productor = ProductorEventos(max_pendientes=0, politica='descartar',
+                                 archivo_derrame=str(tmp_path / 'pendientes.ndjson'))
+    assert not productor.publicar(evento(1))
+    assert productor.metricas()['descartados'] == 1
+    assert not (tmp_path / 'pendientes.ndjson').exists()
+
+def test_reenviar_derramados(broker, tmp_path):
+    ruta = tmp_path / 'pendientes.ndjson'
+    escribir(ruta, [evento(1), evento(2)])
+    productor = ProductorEventos(archivo_derrame=str(ruta))
+    assert productor.reenviar_derramados() == 2
+    assert publicados(broker) == [evento(1), evento(2)]
+    assert not ruta.exists()
+    assert not (tmp_path / 'pendientes.ndjson.reenvio').exists()
+
+def test_reenvio_interrumpido_no_se_pierde(broker, tmp_path):
+    """Quedó el archivo de un reenvío que se cortó y además hay derrames nuevos."""
+    ruta = tmp_path / 'pendientes.ndjson'
+    escribir(str(ruta) + '.reenvio', [evento(1), evento(2)])
+    escribir(ruta, [evento(3)])
+    productor = ProductorEventos(archivo_derrame=str(ruta))
+    assert productor.reenviar_derramados() == 3
+    assert publicados(broker) == [evento(1), evento(2), evento(3)]
+    assert not ruta.exists()
+    assert not (tmp_path / 'pendientes.ndjson.reenvio').exists()
+
+def test_reenvio_interrumpido_sin_derrames_nuevos(broker, tmp_path):
+    ruta = tmp_path / 'pendientes.ndjson'
+    escribir(str(ruta) + '.reenvio', [evento(1)])
+    productor = ProductorEventos(archivo_derrame=str(ruta))
+    assert productor.reenviar_derramados() == 1
+    assert publicados(broker) == [evento(1)]
+
+def test_reenvio_que_vuelve_a_fallar_queda_derramado(sin_broker, tmp_path):
+    ruta = tmp_path / 'pendientes.ndjson'
+    escribir(ruta, [evento(1), evento(2)])
+    productor = ProductorEventos(archivo_derrame=str(ruta))
+    assert productor.reenviar_derramados() == 2
+    assert [json.loads(linea) for linea in ruta.read_text().splitlines()] == [evento(1), evento(2)]
+    assert not (tmp_path / 'pendientes.ndjson.reenvio').exists()
@@ -0,0 +1,73 @@
+"""Pruebas del relay del outbox: marca de enviados y orden por valija ante fallos."""
+import pytest
+
+from src.core import db_service
+from src.core.config import Config
+from src.eda import relay_outbox
+from src.eda.relay_outbox import RelayOutbox
+
+@pytest.fixture
+def outbox(base_sqlite, monkeypatch):
+    monkeypatch.setattr(Config, 'OUTBOX_HABILITADO', True)
+    db_service.inicializar_db()
+
+class ProductorFalso:
+    """Confirma cada mensaje salvo los que indica `fallar(mensaje)`, y registra los publicados."""
+
+    def __init__(self):
+        self.publicados = []
+        self.fallar = lambda mensaje: False
+
+    def publicar_confirmado(self, mensajes, timeout=None):
+        resultados = []
+        for mensaje in mensajes:
+            ok = not self.fallar(mensaje)
+            if ok:
+                self.publicados.append((mensaje['equipaje_id'], mensaje['estado']))
+            resultados.append(ok)
+        return resultados
+
+@pytest.fixture
+def productor(monkeypatch):
+    productor = ProductorFalso()
+    monkeypatch.setattr(relay_outbox, 'productor', productor)
+    return productor
+
+def insertar(*eventos):
+    assert db_service.insertar_eventos_lote([
+        {'id_valija': id_valija, 'evento': estado, 'origen': 'EZE', 'destino': 'MAD', 'peso': 1.0,
+         'timestamp': str(1700000000 + segundo)}
+        for segundo, (id_valija, estado) in enumerate(eventos)]) == len(eventos)
+
+def pendientes():
+    return [(m['equipaje_id'], m['estado']) for _, m in db_service.obtener_outbox_pendientes(100)]
+
+def test_marca_los_confirmados(outbox, productor):
+    insertar(('v1', 'equipaje_escaneado'), ('v2', 'equipaje_escaneado'))
+    assert RelayOutbox(tamano_lote=10).procesar_lote() == (2, 2)
+    assert pendientes() == []
+    assert RelayOutbox(tamano_lote=10).procesar_lote() == (0, 0)
+
+def test_fallo_retiene_los_mensajes_posteriores_de_la_valija(outbox, productor):
+    insertar(('v1', 'equipaje_escaneado'), ('v2', 'equipaje_escaneado'), ('v1', 'equipaje_cargado'),
+             ('v2', 'equipaje_cargado'), ('v1', 'equipaje_entregado'))
+    productor.fallar = lambda m: (m['equipaje_id'], m['estado']) == ('v1', 'equipaje_cargado')
+    relay = RelayOutbox(tamano_lote=10)
+
+    assert relay.procesar_lote() == (5, 3)
+    # La entrega de v1 se confirmó pero queda pendiente detrás de su carga fallida
+    assert pendientes() == [('v1', 'equipaje_cargado'), ('v1', 'equipaje_entregado')]
+
+    productor.fallar = lambda m: False
+    assert relay.procesar_lote() == (2, 2)
+    publicados_v1 = [estado for valija, estado in productor.publicados if valija == 'v1']
+    # El último estado publicado de v1 es el último registrado
+    assert publicados_v1[-1] == 'equipaje_entregado'
+    assert publicados_v1[-2] == 'equipaje_cargado'
+    assert relay.estado()['pendientes'] == 0
+
+def test_error_al_marcar_deja_todo_pendiente(outbox, productor, monkeypatch):
+    insertar(('v1', 'equipaje_escaneado'))
+    monkeypatch.setattr(db_service, 'marcar_outbox_enviados', lambda ids: False)
+    assert RelayOutbox(tamano_lote=10).procesar_lote() == (1, 0)
+    assert pendientes() == [('v1', 'equipaje_escaneado')]
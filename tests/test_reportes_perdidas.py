@@ -0,0 +1,120 @@
+"""Pruebas de los reportes de pérdida: buffer, reintento por destino y rotación de archivos."""
+import csv
+import sqlite3
+
+import pytest
+
+from src.eda import reportes_perdidas
+from src.eda.reportes_perdidas import DestinoCSV, DestinoReportes, DestinoSQLite, EscritorReportes
+
+def fila(numero):
+    return [f'v{numero}', 'EZE', 'MAD', 20.5, 1700000000 + numero]
+
+class DestinoMemoria(DestinoReportes):
+    """Destino de prueba que falla mientras `fallar` sea True."""
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.filas = []
+        self.fallar = False
+        self.cerrado = False
+
+    def escribir(self, filas):
+        if self.fallar:
+            raise OSError('disco lleno')
+        self.filas.extend(filas)
+        return self.nombre
+
+    def cerrar(self):
+        self.cerrado = True
+
+def leer_csv(ruta):
+    with open(ruta, newline='', encoding='utf-8') as archivo:
+        return list(csv.reader(archivo))
+
+def test_destino_incompleto_falla_al_instanciarse():
+    class SinEscribir(DestinoReportes):
+        pass
+
+    with pytest.raises(TypeError):
+        SinEscribir()
+
+def test_vaciado_por_cantidad_y_por_tiempo(monkeypatch):
+    ahora = [100.0]
+    monkeypatch.setattr(reportes_perdidas.time, 'monotonic', lambda: ahora[0])
+    escritor = EscritorReportes([DestinoMemoria('a')], max_filas=3, max_espera=5)
+    assert not escritor.debe_vaciar()
+    escritor.agregar([fila(1), fila(2)])
+    assert not escritor.debe_vaciar()
+    escritor.agregar([fila(3)])
+    assert escritor.debe_vaciar()
+    assert escritor.vaciar() == 3
+    assert not escritor.debe_vaciar()
+
+    escritor.agregar([fila(4)])
+    ahora[0] += 4.9
+    assert not escritor.debe_vaciar()
+    ahora[0] += 0.1
+    assert escritor.debe_vaciar()
+
+def test_destino_que_falla_reintenta_sin_duplicar_en_los_demas():
+    csv_, base = DestinoMemoria('csv'), DestinoMemoria('sqlite')
+    escritor = EscritorReportes([csv_, base])
+    escritor.agregar([fila(1), fila(2)])
+    base.fallar = True
+    with pytest.raises(OSError):
+        escritor.vaciar()
+    assert csv_.filas == [fila(1), fila(2)]
+    assert escritor.pendientes() == 2
+
+    escritor.agregar([fila(3)])
+    base.fallar = False
+    assert escritor.vaciar() == 3
+    assert csv_.filas == [fila(1), fila(2), fila(3)]
+    assert base.filas == [fila(1), fila(2), fila(3)]
+    assert escritor.pendientes() == 0
+    assert escritor.escritas == 3
+
+def test_cerrar_vacia_y_cierra_los_destinos():
+    destino = DestinoMemoria('a')
+    escritor = EscritorReportes([destino])
+    escritor.agregar([fila(1)])
+    escritor.cerrar()
+    assert destino.filas == [fila(1)] and destino.cerrado
+
+def test_csv_rotacion_diaria_con_encabezado_unico(tmp_path, monkeypatch):
+    dia = ['2024-01-01']
+    monkeypatch.setattr(reportes_perdidas.time, 'strftime', lambda formato: formato.replace('%Y-%m-%d', dia[0]))
+    destino = DestinoCSV(directorio=str(tmp_path), rotacion='diaria', tamano_max=0)
+    primera = destino.escribir([fila(1)])
+    assert destino.escribir([fila(2)]) == primera
+    dia[0] = '2024-01-02'
+    segunda = destino.escribir([fila(3)])
+    assert primera.endswith('reportes_perdidas_2024-01-01.csv')
+    assert segunda.endswith('reportes_perdidas_2024-01-02.csv')
+    assert leer_csv(primera) == [reportes_perdidas.COLUMNAS, [str(v) for v in fila(1)], [str(v) for v in fila(2)]]
+    assert len(leer_csv(segunda)) == 2
+
+def test_csv_rotacion_por_tamano_continua_en_el_ultimo_archivo(tmp_path):
+    destino = DestinoCSV(directorio=str(tmp_path), rotacion='tamano', tamano_max=50)
+    rutas = [destino.escribir([fila(numero)] * 2) for numero in range(4)]
+    assert [r.rsplit('/', 1)[-1] for r in rutas] == [
+        'reportes_perdidas.csv', 'reportes_perdidas.1.csv', 'reportes_perdidas.2.csv', 'reportes_perdidas.3.csv']
+    # Un proceso nuevo sigue en el último archivo en lugar de volver al primero
+    assert DestinoCSV(directorio=str(tmp_path), rotacion='tamano', tamano_max=50).ruta_actual() == rutas[-1].replace(
+        '.3.csv', '.4.csv')
+    for ruta in rutas:
+        assert leer_csv(ruta)[0] == reportes_perdidas.COLUMNAS
+
+def test_csv_rotacion_desconocida():
+    with pytest.raises(ValueError):
+        DestinoCSV(rotacion='semanal')
+
+def test_destino_sqlite(tmp_path):
+    ruta = str(tmp_path / 'reportes' / 'reportes.db')
+    destino = DestinoSQLite(ruta)
+    destino.escribir([fila(1), fila(2)])
+    destino.cerrar()
+    filas = sqlite3.connect(ruta).execute(
+        'SELECT id_valija, origen, destino, peso, timestamp FROM reportes_perdidas ORDER BY id').fetchall()
+    assert filas == [('v1', 'EZE', 'MAD', 20.5, '1700000001'), ('v2', 'EZE', 'MAD', 20.5, '1700000002')]
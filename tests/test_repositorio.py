@@ -0,0 +1,59 @@
+"""Pruebas de la interfaz de repositorio y del comportamiento común de los motores."""
+import pytest
+
+from src.core.repositorio import RepositorioEventos, crear_repositorio
+from src.core.repositorio_cache import RepositorioCache
+
+def test_motor_incompleto_falla_al_instanciarse():
+    class MotorIncompleto(RepositorioEventos):
+        nombre = 'incompleto'
+
+        def inicializar(self):
+            return True
+
+    with pytest.raises(TypeError):
+        MotorIncompleto()
+
+def test_motores_disponibles():
+    assert crear_repositorio('memoria').nombre == 'memoria'
+    assert crear_repositorio('sqlite').nombre == 'sqlite'
+    assert RepositorioCache(crear_repositorio('memoria')).nombre == 'memoria'
+    with pytest.raises(ValueError):
+        crear_repositorio('postgres')
+
+def test_insertar_y_consultar(motor):
+    assert motor.insertar_evento('v1', 'equipaje_escaneado', 'EZE', 'MAD', 20.0, '2024-01-01T10:00:00-03:00')
+    assert motor.insertar_eventos_lote([
+        {'id_valija': 'v1', 'evento': 'equipaje_cargado', 'origen': 'EZE', 'destino': 'MAD',
+         'peso': 20.0, 'timestamp': '2024-01-01T10:05:00-03:00'},
+        {'id_valija': 'v2', 'evento': 'equipaje_escaneado', 'origen': 'COR', 'destino': 'MDZ',
+         'peso': 9.5, 'timestamp': '2024-01-01T10:01:00-03:00'},
+    ]) == 2
+
+    assert [e['evento'] for e in motor.obtener_valija('v1')] == ['equipaje_escaneado', 'equipaje_cargado']
+    assert [e['id_valija'] for e in motor.obtener_eventos()] == ['v1', 'v2', 'v1']
+    assert [(v['id_valija'], v['estado']) for v in motor.obtener_todas_valijas()] == [
+        ('v1', 'equipaje_cargado'), ('v2', 'equipaje_escaneado')]
+    assert motor.obtener_historial_valijas(['v2', 'v9'], solo_ultimo=True)['v2']['evento'] == 'equipaje_escaneado'
+    assert [v['id_valija'] for v in motor.obtener_valijas_incompletas()] == ['v1', 'v2']
+
+    estadisticas = motor.obtener_estadisticas()
+    assert estadisticas['valijas_unicas'] == 2
+    assert {fila['evento']: fila['cantidad'] for fila in estadisticas['por_tipo']} == {
+        'equipaje_escaneado': 2, 'equipaje_cargado': 1}
+    assert sum(len(bloque) for bloque in motor.iterar_eventos(tamano_bloque=2)) == 3
+
+def test_lote_invalido_no_inserta_nada(motor):
+    assert motor.insertar_eventos_lote([
+        {'id_valija': 'v1', 'evento': 'equipaje_escaneado', 'origen': 'EZE', 'destino': 'MAD', 'peso': 1.0},
+        {'id_valija': 'v2', 'evento': 'equipaje_escaneado', 'origen': 'EZE', 'destino': 'MAD', 'peso': 1.0,
+         'timestamp': 'no es una fecha'},
+    ]) == -1
+    assert motor.obtener_eventos() == []
+
+def test_version_de_datos_cambia_con_cada_escritura(motor):
+    antes = motor.obtener_version_datos()
+    motor.insertar_evento('v1', 'equipaje_escaneado', 'EZE', 'MAD', 20.0)
+    despues = motor.obtener_version_datos()
+    assert despues != antes
+    assert motor.obtener_version_datos() == despues
@@ -0,0 +1,55 @@
+"""Pruebas del arranque y la detención de los servicios en segundo plano."""
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_el_proceso_termina_con_el_simulador_activo(tmp_path):
+    """
+    Al terminar el programa principal con el simulador en ejecución, atexit detiene
+    los servicios y cierra el productor (antes el hilo no daemon lo impedía).
+    """
+    script = textwrap.dedent('''
+        import app
+        from src.simulador import simulador_auto
+        from src.eda.productor_kafka import productor
+        cerrar = productor.cerrar
+        productor.cerrar = lambda: (cerrar(), print('PRODUCTOR_CERRADO', flush=True))
+        app.iniciar_servicios()
+        assert simulador_auto.hilo_simulador.is_alive()
+    ''')
+    entorno = dict(os.environ, BACKEND_ALMACENAMIENTO='memoria', KAFKA_TRANSPORTE='memoria',
+                   DISABLE_SIMULATOR='False')
+    resultado = subprocess.run([sys.executable, '-c', script], cwd=RAIZ, env=entorno,
+                               capture_output=True, text=True, timeout=30)
+    assert resultado.returncode == 0, resultado.stderr
+    assert 'PRODUCTOR_CERRADO' in resultado.stdout
+    assert 'Simulador detenido' in resultado.stderr
+
+def test_peticiones_simultaneas_esperan_el_arranque(monkeypatch):
+    import app
+    inicializado = threading.Event()
+    entro = threading.Event()
+
+    class RepositorioLento:
+        def inicializar(self):
+            entro.set()
+            time.sleep(0.2)
+            inicializado.set()
+
+    monkeypatch.setattr(app, '_servicios_iniciados', False)
+    monkeypatch.setattr(app, 'obtener_repositorio', RepositorioLento)
+    monkeypatch.setattr(app, 'reenviar_pendientes', lambda: None)
+    monkeypatch.setattr(app, 'outbox_activo', lambda: False)
+    monkeypatch.setattr(app.atexit, 'register', lambda funcion: None)
+
+    primera = threading.Thread(target=app.iniciar_servicios)
+    primera.start()
+    assert entro.wait(5)
+    app.iniciar_servicios()   # Segunda petición mientras la primera inicializa
+    assert inicializado.is_set()
+    primera.join(5)
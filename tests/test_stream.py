@@ -0,0 +1,41 @@
+"""Pruebas del stream de Server-Sent Events: los lugares de suscriptor no se pierden."""
+import pytest
+
+from src.core.notificaciones import CentroNotificaciones
+
+@pytest.fixture
+def centro(monkeypatch):
+    from src.api import routes
+    centro = CentroNotificaciones(max_suscriptores=2, tamano_historial=10, tamano_cola=10)
+    monkeypatch.setattr(routes, 'centro_notificaciones', centro)
+    return centro
+
+def test_error_al_abrir_el_stream_libera_el_lugar(cliente, centro, repositorio_memoria, monkeypatch):
+    def fallar():
+        raise RuntimeError('base no disponible')
+
+    monkeypatch.setattr(repositorio_memoria, 'obtener_estadisticas', fallar)
+    for _ in range(3):
+        assert cliente.get('/api/stream').status_code == 500
+    assert centro.cantidad_suscriptores() == 0
+
+def test_desconexion_antes_de_leer_libera_el_lugar(cliente, centro):
+    from src.api.routes import stream
+    # El cliente de pruebas lee el primer fragmento; llamar a la vista directamente
+    # reproduce una desconexión antes de que el servidor empiece a transmitir
+    for _ in range(3):
+        with cliente.application.test_request_context('/api/stream'):
+            respuesta = stream()
+        assert respuesta.status_code == 200
+        assert centro.cantidad_suscriptores() == 1
+        respuesta.close()
+        assert centro.cantidad_suscriptores() == 0
+
+def test_maximo_de_suscriptores(cliente, centro):
+    abiertas = [cliente.get('/api/stream', buffered=False) for _ in range(2)]
+    respuesta = cliente.get('/api/stream')
+    assert respuesta.status_code == 503
+    assert respuesta.headers['Retry-After']
+    for abierta in abiertas:
+        abierta.close()
+    assert cliente.get('/api/stream', buffered=False).status_code == 200
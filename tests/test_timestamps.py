@@ -0,0 +1,59 @@
+"""Pruebas de la conversión de marcas de tiempo a epoch en milisegundos."""
+from datetime import datetime, timezone
+
+import pytest
+
+from src.core.config import Config, EPOCH_MS_MAX, timestamp_a_epoch_ms
+
+def test_iso_con_zona_horaria():
+    assert timestamp_a_epoch_ms('2024-01-01T00:00:00Z') == 1704067200000
+    assert timestamp_a_epoch_ms('2024-01-01T00:00:00+00:00') == 1704067200000
+
+def test_iso_sin_zona_se_interpreta_en_argentina():
+    # Argentina está en UTC-3 todo el año
+    assert timestamp_a_epoch_ms('2024-01-01T00:00:00') == 1704067200000 + 3 * 3600 * 1000
+
+def test_datetime():
+    assert timestamp_a_epoch_ms(datetime(2024, 1, 1, tzinfo=timezone.utc)) == 1704067200000
+    sin_zona = datetime(2024, 1, 1)
+    assert timestamp_a_epoch_ms(sin_zona) == int(Config.ZONA_HORARIA.localize(sin_zona).timestamp() * 1000)
+
+def test_epoch_en_segundos_y_milisegundos():
+    assert timestamp_a_epoch_ms(1700000000) == 1700000000000
+    assert timestamp_a_epoch_ms('1700000000.5') == 1700000000500
+    assert timestamp_a_epoch_ms('1700000000123') == 1700000000123
+    assert timestamp_a_epoch_ms(' 1700000000 ') == 1700000000000
+
+@pytest.mark.parametrize('valor', ['inf', '-inf', 'Infinity', 'nan', '1e400', float('inf')])
+def test_numeros_no_finitos(valor):
+    with pytest.raises(ValueError):
+        timestamp_a_epoch_ms(valor)
+
+@pytest.mark.parametrize('valor', ['1e300', str(EPOCH_MS_MAX + 1), -EPOCH_MS_MAX - 1])
+def test_numeros_fuera_de_rango(valor):
+    with pytest.raises(ValueError):
+        timestamp_a_epoch_ms(valor)
+
+@pytest.mark.parametrize('valor', ['', 'ayer', '2024-13-01T00:00:00'])
+def test_texto_invalido(valor):
+    with pytest.raises(ValueError):
+        timestamp_a_epoch_ms(valor)
+
+@pytest.mark.parametrize('parametro', ['desde', 'hasta'])
+@pytest.mark.parametrize('valor', ['inf', '1e400', 'no-es-fecha'])
+def test_api_filtro_de_fecha_invalido_devuelve_400(cliente, parametro, valor):
+    respuesta = cliente.get(f'/api/eventos?{parametro}={valor}')
+    assert respuesta.status_code == 400
+
+def test_api_lote_con_timestamp_no_finito_devuelve_400(cliente):
+    respuesta = cliente.post('/api/eventos/lote', json=[{
+        'id_valija': 'v1', 'evento': 'equipaje_escaneado', 'origen': 'EZE',
+        'destino': 'MAD', 'peso': 20, 'timestamp': 'inf'}])
+    assert respuesta.status_code == 400
+    assert respuesta.get_json()['errores'][0]['indice'] == 0
+
+def test_api_agregar_equipaje_con_timestamp_no_finito_devuelve_400(cliente):
+    respuesta = cliente.post('/api/agregar_equipaje', data={
+        'evento': 'equipaje_escaneado', 'origen': 'EZE', 'destino': 'MAD',
+        'peso': '20', 'timestamp': '1e400'})
+    assert respuesta.status_code == 400
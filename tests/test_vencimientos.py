@@ -0,0 +1,72 @@
+"""Pruebas del índice de vencimientos de la detección de pérdidas."""
+import random
+
+from src.eda.vencimientos import IndiceVencimientos
+
+def test_vencidos_en_orden_y_una_sola_vez():
+    indice = IndiceVencimientos()
+    indice.programar('b', 20)
+    indice.programar('a', 10)
+    indice.programar('c', 30)
+    assert indice.proximo() == 10
+    assert indice.vencidos(5) == []
+    assert indice.vencidos(20) == ['a', 'b']
+    assert indice.vencidos(20) == []
+    assert len(indice) == 1 and 'c' in indice and 'a' not in indice
+
+def test_reprogramar_reemplaza_el_vencimiento_anterior():
+    indice = IndiceVencimientos()
+    indice.programar('a', 10)
+    indice.programar('a', 50)
+    assert indice.proximo() == 50
+    assert indice.vencidos(40) == []
+    assert indice.vencidos(50) == ['a']
+
+def test_reprogramar_antes():
+    indice = IndiceVencimientos()
+    indice.programar('a', 50)
+    indice.programar('a', 10)
+    assert indice.vencidos(10) == ['a']
+    assert indice.vencidos(100) == []
+
+def test_cancelar():
+    indice = IndiceVencimientos()
+    indice.programar('a', 10)
+    indice.programar('b', 20)
+    indice.cancelar('a')
+    indice.cancelar('no-existe')
+    assert indice.proximo() == 20
+    assert indice.vencidos(100) == ['b']
+    assert indice.proximo() is None
+
+def test_compacta_las_entradas_invalidadas():
+    indice = IndiceVencimientos()
+    for vuelta in range(5000):
+        indice.programar('a', vuelta)
+    assert len(indice) == 1
+    assert len(indice._heap) <= 2 * len(indice) + 1024 + 1
+    assert indice.vencidos(10000) == ['a']
+
+def test_equivale_a_recorrer_todas_las_claves():
+    aleatorio = random.Random(7)
+    indice = IndiceVencimientos()
+    modelo = {}
+    ahora = 0
+    for _ in range(20000):
+        clave = f'v{aleatorio.randrange(300)}'
+        operacion = aleatorio.random()
+        if operacion < 0.6:
+            vencimiento = ahora + aleatorio.uniform(0, 100)
+            indice.programar(clave, vencimiento)
+            modelo[clave] = vencimiento
+        elif operacion < 0.7:
+            indice.cancelar(clave)
+            modelo.pop(clave, None)
+        else:
+            ahora += aleatorio.uniform(0, 10)
+            esperados = sorted((v, c) for c, v in modelo.items() if v <= ahora)
+            assert indice.vencidos(ahora) == [c for _, c in esperados]
+            for _, c in esperados:
+                del modelo[c]
+        assert len(indice) == len(modelo)
+        assert indice.proximo() == (min(modelo.values()) if modelo else None)